@@ -0,0 +1,247 @@
+"""On-disk cache of fetched pages with HTTP freshness and revalidation.
+
+The orchestrator scrapes a section page, sub-agents scrape its articles again,
+and repeated research runs revisit the same site. ``HTTPCache`` keeps each
+successful ``GET`` body zlib-compressed in one file per URL under
+``SCRAPE_CACHE_DIR`` (``off`` disables caching), together with the response
+headers that decide how it may be reused:
+
+- ``Cache-Control: no-store`` responses are never written.
+- A response is fresh for ``max-age`` seconds, else until ``Expires``, else for
+  10% of the time since ``Last-Modified`` (capped at a day); ``no-cache`` makes
+  it stale at once. Fresh entries are served without touching the network.
+- Stale entries with an ``ETag`` or ``Last-Modified`` are revalidated with
+  ``If-None-Match``/``If-Modified-Since``; a ``304`` refreshes the entry and its
+  stored body is served.
+- With ``SCRAPE_CACHE_STALE_MINUTES`` > 0, entries stale by less than that are
+  served as is without a request, unless the response said ``no-cache`` or
+  ``must-revalidate``.
+
+The cache is trimmed to ``SCRAPE_CACHE_MAX_MB``, dropping the least recently
+written entries first.
+"""
+
+import email.utils
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import httpx
+
+SCRAPE_CACHE_DIR = os.getenv("SCRAPE_CACHE_DIR") or str(
+    Path(__file__).resolve().parents[1] / ".http_cache"
+)
+SCRAPE_CACHE_STALE_MINUTES = float(os.getenv("SCRAPE_CACHE_STALE_MINUTES", "0"))
+SCRAPE_CACHE_MAX_MB = float(os.getenv("SCRAPE_CACHE_MAX_MB", "256"))
+HEURISTIC_FRACTION = 0.1
+HEURISTIC_MAX_SECONDS = 86_400
+TRIM_EVERY = 64
+STORED_HEADERS = ("cache-control", "content-type", "date", "etag", "expires", "last-modified")
+
+
+def _parse_cache_control(value: str) -> dict[str, str | None]:
+    directives: dict[str, str | None] = {}
+    for part in value.split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def _stored_headers(response: httpx.Response) -> dict[str, str]:
+    return {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+
+
+def _http_date(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class CacheEntry:
+    """A cached response body and the headers that govern its reuse."""
+
+    url: str
+    headers: dict[str, str]
+    stored_at: float
+    body: str
+
+    @property
+    def directives(self) -> dict[str, str | None]:
+        """Return the parsed ``Cache-Control`` directives."""
+        return _parse_cache_control(self.headers.get("cache-control", ""))
+
+    def lifetime(self) -> float:
+        """Return how many seconds after ``stored_at`` the entry stays fresh."""
+        directives = self.directives
+        if "no-cache" in directives:
+            return 0.0
+        if directives.get("max-age"):
+            try:
+                return max(0.0, float(directives["max-age"]))
+            except ValueError:
+                return 0.0
+        date = _http_date(self.headers.get("date")) or self.stored_at
+        expires = _http_date(self.headers.get("expires"))
+        if "expires" in self.headers:
+            return max(0.0, expires - date) if expires is not None else 0.0
+        modified = _http_date(self.headers.get("last-modified"))
+        if modified is not None and modified < date:
+            return min(HEURISTIC_MAX_SECONDS, HEURISTIC_FRACTION * (date - modified))
+        return 0.0
+
+    def staleness(self, now: float | None = None) -> float:
+        """Return seconds past the end of freshness (negative while fresh)."""
+        return (time.time() if now is None else now) - self.stored_at - self.lifetime()
+
+    def may_serve_stale(self, stale_seconds: float, now: float | None = None) -> bool:
+        """Return whether a stale entry is within the serve-stale window."""
+        if "must-revalidate" in self.directives or "no-cache" in self.directives:
+            return False
+        return self.staleness(now) < stale_seconds
+
+    def validators(self) -> dict[str, str]:
+        """Return conditional request headers for revalidation."""
+        headers = {}
+        if "etag" in self.headers:
+            headers["If-None-Match"] = self.headers["etag"]
+        if "last-modified" in self.headers:
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+
+@dataclass
+class CacheStats:
+    """Counters for one process; ``misses`` includes requests answered by a 304."""
+
+    hits: int = 0
+    stale_hits: int = 0
+    revalidated: int = 0
+    misses: int = 0
+    stores: int = 0
+
+
+class HTTPCache:
+    """Directory of compressed cache entries, one file per URL."""
+
+    def __init__(
+        self, root: Path, stale_seconds: float = 0.0, max_bytes: float = 256 * 2**20
+    ) -> None:
+        """Keep up to ``max_bytes`` of pages in ``root``, served ``stale_seconds`` past expiry."""
+        self.root = Path(root)
+        self.stale_seconds = stale_seconds
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _path(self, url: str) -> Path:
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.root / digest[:2] / f"{digest}.z"
+
+    def _count(self, field: str) -> None:
+        with self._lock:
+            setattr(self.stats, field, getattr(self.stats, field) + 1)
+
+    def lookup(self, url: str) -> CacheEntry | None:
+        """Return the stored entry for ``url``, or None if absent or unreadable."""
+        try:
+            record = json.loads(zlib.decompress(self._path(url).read_bytes()))
+            entry = CacheEntry(**record)
+        except (OSError, ValueError, TypeError, zlib.error):
+            return None
+        return entry if entry.url == url else None
+
+    def serve(self, entry: CacheEntry | None) -> str | None:
+        """Return the entry's body if it may be used without a request."""
+        if entry is not None and entry.staleness() < 0:
+            self._count("hits")
+            return entry.body
+        if entry is not None and self.stale_seconds > 0:
+            if entry.may_serve_stale(self.stale_seconds):
+                self._count("stale_hits")
+                return entry.body
+        self._count("misses")
+        return None
+
+    def store(self, url: str, response: httpx.Response) -> None:
+        """Write a successful response unless its headers forbid storing it."""
+        headers = _stored_headers(response)
+        if "no-store" in _parse_cache_control(headers.get("cache-control", "")):
+            return
+        self._write(CacheEntry(url, headers, time.time(), response.text))
+        self._count("stores")
+
+    def refresh(self, entry: CacheEntry, response: httpx.Response) -> str:
+        """Apply a ``304 Not Modified`` to ``entry`` and return its body."""
+        headers = dict(entry.headers)
+        headers.update(_stored_headers(response))
+        self._write(CacheEntry(entry.url, headers, time.time(), entry.body))
+        self._count("revalidated")
+        return entry.body
+
+    def _write(self, entry: CacheEntry) -> None:
+        path = self._path(entry.url)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_bytes(zlib.compress(json.dumps(asdict(entry)).encode("utf-8")))
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            return
+        with self._lock:
+            self._writes += 1
+            trim = self._writes % TRIM_EVERY == 0
+        if trim:
+            self.trim()
+
+    def trim(self) -> None:
+        """Delete the oldest entries until the cache fits in ``max_bytes``."""
+        files = []
+        for path in self.root.glob("*/*.z"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+_cache: HTTPCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> HTTPCache | None:
+    """Return the shared page cache, or None when SCRAPE_CACHE_DIR is ``off``."""
+    global _cache
+    if SCRAPE_CACHE_DIR.lower() == "off":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = HTTPCache(
+                Path(SCRAPE_CACHE_DIR),
+                stale_seconds=60 * SCRAPE_CACHE_STALE_MINUTES,
+                max_bytes=SCRAPE_CACHE_MAX_MB * 2**20,
+            )
+        return _cache
+
+
+def cache_stats() -> dict[str, int]:
+    """Return hit, revalidation, miss and store counters of the shared cache."""
+    cache = get_cache()
+    return asdict(cache.stats) if cache is not None else {}
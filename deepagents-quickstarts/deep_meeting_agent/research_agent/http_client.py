@@ -0,0 +1,209 @@
+"""Process-wide pooled HTTP clients for the scraping tools.
+
+Every scrape used to open a fresh connection per page, repeating DNS, TCP and
+TLS setup for each article on the same news host. ``get_client`` (blocking) and
+``get_async_client`` (one per event loop, since async connections belong to the
+loop that opened them) return shared clients that keep connections alive
+between requests and tool calls.
+
+Pool limits come from ``SCRAPE_MAX_CONNECTIONS``, ``SCRAPE_MAX_KEEPALIVE`` and
+``SCRAPE_KEEPALIVE_EXPIRY``. ``SCRAPE_HTTP2=1`` negotiates HTTP/2 when the
+optional ``h2`` package is installed (``pip install httpx[http2]``), so one
+connection multiplexes every article request to a host.
+
+``client_stats`` counts requests against new TCP connections and TLS handshakes
+(through httpcore's trace hook) to show how often connections are reused.
+Each async client is closed when its event loop shuts down: an async generator
+registered with the loop closes it from ``loop.shutdown_asyncgens()``, which
+``asyncio.run`` calls before closing the loop. ``close_clients`` closes the
+blocking client at interpreter exit, along with async clients whose loop is
+still open but idle.
+"""
+
+import asyncio
+import atexit
+import importlib.util
+import logging
+import os
+import threading
+import weakref
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
+    )
+}
+SCRAPE_MAX_CONNECTIONS = int(os.getenv("SCRAPE_MAX_CONNECTIONS", "32"))
+SCRAPE_MAX_KEEPALIVE = int(os.getenv("SCRAPE_MAX_KEEPALIVE", "16"))
+SCRAPE_KEEPALIVE_EXPIRY = float(os.getenv("SCRAPE_KEEPALIVE_EXPIRY", "30"))
+SCRAPE_HTTP2 = os.getenv("SCRAPE_HTTP2", "").strip().lower() in ("1", "true", "yes")
+DEFAULT_TIMEOUT = 10.0
+
+
+@dataclass
+class ClientStats:
+    """Counters shared by every pooled client."""
+
+    requests: int = 0
+    connections: int = 0
+    tls_handshakes: int = 0
+    http2_responses: int = 0
+
+    @property
+    def reused(self) -> int:
+        """Return how many requests went over an already open connection."""
+        return max(0, self.requests - self.connections)
+
+
+_stats = ClientStats()
+_stats_lock = threading.Lock()
+_client_lock = threading.Lock()
+_client: httpx.Client | None = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+# The loop only holds its async generators weakly.
+_closers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncIterator[None]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _count(field: str) -> None:
+    with _stats_lock:
+        setattr(_stats, field, getattr(_stats, field) + 1)
+
+
+def _trace_event(name: str) -> None:
+    if name == "connection.connect_tcp.complete":
+        _count("connections")
+    elif name == "connection.start_tls.complete":
+        _count("tls_handshakes")
+
+
+def _trace(name: str, info: dict) -> None:
+    _trace_event(name)
+
+
+async def _atrace(name: str, info: dict) -> None:
+    _trace_event(name)
+
+
+def _on_request(request: httpx.Request) -> None:
+    _count("requests")
+    request.extensions["trace"] = _trace
+
+
+async def _aon_request(request: httpx.Request) -> None:
+    _count("requests")
+    request.extensions["trace"] = _atrace
+
+
+def _on_response(response: httpx.Response) -> None:
+    if response.http_version == "HTTP/2":
+        _count("http2_responses")
+
+
+async def _aon_response(response: httpx.Response) -> None:
+    _on_response(response)
+
+
+def _http2_enabled() -> bool:
+    if SCRAPE_HTTP2 and importlib.util.find_spec("h2") is None:
+        logger.warning("SCRAPE_HTTP2 is set but the h2 package is missing; using HTTP/1.1")
+        return False
+    return SCRAPE_HTTP2
+
+
+def _client_options() -> dict:
+    return {
+        "headers": HEADERS,
+        "timeout": DEFAULT_TIMEOUT,
+        "follow_redirects": True,
+        "http2": _http2_enabled(),
+        "limits": httpx.Limits(
+            max_connections=SCRAPE_MAX_CONNECTIONS,
+            max_keepalive_connections=SCRAPE_MAX_KEEPALIVE,
+            keepalive_expiry=SCRAPE_KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+def get_client() -> httpx.Client:
+    """Return the shared blocking client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.Client(
+                **_client_options(),
+                event_hooks={"request": [_on_request], "response": [_on_response]},
+            )
+        return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the shared async client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _client_lock:
+        for closed in [other for other in _async_clients if other.is_closed()]:
+            del _async_clients[closed]
+        client = _async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = _async_clients[loop] = httpx.AsyncClient(
+                **_client_options(),
+                event_hooks={"request": [_aon_request], "response": [_aon_response]},
+            )
+            closer = _closers[loop] = _close_on_shutdown(client)
+            # Advancing it once registers the generator with the loop.
+            asyncio.ensure_future(closer.__anext__())
+        return client
+
+
+async def _close_on_shutdown(client: httpx.AsyncClient) -> AsyncIterator[None]:
+    """Suspend until the loop finalizes this generator, then close ``client``."""
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+def client_stats() -> dict[str, int | float]:
+    """Return request and connection counters, including the connection reuse rate."""
+    with _stats_lock:
+        stats = asdict(_stats)
+        reused = _stats.reused
+    stats["reused"] = reused
+    stats["reuse_rate"] = round(reused / stats["requests"], 4) if stats["requests"] else 0.0
+    return stats
+
+
+def close_clients() -> None:
+    """Close the blocking client, and async clients whose loop is open but idle.
+
+    Clients of loops that already shut down were closed by them; a client of a
+    running loop (this is called from another thread) is left to that loop.
+    """
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+        async_clients = list(_async_clients.items())
+        _async_clients.clear()
+        _closers.clear()
+    if client is not None:
+        client.close()
+    for loop, async_client in async_clients:
+        if loop.is_closed() or loop.is_running() or async_client.is_closed:
+            continue
+        try:
+            loop.run_until_complete(async_client.aclose())
+        except RuntimeError:
+            logger.debug("Could not close the async client of %r", loop)
+
+
+atexit.register(close_clients)
@@ -0,0 +1,55 @@
+from research_agent.extract import extract_article
+
+PARAGRAPHS = "".join(
+    f"<p>Paragraph {number} of the council report, with figures, dates, and quotes "
+    f"from the meeting that explain the budget decision.</p>"
+    for number in range(6)
+)
+
+
+def test_webforms_page_keeps_article_inside_form():
+    html = (
+        "<html><body><form id='aspnetForm' method='post' action='./story.aspx'>"
+        "<input type='hidden' name='__VIEWSTATE' value='abc'>"
+        "<header><a href='/'>Home</a> <a href='/news'>News</a></header>"
+        "<nav><a href='/a'>Section A</a> <a href='/b'>Section B</a></nav>"
+        f"<div id='ctl00_body'>{PARAGRAPHS}</div>"
+        "<aside class='sidebar'><p>Subscribe to our newsletter for more stories like this one.</p></aside>"
+        "</form></body></html>"
+    )
+    markdown = extract_article(html).markdown
+    assert "Paragraph 0 of the council report" in markdown
+    assert "Paragraph 5 of the council report" in markdown
+    assert "Section A" not in markdown
+    assert "newsletter" not in markdown
+
+
+def test_article_inside_header_and_aside_wrappers_is_kept():
+    html = f"<body><header><div class='story'>{PARAGRAPHS}</div></header></body>"
+    assert "Paragraph 3 of the council report" in extract_article(html).markdown
+    html = f"<body><aside>{PARAGRAPHS}</aside><footer>Copyright</footer></body>"
+    markdown = extract_article(html).markdown
+    assert "Paragraph 3 of the council report" in markdown
+    assert "Copyright" not in markdown
+
+
+def test_layout_elements_outside_the_article_are_removed():
+    html = (
+        "<body><header><h2>Site header</h2></header>"
+        "<nav><a href='/a'>Section A</a></nav>"
+        f"<article>{PARAGRAPHS}<div class='share-bar'>Share this</div></article>"
+        "<aside><p>Related: another long story teaser that should not be kept here.</p></aside>"
+        "<form><p>Sign in to comment on this story and join the discussion.</p></form>"
+        "<footer>Copyright</footer></body>"
+    )
+    markdown = extract_article(html).markdown
+    assert "Paragraph 0 of the council report" in markdown
+    for junk in ("Site header", "Section A", "Share this", "Related", "Sign in", "Copyright"):
+        assert junk not in markdown
+
+
+def test_short_page_inside_layout_falls_back_to_unstripped_body():
+    html = "<body><form><header><h1>Opening hours</h1><p>Mon-Fri 9-5</p></header></form></body>"
+    markdown = extract_article(html).markdown
+    assert "Opening hours" in markdown
+    assert "Mon-Fri 9-5" in markdown
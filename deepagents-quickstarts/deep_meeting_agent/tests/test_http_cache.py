@@ -0,0 +1,96 @@
+import email.utils
+import time
+
+import httpx
+import pytest
+
+from research_agent import tools
+from research_agent.http_cache import CacheEntry, HTTPCache
+
+URL = "https://news.example.com/story"
+
+
+def _date(offset: float = 0.0) -> str:
+    return email.utils.formatdate(time.time() + offset, usegmt=True)
+
+
+def _entry(**headers: str) -> CacheEntry:
+    return CacheEntry(URL, {"date": _date(), **headers}, time.time(), "<p>cached</p>")
+
+
+def test_freshness_follows_cache_headers():
+    assert _entry(**{"cache-control": "max-age=60"}).lifetime() == 60
+    assert _entry(**{"cache-control": "no-cache, max-age=60"}).lifetime() == 0
+    assert _entry(expires=_date(120)).lifetime() == pytest.approx(120, abs=2)
+    assert _entry(expires="not a date").lifetime() == 0
+    # Heuristic: 10% of the time since the last modification, at most a day.
+    assert _entry(**{"last-modified": _date(-1000)}).lifetime() == pytest.approx(100, abs=2)
+    assert _entry(**{"last-modified": _date(-10**7)}).lifetime() == 86_400
+    assert _entry().lifetime() == 0
+
+
+def test_stale_entries_are_served_only_within_the_window():
+    stale = _entry(**{"cache-control": "max-age=0"})
+    assert stale.may_serve_stale(60)
+    assert not stale.may_serve_stale(60, now=time.time() + 120)
+    assert not _entry(**{"cache-control": "max-age=0, must-revalidate"}).may_serve_stale(60)
+    assert _entry(etag='"v1"', **{"last-modified": "x"}).validators() == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "x",
+    }
+
+
+def test_store_lookup_and_trim(tmp_path):
+    cache = HTTPCache(tmp_path, max_bytes=0)
+    cache.store(URL, httpx.Response(200, text="fresh", headers={"Cache-Control": "max-age=60"}))
+    entry = cache.lookup(URL)
+    assert entry.body == "fresh" and entry.headers["cache-control"] == "max-age=60"
+    assert cache.serve(entry) == "fresh"
+    assert cache.lookup("https://news.example.com/other") is None
+
+    private = httpx.Response(200, text="x", headers={"Cache-Control": "no-store"})
+    cache.store(URL + "?private", private)
+    assert cache.lookup(URL + "?private") is None
+    assert cache.stats.stores == 1 and cache.stats.hits == 1
+
+    cache.trim()
+    assert cache.lookup(URL) is None
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    """Serve one page with an ETag through a mock transport, recording requests."""
+    requests: list[httpx.Request] = []
+    pages = {"cache-control": "max-age=0"}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"', "Cache-Control": "max-age=0"})
+        return httpx.Response(200, text="<p>story</p>", headers={**pages, "ETag": '"v1"'})
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    cache = HTTPCache(tmp_path)
+    monkeypatch.setattr(tools, "get_client", lambda: client)
+    monkeypatch.setattr(tools, "get_cache", lambda: cache)
+    yield requests, pages, cache
+    client.close()
+
+
+def test_stale_page_is_revalidated_with_its_etag(site):
+    requests, _, cache = site
+    assert tools._fetch_html(URL, 5.0) == ("<p>story</p>", None)
+    assert tools._fetch_html(URL, 5.0) == ("<p>story</p>", None)
+    assert len(requests) == 2
+    assert "if-none-match" not in requests[0].headers
+    assert requests[1].headers["if-none-match"] == '"v1"'
+    assert cache.stats.revalidated == 1 and cache.stats.misses == 2
+
+
+def test_fresh_page_is_served_without_a_request(site):
+    requests, pages, cache = site
+    pages["cache-control"] = "max-age=600"
+    tools._fetch_html(URL, 5.0)
+    assert tools._fetch_html(URL, 5.0) == ("<p>story</p>", None)
+    assert len(requests) == 1
+    assert cache.stats.hits == 1
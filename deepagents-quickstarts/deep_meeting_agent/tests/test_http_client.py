@@ -0,0 +1,68 @@
+import asyncio
+
+import httpx
+import pytest
+
+from research_agent import http_client
+
+
+@pytest.fixture
+def mock_transport(monkeypatch):
+    """Route every pooled client through a mock transport and start from no clients."""
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, text=f"page {request.url.path}")
+
+    options = http_client._client_options
+    monkeypatch.setattr(
+        http_client,
+        "_client_options",
+        lambda: {**options(), "transport": httpx.MockTransport(handler)},
+    )
+    http_client.close_clients()
+    yield requests
+    http_client.close_clients()
+
+
+def test_blocking_client_is_shared_until_closed(mock_transport):
+    client = http_client.get_client()
+    assert http_client.get_client() is client
+    before = http_client.client_stats()["requests"]
+    assert client.get("https://news.example.com/a").text == "page /a"
+    client.get("https://news.example.com/b")
+    assert http_client.client_stats()["requests"] == before + 2
+    assert mock_transport[0].headers["user-agent"] == http_client.HEADERS["User-Agent"]
+
+    http_client.close_clients()
+    assert client.is_closed
+    assert http_client.get_client() is not client
+
+
+def test_async_client_is_shared_per_loop_and_closed_with_it(mock_transport):
+    async def scrape() -> httpx.AsyncClient:
+        client = http_client.get_async_client()
+        assert http_client.get_async_client() is client
+        await asyncio.gather(*(client.get(f"https://news.example.com/{n}") for n in range(3)))
+        return client
+
+    first = asyncio.run(scrape())
+    second = asyncio.run(scrape())
+    assert second is not first
+    assert first.is_closed and second.is_closed
+    assert len(mock_transport) == 6
+
+
+def test_close_clients_closes_idle_loop_clients(mock_transport):
+    loop = asyncio.new_event_loop()
+    try:
+        client = loop.run_until_complete(_get_async_client())
+        http_client.close_clients()
+        assert client.is_closed
+    finally:
+        loop.close()
+
+
+async def _get_async_client() -> httpx.AsyncClient:
+    return http_client.get_async_client()
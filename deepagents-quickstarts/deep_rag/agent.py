@@ -8,7 +8,10 @@ from langchain_openai import ChatOpenAI
 from research_agent.prompts import RESEARCH_WORKFLOW_INSTRUCTIONS
 from research_agent.tools import (
     list_uploaded_files,
+    query_uploaded_table,
     retrieve_uploaded_context,
+    retrieve_uploaded_context_batch,
+    start_upload_watcher,
     think_tool,
 )
 
@@ -28,8 +31,17 @@ model = ChatOpenAI(
     temperature=0.0,
 )
 
+# Index uploads in the background so queries right after an upload only pay for search.
+start_upload_watcher()
+
 agent = create_deep_agent(
     model=model,
-    tools=[list_uploaded_files, retrieve_uploaded_context, think_tool],
+    tools=[
+        list_uploaded_files,
+        retrieve_uploaded_context,
+        retrieve_uploaded_context_batch,
+        query_uploaded_table,
+        think_tool,
+    ],
     system_prompt=INSTRUCTIONS,
 )
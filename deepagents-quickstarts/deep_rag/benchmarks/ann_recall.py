@@ -0,0 +1,39 @@
+"""Print an IVF recall@k report for the index of an upload directory.
+
+Usage:
+    python benchmarks/ann_recall.py --upload-dir ../uploads --k 10 --nprobe 1 4 16
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from research_agent import tools  # noqa: E402
+from research_agent.ann import IVFIndex, recall_report  # noqa: E402
+
+
+def main() -> None:
+    """Train (or load) IVF centroids and compare them with exact search."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--upload-dir", type=Path, default=tools.DEFAULT_UPLOAD_DIR)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    store = tools._load_segment_store(args.upload_dir, None)
+    if not len(store) or not store.has_vectors:
+        raise SystemExit("No fully embedded index found; run a dense query first.")
+
+    index = IVFIndex(tools._get_index(args.upload_dir).root, min_rows=0)
+    if not index.ready:
+        index.maybe_train(store, background=False)
+    report = recall_report(store, index, args.k, args.nprobe, args.queries)
+    print(json.dumps(report, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Measure retrieval throughput of blocking, threaded and async tool calls under concurrency.
+
+Three ways of running ``retrieve_uploaded_context`` from one event loop are
+compared, with ``--concurrency`` calls in flight:
+
+- ``blocking``: ``invoke`` called on the loop, as a sync tool run inline would be.
+- ``threaded``: ``invoke`` in a worker thread, as LangGraph runs sync-only tools.
+- ``async``: ``ainvoke``, the tool's native coroutine.
+
+Result and query-embedding caches are disabled so every call embeds and searches.
+``--embed-latency-ms`` adds a fixed delay to each embedding request, standing in
+for a remote embedding service.
+
+Usage:
+    python benchmarks/async_throughput.py --upload-dir ../uploads --concurrency 1 4 16
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from research_agent import tools  # noqa: E402
+
+MODES = ("blocking", "threaded", "async")
+
+
+class LatencyEmbeddings(Embeddings):
+    """Delay every embedding request by a fixed number of seconds."""
+
+    def __init__(self, inner: Embeddings, delay: float) -> None:
+        """Wrap ``inner``, sleeping ``delay`` seconds before each request."""
+        self.inner = inner
+        self.delay = delay
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts after a blocking delay."""
+        time.sleep(self.delay)
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a query after a blocking delay."""
+        time.sleep(self.delay)
+        return self.inner.embed_query(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts after a non-blocking delay."""
+        await asyncio.sleep(self.delay)
+        return await self.inner.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """Embed a query after a non-blocking delay."""
+        await asyncio.sleep(self.delay)
+        return await self.inner.aembed_query(text)
+
+
+async def run_level(mode: str, concurrency: int, payloads: list[dict]) -> dict:
+    """Run every payload with at most ``concurrency`` calls in flight."""
+    tool = tools.retrieve_uploaded_context
+    gate = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def call(payload: dict) -> None:
+        async with gate:
+            started = time.perf_counter()
+            if mode == "async":
+                await tool.ainvoke(payload)
+            elif mode == "threaded":
+                await asyncio.to_thread(tool.invoke, payload)
+            else:
+                tool.invoke(payload)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call(payload) for payload in payloads))
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": len(payloads),
+        "requests_per_sec": round(len(payloads) / elapsed, 2),
+        "p50_ms": round(1000 * float(np.percentile(latencies, 50)), 2),
+        "p99_ms": round(1000 * float(np.percentile(latencies, 99)), 2),
+    }
+
+
+def main() -> None:
+    """Warm the index once, then time each mode at each concurrency level."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--upload-dir", type=Path, default=tools.DEFAULT_UPLOAD_DIR)
+    parser.add_argument("--query", default="What are the main findings?")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=0, help="per level; default 4x concurrency")
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0)
+    parser.add_argument("--search-mode", default=None)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    args = parser.parse_args()
+
+    if args.embed_latency_ms:
+        make_embeddings = tools._get_embeddings
+        delay = args.embed_latency_ms / 1000
+        tools._get_embeddings = lambda: LatencyEmbeddings(make_embeddings(), delay)
+    tools._results.maxsize = 0
+    tools._query_embeddings.maxsize = 0
+
+    payload = {"query": args.query, "upload_dir": str(args.upload_dir)}
+    if args.search_mode:
+        payload["search_mode"] = args.search_mode
+    tools.retrieve_uploaded_context.invoke(payload)
+
+    results = []
+    for concurrency in args.concurrency:
+        payloads = [dict(payload) for _ in range(args.requests or 4 * concurrency)]
+        for mode in args.modes:
+            results.append(asyncio.run(run_level(mode, concurrency, payloads)))
+    print(json.dumps(results, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
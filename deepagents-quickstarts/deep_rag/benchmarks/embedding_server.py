@@ -0,0 +1,150 @@
+"""Local stand-in for an OpenAI-compatible embeddings endpoint.
+
+Serves ``POST <base>/embeddings`` with vectors from the in-process hashing
+embedder, so benchmarks exercise the real HTTP client path (request batching,
+JSON and base64 decoding, connection reuse) without a model server. An optional
+fixed delay per request stands in for model latency.
+
+Usage:
+    python benchmarks/embedding_server.py --port 9000 --latency-ms 20
+    EMBEDDING_BASE_URL=http://127.0.0.1:9000/v1 EMBEDDING_MODEL=bench-hashing langgraph dev
+"""
+
+import argparse
+import base64
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from research_agent.embeddings import HashingEmbeddings  # noqa: E402
+
+
+class EmbeddingServer:
+    """Threaded HTTP server answering OpenAI embedding requests.
+
+    Use as a context manager; ``base_url`` is valid while it is running.
+    """
+
+    def __init__(
+        self, host: str = "127.0.0.1", port: int = 0, dim: int = 384, latency: float = 0.0
+    ) -> None:
+        """Bind the server; each request waits ``latency`` seconds before answering."""
+        self.embedder = HashingEmbeddings(dim)
+        self.latency = latency
+        self.requests = 0
+        self.inputs = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        """Return the OpenAI-style base URL, ending in ``/v1``."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: object) -> None:
+                return
+
+            def _reply(self, status: int, payload: dict) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length)
+                if not self.path.rstrip("/").endswith("/embeddings"):
+                    self._reply(404, {"error": {"message": f"No route {self.path}"}})
+                    return
+                try:
+                    status, payload = server.embed(json.loads(body))
+                except (ValueError, TypeError, AttributeError):
+                    status, payload = 400, {"error": {"message": "Invalid JSON body"}}
+                self._reply(status, payload)
+
+        return Handler
+
+    def embed(self, request: dict) -> tuple[int, dict]:
+        """Answer one decoded request body with ``(status, payload)``."""
+        texts = request.get("input")
+        if isinstance(texts, str):
+            texts = [texts]
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            return 400, {"error": {"message": "input must be a string or list of strings"}}
+        if self.latency:
+            time.sleep(self.latency)
+
+        vectors = np.asarray(self.embedder.embed_documents(texts), dtype="<f4")
+        as_base64 = request.get("encoding_format") == "base64"
+        data = [
+            {
+                "object": "embedding",
+                "index": i,
+                "embedding": (
+                    base64.b64encode(row.tobytes()).decode("ascii")
+                    if as_base64
+                    else row.tolist()
+                ),
+            }
+            for i, row in enumerate(vectors)
+        ]
+        with self._lock:
+            self.requests += 1
+            self.inputs += len(texts)
+        usage = {"prompt_tokens": 0, "total_tokens": 0}
+        return 200, {
+            "object": "list",
+            "data": data,
+            "model": request.get("model", ""),
+            "usage": usage,
+        }
+
+    def __enter__(self) -> "EmbeddingServer":
+        """Start serving on a daemon thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        """Stop serving and close the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def main() -> None:
+    """Serve embeddings until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with EmbeddingServer(args.host, args.port, args.dim, args.latency_ms / 1000) as server:
+        print(f"Serving embeddings at {server.base_url}", flush=True)  # noqa: T201
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
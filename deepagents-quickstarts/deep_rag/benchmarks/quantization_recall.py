@@ -0,0 +1,39 @@
+"""Print memory saved and recall@k lost by quantized search on an upload index.
+
+Usage:
+    python benchmarks/quantization_recall.py --upload-dir ../uploads --k 10 --rescore 1 4 16 64
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from research_agent import tools  # noqa: E402
+from research_agent.quantize import QUANTIZATIONS, quantization_report  # noqa: E402
+
+
+def main() -> None:
+    """Build int8 and binary codes and compare rescored search with exact search."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--upload-dir", type=Path, default=tools.DEFAULT_UPLOAD_DIR)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument(
+        "--kinds", nargs="+", choices=sorted(QUANTIZATIONS), default=["int8", "binary"]
+    )
+    parser.add_argument("--rescore", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    store = tools._load_segment_store(args.upload_dir, None)
+    if not len(store) or not store.has_vectors:
+        raise SystemExit("No fully embedded index found; run a dense query first.")
+
+    report = quantization_report(store, args.kinds, args.k, args.rescore, args.queries)
+    print(json.dumps(report, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""Benchmark ingestion, query latency, memory and recall on synthetic corpora.
+
+For each corpus size (``1MB`` up to ``10GB``) a deterministic synthetic corpus of
+markdown files is generated under ``--work-dir`` (and reused on later runs), then
+a fresh worker process measures, against a local stand-in embedding server
+(``benchmarks/embedding_server.py``):
+
+- ``cold_ingest_s``: ``_load_segment_store`` with an empty index.
+- ``warm_open_s``: reopening the index with nothing to embed.
+- ``incremental_ingest_s``: picking up ``--incremental-files`` new files.
+- ``query``: p50/p99 latency of ``retrieve_uploaded_context`` with result and
+  query-embedding caches disabled, so each call embeds and searches.
+- ``recall_at_k``: overlap of the configured dense path (exact, IVF or
+  quantized, per ``RAG_ANN``/``RAG_QUANTIZATION``) with an exact scan.
+- ``in_memory``: ``_load_text_files`` plus ``_build_vector_store`` for corpora
+  up to ``--in-memory-max``.
+- ``peak_rss_mb``: the worker's peak resident set size.
+
+Results are written as JSON (``--output``, default stdout) so runs can be
+compared over time.
+
+Usage:
+    python benchmarks/retrieval_suite.py --sizes 1MB 10MB 100MB --output bench.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from embedding_server import EmbeddingServer  # noqa: E402
+
+UNITS = {"B": 1, "KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30}
+MAX_FILE_BYTES = 1 << 20
+VOCAB_SIZE = 20_000
+TOPICS = 64
+TOPIC_WORDS = 40
+PARAGRAPH_WORDS = 120
+
+
+def parse_size(text: str) -> int:
+    """Parse a size such as ``512KB``, ``10MB`` or ``1GB`` into bytes; bare numbers are MB."""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([KMG]?B)?", text.strip().upper())
+    if match is None:
+        raise argparse.ArgumentTypeError(f"Invalid size: {text}")
+    return int(float(match.group(1)) * UNITS[match.group(2) or "MB"])
+
+
+def size_label(size: int) -> str:
+    """Render a byte count with the largest whole unit."""
+    for unit in ("GB", "MB", "KB"):
+        if size % UNITS[unit] == 0:
+            return f"{size // UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+class Corpus:
+    """Deterministic synthetic text with topical paragraphs.
+
+    Each paragraph mixes Zipf-distributed background words with words of one
+    topic, so queries built from topic words have a well-defined set of
+    relevant chunks.
+    """
+
+    def __init__(self, seed: int = 0) -> None:
+        """Draw the vocabulary and topic words from ``seed``."""
+        rng = np.random.default_rng(seed)
+        letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+        lengths = rng.integers(3, 10, VOCAB_SIZE)
+        self.vocab = np.array(
+            ["".join(rng.choice(letters, n)) for n in lengths], dtype=object
+        )
+        weights = np.cumsum(1.0 / np.arange(1, VOCAB_SIZE + 1))
+        self.background = weights / weights[-1]
+        self.topics = rng.choice(VOCAB_SIZE, (TOPICS, TOPIC_WORDS), replace=False)
+
+    def paragraphs(self, rng: np.random.Generator, count: int) -> list[str]:
+        """Return paragraphs with a third of each one's words from a random topic."""
+        shape = (count, PARAGRAPH_WORDS)
+        words = np.searchsorted(self.background, rng.random(shape))
+        topics = rng.integers(TOPICS, size=(count, 1))
+        topical = rng.random(shape) < 1 / 3
+        words[topical] = self.topics[topics, rng.integers(TOPIC_WORDS, size=shape)][topical]
+        return [" ".join(self.vocab[row]) for row in words]
+
+    def write_file(self, path: Path, size: int, seed: int) -> None:
+        """Write about ``size`` bytes of paragraphs to ``path``."""
+        rng = np.random.default_rng(seed)
+        written = 0
+        with path.open("w", encoding="utf-8") as handle:
+            while written < size:
+                for text in self.paragraphs(rng, 64):
+                    handle.write(text + "\n\n")
+                    written += len(text) + 2
+                    if written >= size:
+                        break
+
+    def queries(self, count: int, seed: int) -> list[str]:
+        """Return queries of four words from one topic each."""
+        rng = np.random.default_rng(seed)
+        return [
+            " ".join(self.vocab[rng.choice(self.topics[rng.integers(TOPICS)], 4, replace=False)])
+            for _ in range(count)
+        ]
+
+
+def ensure_corpus(root: Path, size: int) -> Path:
+    """Generate the corpus of ``size`` bytes under ``root`` unless it already exists."""
+    corpus_dir = root / f"corpus-{size_label(size)}"
+    marker = corpus_dir / ".complete"
+    if marker.exists():
+        return corpus_dir
+    shutil.rmtree(corpus_dir, ignore_errors=True)
+    corpus_dir.mkdir(parents=True)
+    corpus = Corpus()
+    file_size = max(1024, min(MAX_FILE_BYTES, size // 8))
+    for number in range(max(1, -(-size // file_size))):
+        corpus.write_file(corpus_dir / f"doc-{number:06d}.md", file_size, seed=number)
+    marker.write_text(json.dumps({"bytes": size, "file_bytes": file_size}))
+    return corpus_dir
+
+
+def percentiles(latencies: list[float]) -> dict:
+    """Summarize latencies in milliseconds."""
+    values = 1000 * np.asarray(latencies)
+    return {
+        "count": len(latencies),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "mean_ms": round(float(values.mean()), 3),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Return this process's peak resident set size in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return round(peak / (1 << 20) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def run_worker(args: argparse.Namespace) -> dict:
+    """Measure one corpus in this process and return its results."""
+    from langchain_openai import OpenAIEmbeddings
+
+    from research_agent import tools
+    from research_agent.vectorstore import top_k_indices
+
+    tools.EMBEDDING_MODEL = f"bench-hashing-{args.dim}"
+    tools.EMBEDDING_BASE_URL = args.base_url
+    # Send raw strings: the stand-in server does not accept token ids, and
+    # tiktoken would need to download its vocabulary.
+    tools._get_embeddings = lambda: OpenAIEmbeddings(
+        model=tools.EMBEDDING_MODEL,
+        base_url=args.base_url,
+        api_key="bench",
+        check_embedding_ctx_length=False,
+    )
+    tools._results.maxsize = 0
+    tools._query_embeddings.maxsize = 0
+
+    corpus_dir = Path(args.corpus)
+    shutil.rmtree(corpus_dir / ".rag_index", ignore_errors=True)
+    for stale in corpus_dir.glob("incoming-*.md"):
+        stale.unlink()
+    result: dict = {"size": size_label(args.size), "bytes": args.size}
+
+    started = time.perf_counter()
+    store = tools._load_segment_store(corpus_dir, tools._get_embeddings())
+    result["cold_ingest_s"] = round(time.perf_counter() - started, 3)
+    result["files"] = len(store.segments)
+    result["chunks"] = len(store)
+
+    started = time.perf_counter()
+    tools._load_segment_store(corpus_dir, tools._get_embeddings())
+    result["warm_open_s"] = round(time.perf_counter() - started, 3)
+
+    corpus = Corpus()
+    file_size = json.loads((corpus_dir / ".complete").read_text())["file_bytes"]
+    for number in range(args.incremental_files):
+        path = corpus_dir / f"incoming-{number:04d}.md"
+        corpus.write_file(path, file_size, seed=10_000_000 + number)
+    started = time.perf_counter()
+    store = tools._load_segment_store(corpus_dir, tools._get_embeddings())
+    result["incremental_ingest_s"] = round(time.perf_counter() - started, 3)
+    result["incremental_files"] = args.incremental_files
+
+    queries = corpus.queries(args.queries, seed=1)
+    payload = {"upload_dir": str(corpus_dir), "top_k": args.k}
+    if args.search_mode:
+        payload["search_mode"] = args.search_mode
+    tools.retrieve_uploaded_context.invoke({**payload, "query": queries[0]})
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        tools.retrieve_uploaded_context.invoke({**payload, "query": query})
+        latencies.append(time.perf_counter() - started)
+    result["query"] = {
+        "search_mode": args.search_mode or tools.RAG_SEARCH_MODE,
+        **percentiles(latencies),
+    }
+
+    ann = tools._get_ann(corpus_dir)
+    if ann is not None:
+        ann.maybe_train(store, background=False)
+    if ann is not None and ann.ready:
+        dense_path = "ivf"
+    else:
+        ann = None
+        dense_path = tools.RAG_QUANTIZATION or "exact"
+    vectors = np.asarray(store.embedding.embed_documents(queries), dtype=np.float32)
+    recalls = []
+    for query, vector in zip(queries, vectors):
+        found = tools._rank_rows(store, query, args.k, "dense", ann, query_vector=vector)
+        scores = store.scores(vector)
+        exact = top_k_indices(scores, args.k)
+        truth = set(exact[np.isfinite(scores[exact])].tolist())
+        recalls.append(len(truth & set(found)) / len(truth) if truth else 1.0)
+    result["recall_at_k"] = {
+        "k": args.k,
+        "dense_path": dense_path,
+        "recall": round(float(np.mean(recalls)), 4),
+    }
+
+    if args.size <= args.in_memory_max:
+        embeddings = tools._get_embeddings()
+        started = time.perf_counter()
+        docs = tools._load_text_files(corpus_dir)
+        loaded = time.perf_counter()
+        tools._build_vector_store(docs, embeddings=embeddings)
+        built = time.perf_counter()
+        result["in_memory"] = {
+            "load_text_files_s": round(loaded - started, 3),
+            "build_vector_store_s": round(built - loaded, 3),
+        }
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def main() -> None:
+    """Generate corpora, start the embedding server and run one worker per size."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=parse_size, nargs="+", default=[1 << 20, 10 << 20, 100 << 20]
+    )
+    parser.add_argument("--work-dir", type=Path, default=Path("bench-corpora"))
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--search-mode", default=None)
+    parser.add_argument("--incremental-files", type=int, default=1)
+    parser.add_argument("--in-memory-max", type=parse_size, default="10MB")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--corpus", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        logging.basicConfig(level=logging.WARNING)
+        print(json.dumps(run_worker(args)))  # noqa: T201
+        return
+
+    runs = []
+    with EmbeddingServer(dim=args.dim, latency=args.embed_latency_ms / 1000) as server:
+        for size in args.sizes:
+            started = time.perf_counter()
+            corpus_dir = ensure_corpus(args.work_dir, size)
+            generated = round(time.perf_counter() - started, 3)
+            command = [
+                sys.executable,
+                __file__,
+                "--worker",
+                f"--corpus={corpus_dir}",
+                f"--size={size}",
+                f"--base-url={server.base_url}",
+                f"--queries={args.queries}",
+                f"--k={args.k}",
+                f"--incremental-files={args.incremental_files}",
+                f"--in-memory-max={args.in_memory_max}B",
+                f"--dim={args.dim}",
+            ]
+            if args.search_mode:
+                command.append(f"--search-mode={args.search_mode}")
+            # One process per size, so peak RSS and module-level caches are per corpus.
+            output = subprocess.run(command, check=True, capture_output=True, text=True)
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            result["generate_s"] = generated
+            runs.append(result)
+            print(f"{result['size']}: done", file=sys.stderr)  # noqa: T201
+        requests = server.requests
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {
+            "embedding_dim": args.dim,
+            "embed_latency_ms": args.embed_latency_ms,
+            "queries": args.queries,
+            "k": args.k,
+            "embedding_requests": requests,
+            **{
+                name: os.getenv(name, "")
+                for name in ("RAG_SEARCH_MODE", "RAG_ANN", "RAG_QUANTIZATION", "RAG_VECTOR_DTYPE")
+            },
+        },
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -11,13 +11,17 @@ from research_agent.prompts import (
 )
 from research_agent.tools import (
     list_uploaded_files,
+    query_uploaded_table,
     retrieve_uploaded_context,
+    retrieve_uploaded_context_batch,
     think_tool,
 )
 
 __all__ = [
     "list_uploaded_files",
+    "query_uploaded_table",
     "retrieve_uploaded_context",
+    "retrieve_uploaded_context_batch",
     "think_tool",
     "RESEARCHER_INSTRUCTIONS",
     "RESEARCH_WORKFLOW_INSTRUCTIONS",
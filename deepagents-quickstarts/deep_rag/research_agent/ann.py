@@ -0,0 +1,320 @@
+"""Inverted-file (IVF) approximate nearest-neighbour index over segments.
+
+Centroids are trained with spherical k-means on a sample of stored vectors in a
+background thread, which also buckets every segment's rows by nearest centroid
+before publishing the centroids; until then, callers keep using exact search.
+Buckets are saved in a ``<stem>.ivf`` sidecar, and a segment committed later is
+bucketed by the ingest that commits it (``add_segment``), so new files are
+added incrementally without touching existing ones and queries never assign
+rows themselves. A segment with no buckets yet (committed while centroids were
+being trained) is scanned exactly and bucketed in the background. A query
+scores only the rows in the ``nprobe`` closest buckets: raising ``nprobe``
+trades latency for recall.
+
+``recall_report`` measures recall@k against exact search for a range of
+``nprobe`` values; ``benchmarks/ann_recall.py`` runs it on an upload index.
+"""
+
+import hashlib
+import io
+import json
+import math
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Collection, Sequence
+
+import numpy as np
+
+from research_agent.segments import (
+    Segment,
+    TextSegment,
+    on_segment_delete,
+    write_atomic,
+)
+from research_agent.vectorstore import SegmentStore, normalize_rows, top_k_indices
+
+KMEANS_ITERATIONS = 10
+TRAIN_POINTS_PER_LIST = 64
+RETRAIN_GROWTH = 4.0
+
+
+def spherical_kmeans(
+    vectors: np.ndarray, nlist: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0
+) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity and return unit centroids."""
+    rng = np.random.default_rng(seed)
+    nlist = max(1, min(nlist, vectors.shape[0]))
+    centroids = vectors[rng.choice(vectors.shape[0], nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        empty = ~sums.any(axis=1)
+        if empty.any():
+            # Re-seed empty lists so every centroid keeps covering some data.
+            sums[empty] = vectors[rng.choice(vectors.shape[0], int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids.astype(np.float32)
+
+
+_live_indexes: "weakref.WeakSet[IVFIndex]" = weakref.WeakSet()
+
+
+@on_segment_delete
+def _forget_buckets(stem: Path) -> None:
+    for index in list(_live_indexes):
+        with index._lock:
+            index._buckets.pop(str(stem), None)
+            index._unbucketed.pop(str(stem), None)
+
+
+class IVFIndex:
+    """IVF index shared by every query against one upload index root."""
+
+    def __init__(self, root: Path, nprobe: int = 8, min_rows: int = 50_000) -> None:
+        """Open the IVF state under ``root``; training waits for ``min_rows`` rows."""
+        self.root = Path(root)
+        self.nprobe = nprobe
+        self.min_rows = min_rows
+        self.state: tuple[str, np.ndarray] | None = None
+        self.trained_rows = 0
+        self._buckets: dict[str, tuple[str, np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self._training: threading.Thread | None = None
+        self._unbucketed: dict[str, Segment] = {}
+        self._bucketing: threading.Thread | None = None
+        _live_indexes.add(self)
+        self._load()
+
+    @property
+    def ready(self) -> bool:
+        """Return True once centroids are available for approximate search."""
+        return self.state is not None
+
+    def _load(self) -> None:
+        try:
+            state = json.loads((self.root / "ann" / "current.json").read_text("utf-8"))
+            centroids = np.load(self.root / "ann" / f"centroids-{state['version']}.npy")
+        except (OSError, ValueError, KeyError):
+            return
+        self.state = (state["version"], centroids)
+        self.trained_rows = int(state.get("trained_rows", 0))
+
+    def maybe_train(self, store: SegmentStore, background: bool = True) -> None:
+        """Start (re)training when the corpus is large enough or has grown a lot."""
+        rows = len(store)
+        if rows < self.min_rows or not store.has_vectors:
+            return
+        if self.ready and rows < self.trained_rows * RETRAIN_GROWTH:
+            return
+        with self._lock:
+            if self._training is not None and self._training.is_alive():
+                return
+            if background:
+                self._training = threading.Thread(
+                    target=self._train, args=(store, rows), daemon=True
+                )
+                self._training.start()
+                return
+        self._train(store, rows)
+
+    def _sample(self, store: SegmentStore) -> np.ndarray:
+        nlist = self._nlist(len(store))
+        size = min(len(store), nlist * TRAIN_POINTS_PER_LIST)
+        rows = np.sort(np.random.default_rng(0).choice(len(store), size, replace=False))
+        sample = np.empty((size, store.segments[0].dim), dtype=np.float32)
+        seg_ids = np.searchsorted(store.starts, rows, side="right") - 1
+        for seg_idx in np.unique(seg_ids):
+            mask = seg_ids == seg_idx
+            local = rows[mask] - store.segment_start(int(seg_idx))
+            sample[mask] = store.segments[seg_idx].vectors[local]
+        return sample
+
+    @staticmethod
+    def _nlist(rows: int) -> int:
+        return max(1, min(65_536, int(4 * math.sqrt(rows))))
+
+    def _train(self, store: SegmentStore, rows: int) -> None:
+        centroids = spherical_kmeans(self._sample(store), self._nlist(rows))
+        version = hashlib.sha256(centroids.tobytes()).hexdigest()[:16]
+        buckets = {
+            str(segment.stem): (version, *self._assign(segment, version, centroids))
+            for segment in store.segments
+            if isinstance(segment, Segment)
+        }
+        ann_dir = self.root / "ann"
+        ann_dir.mkdir(parents=True, exist_ok=True)
+        buffer = io.BytesIO()
+        np.save(buffer, centroids)
+        write_atomic(ann_dir / f"centroids-{version}.npy", buffer.getvalue())
+        state = {"version": version, "trained_rows": rows, "nlist": int(centroids.shape[0])}
+        write_atomic(ann_dir / "current.json", json.dumps(state).encode("utf-8"))
+        for stale in ann_dir.glob("centroids-*.npy"):
+            if stale.name != f"centroids-{version}.npy":
+                stale.unlink(missing_ok=True)
+        with self._lock:
+            self.state, self.trained_rows = (version, centroids), rows
+            self._buckets = buckets
+
+    @staticmethod
+    def _assign(
+        segment: Segment, version: str, centroids: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Bucket a segment's rows by nearest centroid and save the ``.ivf`` sidecar."""
+        assign = np.argmax(np.asarray(segment.vectors, dtype=np.float32) @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable").astype(np.int32)
+        bounds = np.searchsorted(assign[order], np.arange(centroids.shape[0] + 1))
+        buffer = io.BytesIO()
+        np.savez(buffer, version=version, order=order, bounds=bounds)
+        try:
+            write_atomic(segment.stem.with_suffix(".ivf"), buffer.getvalue())
+        except OSError:
+            pass
+        return order, bounds
+
+    def _cached_buckets(
+        self, segment: Segment, version: str
+    ) -> tuple[np.ndarray, np.ndarray] | None:
+        """Return a segment's buckets from memory or its sidecar, without computing them."""
+        key = str(segment.stem)
+        cached = self._buckets.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+        try:
+            with np.load(segment.stem.with_suffix(".ivf")) as data:
+                if str(data["version"]) != version:
+                    return None
+                order, bounds = data["order"], data["bounds"]
+        except (OSError, ValueError, KeyError):
+            return None
+        self._buckets[key] = (version, order, bounds)
+        return order, bounds
+
+    def buckets(
+        self, segment: Segment, state: tuple[str, np.ndarray]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return ``(rows ordered by list, list bounds)`` for a segment.
+
+        Buckets are computed once per segment and centroid version, then reused
+        from memory or the segment's ``.ivf`` sidecar.
+        """
+        version, centroids = state
+        found = self._cached_buckets(segment, version)
+        if found is None:
+            found = self._assign(segment, version, centroids)
+            self._buckets[str(segment.stem)] = (version, *found)
+        return found
+
+    def add_segment(self, segment: Segment) -> None:
+        """Bucket a newly committed segment, if centroids are trained."""
+        state = self.state
+        if state is not None:
+            self.buckets(segment, state)
+
+    def _bucket_later(self, segment: Segment) -> None:
+        """Queue a segment for bucketing on a background thread."""
+        with self._lock:
+            self._unbucketed[str(segment.stem)] = segment
+            if self._bucketing is not None and self._bucketing.is_alive():
+                return
+            self._bucketing = threading.Thread(target=self._drain_unbucketed, daemon=True)
+            self._bucketing.start()
+
+    def _drain_unbucketed(self) -> None:
+        while True:
+            with self._lock:
+                if not self._unbucketed:
+                    self._bucketing = None
+                    return
+                _, segment = self._unbucketed.popitem()
+            self.add_segment(segment)
+
+    def search(
+        self,
+        store: SegmentStore,
+        embedding: Sequence[float] | np.ndarray,
+        k: int,
+        nprobe: int | None = None,
+        segments: Collection[int] | None = None,
+    ) -> np.ndarray:
+        """Return approximate top-k global row ids for an embedding, best first.
+
+        With ``segments``, only rows of those segments are considered.
+        """
+        state = self.state
+        query = normalize_rows(np.asarray(embedding, dtype=np.float32))
+        probe = top_k_indices(state[1] @ query, nprobe or self.nprobe)
+        allowed = set(segments) if segments is not None else None
+        rows: list[np.ndarray] = []
+        scores: list[np.ndarray] = []
+        for seg_idx, segment in enumerate(store.segments):
+            if isinstance(segment, TextSegment):
+                continue
+            if allowed is not None and seg_idx not in allowed:
+                continue
+            found = self._cached_buckets(segment, state[0])
+            if found is None:
+                self._bucket_later(segment)
+                local = np.arange(len(segment))
+            else:
+                order, bounds = found
+                local = np.concatenate([order[bounds[c] : bounds[c + 1]] for c in probe])
+            if not local.size:
+                continue
+            local.sort()
+            scores.append(np.asarray(segment.vectors[local] @ query, dtype=np.float32))
+            rows.append(store.segment_start(seg_idx) + local.astype(np.int64))
+        if not rows:
+            return np.empty(0, dtype=np.int64)
+        all_rows, all_scores = np.concatenate(rows), np.concatenate(scores)
+        return all_rows[top_k_indices(all_scores, k)]
+
+
+def recall_report(
+    store: SegmentStore,
+    index: IVFIndex,
+    k: int = 10,
+    nprobes: Sequence[int] = (1, 2, 4, 8, 16, 32),
+    queries: int = 100,
+    seed: int = 0,
+) -> dict:
+    """Measure recall@k and latency of IVF search against exact search.
+
+    Query vectors are sampled from stored chunks, so no embedding calls are made.
+    """
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(store), min(queries, len(store)), replace=False)
+    vectors = []
+    for row in picks:
+        seg_idx, local = store.locate(int(row))
+        vectors.append(np.asarray(store.segments[seg_idx].vectors[local], dtype=np.float32))
+
+    started = time.perf_counter()
+    exact = [set(top_k_indices(store.scores(v), k).tolist()) for v in vectors]
+    exact_ms = 1000 * (time.perf_counter() - started) / len(vectors)
+
+    # Bucket every segment up front so the first setting is not charged for it.
+    for segment in store.segments:
+        index.buckets(segment, index.state)
+
+    results = []
+    for nprobe in nprobes:
+        started = time.perf_counter()
+        found = [index.search(store, v, k, nprobe=nprobe) for v in vectors]
+        latency_ms = 1000 * (time.perf_counter() - started) / len(vectors)
+        recall = np.mean([len(truth & set(f.tolist())) / len(truth) for truth, f in zip(exact, found)])
+        results.append(
+            {"nprobe": nprobe, "recall": round(float(recall), 4), "latency_ms": round(latency_ms, 3)}
+        )
+
+    return {
+        "rows": len(store),
+        "nlist": int(index.state[1].shape[0]),
+        "k": k,
+        "queries": len(vectors),
+        "exact_latency_ms": round(exact_ms, 3),
+        "results": results,
+    }
+
@@ -0,0 +1,179 @@
+"""BM25 inverted index over uploaded-file chunks."""
+
+import json
+import math
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from research_agent.segments import (
+    Segment,
+    TextSegment,
+    on_segment_delete,
+    write_atomic,
+)
+
+# Keep identifiers such as ``ERR-4012``, ``v1.2.3`` or ``user_id`` as one token.
+TOKEN_PATTERN = re.compile(r"\w+(?:[.\-:/]\w+)*")
+
+_postings_cache: dict[str, "Postings"] = {}
+_postings_lock = threading.Lock()
+
+
+@on_segment_delete
+def _forget_postings(stem: Path) -> None:
+    with _postings_lock:
+        _postings_cache.pop(str(stem), None)
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase terms."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class Postings:
+    """Term postings and document lengths for one block of chunks."""
+
+    def __init__(
+        self, lengths: np.ndarray, terms: dict[str, tuple[np.ndarray, np.ndarray]]
+    ) -> None:
+        """Wrap per-row document lengths and per-term row ids and frequencies."""
+        self.lengths = lengths
+        self.terms = terms
+
+    def __len__(self) -> int:
+        """Return the number of rows in the block."""
+        return int(self.lengths.shape[0])
+
+    @classmethod
+    def from_texts(cls, texts: Sequence[str]) -> "Postings":
+        """Tokenize ``texts`` and build postings with local row ids."""
+        lengths = np.zeros(len(texts), dtype=np.int32)
+        rows: dict[str, list[int]] = {}
+        freqs: dict[str, list[int]] = {}
+        for row, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths[row] = sum(counts.values())
+            for term, tf in counts.items():
+                rows.setdefault(term, []).append(row)
+                freqs.setdefault(term, []).append(tf)
+        terms = {
+            term: (np.asarray(rows[term], dtype=np.int32), np.asarray(freqs[term], dtype=np.float32))
+            for term in rows
+        }
+        return cls(lengths, terms)
+
+    def to_json(self) -> str:
+        """Serialize postings for a segment sidecar file."""
+        return json.dumps(
+            {
+                "lengths": self.lengths.tolist(),
+                "terms": {
+                    term: [rows.tolist(), tfs.astype(np.int32).tolist()]
+                    for term, (rows, tfs) in self.terms.items()
+                },
+            }
+        )
+
+    @classmethod
+    def from_json(cls, payload: str) -> "Postings":
+        """Load postings written by ``to_json``."""
+        data = json.loads(payload)
+        terms = {
+            term: (np.asarray(rows, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            for term, (rows, tfs) in data["terms"].items()
+        }
+        return cls(np.asarray(data["lengths"], dtype=np.int32), terms)
+
+
+def load_postings(segment: Segment | TextSegment) -> Postings:
+    """Return postings for a segment, building and persisting them on first use.
+
+    Postings for an on-disk segment are stored in a ``.bm25`` sidecar next to it.
+    Segments are immutable, so the sidecar is written once and cached in-process.
+    """
+    if segment.stem is None:
+        return Postings.from_texts(segment.texts())
+
+    key = str(segment.stem)
+    with _postings_lock:
+        cached = _postings_cache.get(key)
+    if cached is not None:
+        return cached
+
+    sidecar = segment.stem.with_suffix(".bm25")
+    try:
+        postings = Postings.from_json(sidecar.read_text("utf-8"))
+    except (OSError, ValueError, KeyError):
+        postings = Postings.from_texts(segment.texts())
+        try:
+            write_atomic(sidecar, postings.to_json().encode("utf-8"))
+        except OSError:
+            pass
+
+    with _postings_lock:
+        return _postings_cache.setdefault(key, postings)
+
+
+class BM25Index:
+    """Okapi BM25 scorer over a sequence of postings blocks.
+
+    Blocks are appended in the same order as segments in a ``SegmentStore``, so
+    row ids line up with dense search. Adding a file only adds its block;
+    collection statistics are combined per query term at search time.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        """Create an empty index with the BM25 ``k1`` and ``b`` parameters."""
+        self.k1 = k1
+        self.b = b
+        self.blocks: list[tuple[int, Postings]] = []
+        self._size = 0
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        """Return the number of rows across all blocks."""
+        return self._size
+
+    def add(self, postings: Postings) -> None:
+        """Append a block of postings after the existing rows."""
+        if not len(postings):
+            return
+        self.blocks.append((self._size, postings))
+        self._size += len(postings)
+        self._total_length += int(postings.lengths.sum())
+
+    def scores(self, query: str) -> np.ndarray:
+        """Return BM25 scores for every row against ``query``."""
+        scores = np.zeros(self._size, dtype=np.float32)
+        if not self._size:
+            return scores
+
+        avg_length = max(self._total_length / self._size, 1.0)
+        for term in set(tokenize(query)):
+            hits = [
+                (start, postings, postings.terms[term])
+                for start, postings in self.blocks
+                if term in postings.terms
+            ]
+            df = sum(rows.shape[0] for _, _, (rows, _) in hits)
+            if not df:
+                continue
+            idf = math.log(1.0 + (self._size - df + 0.5) / (df + 0.5))
+            for start, postings, (rows, tfs) in hits:
+                norm = self.k1 * (1.0 - self.b + self.b * postings.lengths[rows] / avg_length)
+                scores[start + rows] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+        return scores
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> list[int]:
+    """Fuse ranked row lists with reciprocal rank fusion, best first."""
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking):
+            fused[int(row)] = fused.get(int(row), 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused, key=lambda row: (-fused[row], row))
@@ -0,0 +1,91 @@
+"""Bounded LRU caches for query embeddings and retrieval results."""
+
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Hashable, TypeVar
+
+V = TypeVar("V")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Normalize a query for cache lookups: NFKC, case-folded, single-spaced."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with hit/miss counters.
+
+    A ``maxsize`` of 0 disables caching: every lookup is a miss and nothing is
+    stored.
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        """Create an empty cache holding at most ``maxsize`` entries."""
+        self.maxsize = max(0, maxsize)
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, object] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of cached entries."""
+        return len(self._data)
+
+    def get(self, key: Hashable, default: object = None) -> object:
+        """Return the cached value for ``key`` and mark it recently used."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: object) -> None:
+        """Store ``value``, evicting the least recently used entry when full."""
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], V]) -> V:
+        """Return the cached value for ``key``, computing and storing it on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop entries whose key matches ``predicate``; return how many."""
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                del self._data[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict[str, float]:
+        """Return size, hit and miss counts, and the hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,73 @@
+"""Streaming chunker for uploaded files."""
+
+import codecs
+from pathlib import Path
+from typing import Iterator
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from research_agent.tables import TABLE_SUFFIXES, iter_row_chunks
+
+READ_BLOCK_BYTES = 64 * 1024
+
+
+def _piece_start(text: str, chunk_start: int) -> int:
+    """Move a stripped chunk start back to the newline separator that opened it."""
+    start = chunk_start
+    while start > 0 and text[start - 1].isspace():
+        start -= 1
+    newline = text.find("\n", start, chunk_start)
+    return newline if newline != -1 else chunk_start
+
+
+def chunk_format(path: Path) -> str:
+    """Name how a file is chunked: ``"rows"`` for CSV/JSON tables, else ``"text"``."""
+    return "rows" if Path(path).suffix.lower() in TABLE_SUFFIXES else "text"
+
+
+def iter_file_chunks(
+    path: Path,
+    chunk_size: int = 800,
+    chunk_overlap: int = 200,
+    block_bytes: int = READ_BLOCK_BYTES,
+) -> Iterator[str]:
+    """Yield ``RecursiveCharacterTextSplitter`` chunks of a file without reading it whole.
+
+    The file is decoded incrementally and split over a sliding window. Every
+    chunk but the last in the window is emitted, and the window restarts at the
+    separator that opens the last chunk, so chunk size and overlap behave as in
+    a whole-file split. Boundaries can differ slightly from a whole-file split
+    near window seams (one per ``block_bytes``), since the splitter picks
+    separators from the text it sees. Peak memory is one read block plus
+    roughly one chunk, regardless of file size.
+
+    CSV and JSON files that hold records are chunked by whole rows instead (see
+    ``research_agent.tables.iter_row_chunks``); ``chunk_overlap`` does not apply.
+    """
+    if chunk_format(path) == "rows":
+        rows = iter_row_chunks(Path(path), chunk_size)
+        if rows is not None:
+            yield from rows
+            return
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
+    )
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    carry = ""
+    with open(path, "rb") as handle:
+        while True:
+            block = handle.read(block_bytes)
+            window = carry + decoder.decode(block, final=not block)
+            if not block:
+                if window.strip():
+                    yield from splitter.split_text(window)
+                return
+
+            docs = splitter.create_documents([window])
+            if len(docs) < 2:
+                carry = window if docs else ""
+                continue
+            for doc in docs[:-1]:
+                yield doc.page_content
+            carry = window[_piece_start(window, docs[-1].metadata["start_index"]) :]
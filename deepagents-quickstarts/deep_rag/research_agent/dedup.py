@@ -0,0 +1,419 @@
+"""Exact and near-duplicate chunk detection with content hashes and MinHash/LSH.
+
+Every chunk gets a fingerprint: a digest of its whitespace-normalized text for
+exact matches, and a MinHash signature over word shingles whose agreement rate
+estimates Jaccard similarity for near matches. Signatures are split into LSH
+bands so that candidate near-duplicates are found by hash lookups instead of
+pairwise comparison; candidates are then confirmed against ``threshold``.
+
+Fingerprints of a segment are saved in a ``<stem>.mh`` sidecar and kept in a
+bounded LRU of ``FINGERPRINT_CACHE_SEGMENTS`` segments. Ingestion uses
+``DuplicateIndex`` to reuse the embedding of a chunk that was already embedded,
+and retrieval uses ``collapse_rows`` to show each duplicated chunk once with
+all of its sources.
+
+``DuplicateIndex`` holds no Python object per chunk: each registered block
+becomes sorted numpy arrays of 64-bit digest and band hashes (about 120 bytes
+per chunk), and signatures are read back from the sidecars only to confirm
+band candidates.
+"""
+
+import hashlib
+import io
+import re
+import threading
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Hashable, Iterable, Sequence
+
+import numpy as np
+
+from research_agent.cache import LRUCache
+from research_agent.segments import (
+    Segment,
+    TextSegment,
+    on_segment_delete,
+    write_atomic,
+)
+from research_agent.vectorstore import SegmentStore
+
+NUM_PERM = 64
+BANDS = 8
+SHINGLE_WORDS = 3
+FINGERPRINT_CACHE_SEGMENTS = 256
+MAX_BAND_CANDIDATES = 32  # per band and run; many-way repeats need only a few
+FINGERPRINT_VERSION = 2  # bumped whenever signatures change; older sidecars are recomputed
+_MERSENNE = (1 << 61) - 1
+
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(1, _MERSENNE, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, _MERSENNE, NUM_PERM, dtype=np.uint64)
+_PERM_A_HI = (_PERM_A >> np.uint64(31))[:, None]
+_PERM_A_LO = (_PERM_A & np.uint64((1 << 31) - 1))[:, None]
+_WORD = re.compile(r"\w+")
+_BAND_MIX = np.array(
+    [0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93],
+    dtype=np.uint64,
+)
+
+_fingerprint_cache = LRUCache(FINGERPRINT_CACHE_SEGMENTS)
+
+
+@on_segment_delete
+def _forget_fingerprints(stem: Path) -> None:
+    _fingerprint_cache.invalidate(lambda key: key == str(stem))
+
+
+def chunk_digest(text: str) -> bytes:
+    """Return a 16-byte digest of a chunk with whitespace differences ignored."""
+    return hashlib.blake2b(" ".join(text.split()).encode("utf-8"), digest_size=16).digest()
+
+
+def _permute(hashes: np.ndarray) -> np.ndarray:
+    """Return ``(a * x + b) mod (2**61 - 1)`` for every permutation and 32-bit hash.
+
+    ``a`` and ``b`` are full-width 61-bit factors, so the product can reach 93
+    bits; ``a`` is split into 30 high and 31 low bits and the high partial
+    product is folded with ``2**61 = 1 (mod p)``, keeping every term in uint64.
+    """
+    x = hashes[None, :]
+    low = _PERM_A_LO * x  # < 2**62
+    high = _PERM_A_HI * x  # < 2**62, scaled by 2**31
+    folded = (high >> np.uint64(30)) + ((high & np.uint64((1 << 30) - 1)) << np.uint64(31))
+    return (low + folded + _PERM_B[:, None]) % np.uint64(_MERSENNE)
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """Return the MinHash signature of a chunk's lowercase word shingles.
+
+    Each of the ``NUM_PERM`` minima is stored as its low 32 bits; distinct
+    minima collide with probability 2**-32.
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        words = words + [""] * (SHINGLE_WORDS - len(words))
+    shingles = {
+        " ".join(words[i : i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    return _permute(hashes).min(axis=1).astype(np.uint32)
+
+
+def fingerprint(texts: Sequence[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Return ``(digests, signatures)`` arrays for a block of chunks.
+
+    Digests are a ``(n, 16)`` uint8 array; ``digests[row].tobytes()`` is the
+    digest of one chunk.
+    """
+    digests = np.frombuffer(
+        b"".join(chunk_digest(text) for text in texts), dtype=np.uint8
+    ).reshape(len(texts), 16)
+    signatures = np.zeros((len(texts), NUM_PERM), dtype=np.uint32)
+    for row, text in enumerate(texts):
+        signatures[row] = minhash_signature(text)
+    return digests, signatures
+
+
+def similarity(left: np.ndarray, right: np.ndarray) -> float:
+    """Estimate the Jaccard similarity of two chunks from their signatures."""
+    return float(np.mean(left == right))
+
+
+def digest_keys(digests: np.ndarray) -> np.ndarray:
+    """Return the first 8 bytes of each ``(n, 16)`` digest as uint64 lookup keys."""
+    return np.ascontiguousarray(digests, dtype=np.uint8).view(np.uint64)[:, 0].copy()
+
+
+def band_keys(signatures: np.ndarray) -> np.ndarray:
+    """Hash each LSH band of a ``(n, NUM_PERM)`` signature block to a uint64: ``(n, BANDS)``."""
+    words = np.ascontiguousarray(signatures, dtype=np.uint32).view(np.uint64)
+    words = words.reshape(len(signatures), BANDS, -1)
+    return (words * _BAND_MIX[: words.shape[2]]).sum(axis=2, dtype=np.uint64)
+
+
+def earlier_duplicates(
+    digests: np.ndarray, signatures: np.ndarray, threshold: float = 0.9
+) -> np.ndarray:
+    """Return, per chunk of a block, the position of an earlier duplicate in it or -1."""
+    keys, bands = digest_keys(digests).tolist(), band_keys(signatures).tolist()
+    found = np.full(len(keys), -1, dtype=np.int64)
+    exact: dict[int, int] = {}
+    tables: list[dict[int, list[int]]] = [{} for _ in range(BANDS)]
+    for pos, key in enumerate(keys):
+        if key in exact:
+            found[pos] = exact[key]
+            continue
+        exact[key] = pos
+        if threshold >= 1:
+            continue
+        best, best_score = -1, threshold
+        for table, band in zip(tables, bands[pos]):
+            for other in table.get(band, ()):
+                score = similarity(signatures[pos], signatures[other])
+                if score >= best_score:
+                    best, best_score = other, score
+            table.setdefault(band, []).append(pos)
+        found[pos] = best
+    return found
+
+
+def save_fingerprints(segment: Segment, digests: np.ndarray, signatures: np.ndarray) -> None:
+    """Write fingerprints computed during ingestion to the segment's sidecar."""
+    buffer = io.BytesIO()
+    np.savez(buffer, digests=digests, signatures=signatures, version=FINGERPRINT_VERSION)
+    try:
+        write_atomic(segment.stem.with_suffix(".mh"), buffer.getvalue())
+    except OSError:
+        return
+    _fingerprint_cache.put(str(segment.stem), (digests, signatures))
+
+
+def load_fingerprints(
+    segment: Segment | TextSegment, cache: bool = True
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return fingerprints for a segment, computing and persisting them on first use.
+
+    Text segments (files not embedded yet) are cached by content key. With
+    ``cache=False`` a sidecar read does not displace cached segments.
+    """
+    if segment.stem is None:
+        if segment.key is None:
+            return fingerprint(segment.texts())
+        return _fingerprint_cache.get_or_compute(
+            ("text", segment.key), lambda: fingerprint(segment.texts())
+        )
+
+    key = str(segment.stem)
+    cached = _fingerprint_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        with np.load(segment.stem.with_suffix(".mh")) as data:
+            fingerprints = (data["digests"], data["signatures"])
+            version = int(data["version"])
+        if version != FINGERPRINT_VERSION or len(fingerprints[0]) != len(segment):
+            raise ValueError("stale fingerprints")
+    except (OSError, ValueError, KeyError):
+        fingerprints = fingerprint(segment.texts())
+        save_fingerprints(segment, *fingerprints)
+
+    if cache:
+        _fingerprint_cache.put(key, fingerprints)
+    return fingerprints
+
+
+def _lookup(sorted_keys: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """Return the position of each query in ``sorted_keys``, or -1 if absent."""
+    positions = np.searchsorted(sorted_keys, queries)
+    inside = positions < len(sorted_keys)
+    hit = np.zeros(len(queries), dtype=bool)
+    hit[inside] = sorted_keys[positions[inside]] == queries[inside]
+    return np.where(hit, positions, -1)
+
+
+class _Run:
+    """Registered chunks as arrays sorted by digest key and by each band key."""
+
+    def __init__(
+        self, owners: np.ndarray, rows: np.ndarray, digests: np.ndarray, bands: np.ndarray
+    ) -> None:
+        self.owners = owners.astype(np.int32)
+        self.rows = rows.astype(np.int32)
+        self.digest_order = np.argsort(digests, kind="stable").astype(np.int32)
+        self.digests = digests[self.digest_order]
+        order = np.argsort(bands, axis=0, kind="stable")
+        self.band_order = np.ascontiguousarray(order.T, dtype=np.int32)
+        self.bands = np.ascontiguousarray(np.take_along_axis(bands, order, axis=0).T)
+
+    def __len__(self) -> int:
+        return len(self.owners)
+
+    def columns(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Return ``(owners, rows, digests, bands)`` in registration order."""
+        digests = np.empty_like(self.digests)
+        digests[self.digest_order] = self.digests
+        bands = np.empty((len(self), BANDS), dtype=np.uint64)
+        for band in range(BANDS):
+            bands[self.band_order[band], band] = self.bands[band]
+        return self.owners, self.rows, digests, bands
+
+
+class DuplicateIndex:
+    """Lookup of previously seen chunks by exact digest or LSH band.
+
+    Chunks are registered in blocks under an owner (a segment key) and referred
+    to as ``(owner, row)``. Blocks become sorted runs, and a run is merged into
+    the one before it once that is no more than twice its size, so there are
+    O(log n) runs and a lookup is a binary search in each.
+
+    ``threshold`` is the minimum estimated Jaccard similarity for a near match;
+    a threshold of 1 or more disables near matching.
+    """
+
+    def __init__(self, threshold: float = 0.9) -> None:
+        """Create an empty index matching near duplicates at ``threshold``."""
+        self.threshold = threshold
+        self._owners: list[Hashable] = []
+        self._owner_ids: dict[Hashable, int] = {}
+        self._runs: list[_Run] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of registered chunks."""
+        return sum(len(run) for run in self._runs)
+
+    def __contains__(self, owner: Hashable) -> bool:
+        """Return whether any chunk was registered under ``owner``."""
+        return owner in self._owner_ids
+
+    def owners(self) -> list[Hashable]:
+        """Return the owners registered so far."""
+        with self._lock:
+            return list(self._owner_ids)
+
+    def _ref(self, run: _Run, index: int) -> tuple[Hashable, int]:
+        return self._owners[run.owners[index]], int(run.rows[index])
+
+    def add(
+        self, owner: Hashable, digests: np.ndarray, signatures: np.ndarray, start: int = 0
+    ) -> None:
+        """Register a block as rows ``start...`` of ``owner``.
+
+        Chunks identical to a registered chunk, or to an earlier one in the
+        block, are skipped: lookups return the first copy.
+        """
+        keys = digest_keys(digests)
+        _, first = np.unique(keys, return_index=True)
+        fresh = np.zeros(len(keys), dtype=bool)
+        fresh[first] = True
+        with self._lock:
+            for run in self._runs:
+                fresh &= _lookup(run.digests, keys) < 0
+            owner_id = self._owner_ids.get(owner)
+            if owner_id is None:
+                owner_id = self._owner_ids[owner] = len(self._owners)
+                self._owners.append(owner)
+            if not fresh.any():
+                return
+            positions = np.flatnonzero(fresh)
+            self._runs.append(
+                _Run(
+                    np.full(len(positions), owner_id),
+                    start + positions,
+                    keys[positions],
+                    band_keys(signatures[positions]),
+                )
+            )
+            while len(self._runs) > 1 and len(self._runs[-2]) <= 2 * len(self._runs[-1]):
+                newer, older = self._runs.pop(), self._runs.pop()
+                merged = (np.concatenate(pair) for pair in zip(older.columns(), newer.columns()))
+                self._runs.append(_Run(*merged))
+
+    def match(
+        self,
+        digests: np.ndarray,
+        signatures: np.ndarray,
+        signature_of: Callable[[tuple[Hashable, int]], np.ndarray | None],
+    ) -> list[tuple[Hashable, int] | None]:
+        """Return, per chunk, the reference of an identical or near-identical chunk.
+
+        Chunks of the block are not matched against each other (see
+        ``earlier_duplicates``). ``signature_of(ref)`` returns the signature of
+        a registered chunk, or None if it is gone, to confirm band candidates.
+        """
+        keys = digest_keys(digests)
+        with self._lock:
+            runs = list(self._runs)
+        found: list[tuple[Hashable, int] | None] = [None] * len(keys)
+        for run in runs:
+            hits = _lookup(run.digests, keys)
+            for pos in np.flatnonzero(hits >= 0).tolist():
+                if found[pos] is None:
+                    found[pos] = self._ref(run, run.digest_order[hits[pos]])
+        if self.threshold >= 1:
+            return found
+
+        bands = band_keys(signatures)
+        candidates: defaultdict[int, set[tuple[Hashable, int]]] = defaultdict(set)
+        for run in runs:
+            for band in range(BANDS):
+                left = np.searchsorted(run.bands[band], bands[:, band], side="left")
+                right = np.searchsorted(run.bands[band], bands[:, band], side="right")
+                for pos in np.flatnonzero(right > left).tolist():
+                    if found[pos] is not None:
+                        continue
+                    stop = min(right[pos], left[pos] + MAX_BAND_CANDIDATES)
+                    for index in run.band_order[band, left[pos] : stop].tolist():
+                        candidates[pos].add(self._ref(run, index))
+        for pos, refs in candidates.items():
+            best, best_score = None, self.threshold
+            for ref in sorted(refs):
+                signature = signature_of(ref)
+                if signature is None:
+                    continue
+                score = similarity(signatures[pos], signature)
+                if score >= best_score and (best is None or score > best_score):
+                    best, best_score = ref, score
+            found[pos] = best
+        return found
+
+    def discard(self, owners: Iterable[Hashable]) -> None:
+        """Forget every chunk of ``owners``, whose segments no longer exist."""
+        with self._lock:
+            ids = [self._owner_ids.pop(owner) for owner in owners if owner in self._owner_ids]
+            if not ids:
+                return
+            gone = np.array(ids, dtype=np.int32)
+            runs = []
+            for run in self._runs:
+                keep = ~np.isin(run.owners, gone)
+                if keep.all():
+                    runs.append(run)
+                elif keep.any():
+                    runs.append(_Run(*(column[keep] for column in run.columns())))
+            self._runs = runs
+
+
+def collapse_rows(
+    store: SegmentStore, rows: Sequence[int], threshold: float = 0.9
+) -> tuple[list[int], dict[int, list[str]]]:
+    """Drop ranked rows that duplicate a better-ranked row.
+
+    Returns the kept rows in rank order, and for kept rows that absorbed
+    duplicates from other files, those files' sources.
+    """
+    fingerprints: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+    kept: list[int] = []
+    kept_prints: list[tuple[bytes, np.ndarray]] = []
+    also: dict[int, list[str]] = {}
+    for row in rows:
+        seg_idx, local = store.locate(row)
+        if seg_idx not in fingerprints:
+            fingerprints[seg_idx] = load_fingerprints(store.segments[seg_idx])
+        digests, signatures = fingerprints[seg_idx]
+        digest, signature = digests[local].tobytes(), signatures[local]
+
+        duplicate_of = None
+        for kept_row, (kept_digest, kept_signature) in zip(kept, kept_prints):
+            if digest == kept_digest or (
+                threshold < 1 and similarity(signature, kept_signature) >= threshold
+            ):
+                duplicate_of = kept_row
+                break
+        if duplicate_of is None:
+            kept.append(row)
+            kept_prints.append((digest, signature))
+            continue
+
+        primary = store.sources(store.locate(duplicate_of)[0])
+        owner = also.setdefault(duplicate_of, [])
+        for source in store.sources(seg_idx):
+            if source not in primary and source not in owner:
+                owner.append(source)
+    return kept, also
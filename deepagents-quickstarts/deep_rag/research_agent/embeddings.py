@@ -0,0 +1,126 @@
+"""Embedding backends selected by ``EMBEDDING_MODEL``.
+
+Any LangChain ``Embeddings`` implementation can serve retrieval. Model names
+starting with a registered local prefix are built in-process; every other name
+is sent to the OpenAI-compatible endpoint at ``EMBEDDING_BASE_URL``.
+
+The built-in ``local-hashing`` backend is a NumPy hashing vectorizer: lowercase
+word unigrams and bigrams plus character 3-grams of each word are hashed into a
+fixed number of signed buckets, term frequencies are damped with ``log1p``, and
+rows are L2-normalized. It needs no network, model download or fitted
+vocabulary, so vectors are deterministic and a file embedded today stays
+comparable with one embedded next month. ``local-hashing-<dim>`` picks the
+dimension (default 512).
+"""
+
+import re
+import zlib
+from typing import Callable
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+DEFAULT_HASHING_DIM = 512
+CHAR_NGRAM = 3
+# Relative weights of word, word-pair and character n-gram features.
+FEATURE_WEIGHTS = (1.0, 0.5, 0.25)
+
+_WORD = re.compile(r"\w+")
+
+
+class HashingEmbeddings(Embeddings):
+    """Stateless in-process embeddings from hashed word and character n-grams."""
+
+    def __init__(self, dim: int = DEFAULT_HASHING_DIM) -> None:
+        """Embed into ``dim`` hashed features (at least 16)."""
+        if dim < 16:
+            raise ValueError(f"Hashing embeddings need at least 16 dimensions, got {dim}")
+        self.dim = dim
+
+    @classmethod
+    def from_model(cls, model: str) -> "HashingEmbeddings":
+        """Build from a model name such as ``local-hashing`` or ``local-hashing-1024``."""
+        match = re.fullmatch(r"local-hashing(?:-(\d+))?", model)
+        if match is None:
+            raise ValueError(f"Unknown local hashing model: {model}")
+        return cls(int(match.group(1) or DEFAULT_HASHING_DIM))
+
+    def _features(self, text: str) -> tuple[list[int], list[float]]:
+        words = _WORD.findall(text.lower())
+        hashes: list[int] = []
+        weights: list[float] = []
+        word_weight, pair_weight, char_weight = FEATURE_WEIGHTS
+        for i, word in enumerate(words):
+            hashes.append(zlib.crc32(word.encode("utf-8")))
+            weights.append(word_weight)
+            if i:
+                pair = f"{words[i - 1]} {word}"
+                hashes.append(zlib.crc32(pair.encode("utf-8")))
+                weights.append(pair_weight)
+            padded = f"<{word}>"
+            for start in range(len(padded) - CHAR_NGRAM + 1):
+                gram = "#" + padded[start : start + CHAR_NGRAM]
+                hashes.append(zlib.crc32(gram.encode("utf-8")))
+                weights.append(char_weight)
+        return hashes, weights
+
+    def _embed(self, text: str) -> np.ndarray:
+        hashes, weights = self._features(text)
+        if not hashes:
+            return np.zeros(self.dim, dtype=np.float32)
+        codes = np.asarray(hashes, dtype=np.uint32)
+        # Low bits pick the bucket, the top bit the sign, so collisions cancel
+        # out on average instead of inflating similarity.
+        signs = np.where(codes >> 31, -1.0, 1.0) * np.asarray(weights)
+        counts = np.bincount(codes % self.dim, weights=signs, minlength=self.dim)
+        vector = np.sign(counts) * np.log1p(np.abs(counts))
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).astype(np.float32)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed a batch of texts."""
+        return [self._embed(text).tolist() for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a query."""
+        return self._embed(text).tolist()
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """Embed a query inline; it takes microseconds, less than a thread hop."""
+        return self.embed_query(text)
+
+
+LOCAL_BACKENDS: dict[str, Callable[[str], Embeddings]] = {
+    "local-hashing": HashingEmbeddings.from_model,
+}
+
+
+def register_backend(prefix: str, factory: Callable[[str], Embeddings]) -> None:
+    """Serve model names starting with ``prefix`` from ``factory(model)``."""
+    LOCAL_BACKENDS[prefix] = factory
+
+
+def local_backend(model: str) -> Callable[[str], Embeddings] | None:
+    """Return the in-process factory for a model name, if one is registered."""
+    for prefix, factory in LOCAL_BACKENDS.items():
+        if model == prefix or model.startswith(f"{prefix}-"):
+            return factory
+    return None
+
+
+def create_embeddings(
+    model: str, base_url: str | None = None, api_key: str | None = None
+) -> Embeddings:
+    """Create the embeddings backend for ``model``.
+
+    Args:
+        model: Embedding model name; a registered local prefix selects an
+            in-process backend.
+        base_url: OpenAI-compatible endpoint for remote models.
+        api_key: API key for remote models.
+    """
+    factory = local_backend(model)
+    if factory is not None:
+        return factory(model)
+    return OpenAIEmbeddings(model=model, api_key=api_key, base_url=base_url)
@@ -0,0 +1,190 @@
+"""Persistent embedding index for uploaded files."""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from research_agent.chunking import chunk_format
+from research_agent.segments import (
+    Segment,
+    SegmentWriter,
+    delete_segment,
+    open_segment,
+    write_atomic,
+    write_segment,
+)
+
+INDEX_VERSION = 2
+HASH_BLOCK_BYTES = 1024 * 1024
+
+
+class UploadIndex:
+    """On-disk store of chunk embeddings keyed by file content.
+
+    Each entry holds the chunks and embeddings for one version of one file as an
+    immutable segment (see ``research_agent.segments``). The entry key hashes the
+    raw file bytes together with the splitter settings and embedding model, so an
+    unchanged file is never split or embedded twice while an edited file (or a
+    settings change) simply produces a new segment.
+
+    A manifest maps each file path to its last seen ``(mtime_ns, size)`` and key,
+    so files whose stat is unchanged are not re-hashed. Keys that a path stops
+    referencing (the file was edited or deleted) are recorded as released, and
+    ``prune`` deletes only released keys that no other path still references.
+    Several upload directories can therefore share one index root without
+    deleting each other's segments, and the segments directory is never listed.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        model: str,
+        chunk_size: int,
+        chunk_overlap: int,
+        dtype: str = "float32",
+    ) -> None:
+        """Open the index stored under ``root``, loading its manifest."""
+        self.root = Path(root)
+        self.model = model
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.dtype = dtype
+        self._manifest_lock = threading.Lock()
+        self._released: set[str] = set()
+        self._manifest: dict[str, list] = self._load_manifest()
+        self._manifest_dirty = False
+
+    def entry_key(self, content: bytes) -> str:
+        """Return the cache key for a file's raw bytes under current settings."""
+        return self._finish_key(hashlib.sha256(content))
+
+    def file_key(self, path: Path) -> str:
+        """Return the cache key for a file, hashing it in fixed-size blocks."""
+        digest = hashlib.sha256()
+        with open(path, "rb") as handle:
+            while block := handle.read(HASH_BLOCK_BYTES):
+                digest.update(block)
+        if chunk_format(path) != "text":
+            # Row-chunked tables must not share a segment with the same bytes as text.
+            digest.update(f"|{chunk_format(path)}".encode())
+        return self._finish_key(digest)
+
+    def path_key(self, path: Path, stat: os.stat_result | None = None) -> str:
+        """Return a file's key, re-hashing only if its mtime or size changed."""
+        stat = stat or path.stat()
+        signature = [stat.st_mtime_ns, stat.st_size]
+        with self._manifest_lock:
+            cached = self._manifest.get(str(path))
+        if cached is not None and cached[:2] == signature:
+            return cached[2]
+
+        key = self.file_key(path)
+        with self._manifest_lock:
+            previous = self._manifest.get(str(path))
+            if previous is not None and previous[2] != key:
+                self._released.add(previous[2])
+            self._manifest[str(path)] = [*signature, key]
+            self._manifest_dirty = True
+        return key
+
+    def forget_paths_except(self, paths: set[str], upload_dir: Path) -> None:
+        """Drop manifest entries under ``upload_dir`` for paths that no longer exist.
+
+        Entries of other upload directories sharing this index are kept.
+        """
+        with self._manifest_lock:
+            stale = [
+                path
+                for path in self._manifest.keys() - paths
+                if Path(path).is_relative_to(upload_dir)
+            ]
+            for path in stale:
+                self._released.add(self._manifest.pop(path)[2])
+            self._manifest_dirty |= bool(stale)
+
+    def _settings_tag(self) -> str:
+        return self._finish_key(hashlib.sha256())
+
+    def _load_manifest(self) -> dict[str, list]:
+        try:
+            payload = json.loads((self.root / "manifest.json").read_text("utf-8"))
+        except (OSError, ValueError):
+            return {}
+        released = set(payload.get("released", []))
+        files = payload.get("files", {})
+        if payload.get("settings") != self._settings_tag():
+            # Segments built under other settings are never looked up again.
+            self._released = released | {entry[2] for entry in files.values()}
+            return {}
+        self._released = released
+        return files
+
+    def save_manifest(self) -> None:
+        """Persist the manifest if it changed since the last save."""
+        with self._manifest_lock:
+            if not self._manifest_dirty:
+                return
+            payload = {
+                "settings": self._settings_tag(),
+                "files": dict(self._manifest),
+                "released": sorted(self._released),
+            }
+            self._manifest_dirty = False
+        self.root.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.root / "manifest.json", json.dumps(payload).encode("utf-8"))
+
+    def _finish_key(self, digest) -> str:  # noqa: ANN001
+        digest.update(
+            f"|v{INDEX_VERSION}|{self.model}|{self.chunk_size}|{self.chunk_overlap}"
+            f"|{self.dtype}".encode()
+        )
+        return digest.hexdigest()
+
+    def _segment_stem(self, key: str) -> Path:
+        return self.root / "segments" / key
+
+    def sidecar(self, key: str, suffix: str) -> Path:
+        """Return the path of a derived file stored alongside a key's segment."""
+        return self._segment_stem(key).with_suffix(suffix)
+
+    def get(self, key: str) -> Segment | None:
+        """Open the stored segment for a key, or None if absent."""
+        return open_segment(self._segment_stem(key))
+
+    def writer(self, key: str) -> SegmentWriter:
+        """Start an incremental segment for a key; call ``commit`` when done."""
+        return SegmentWriter(self._segment_stem(key), **self._segment_header())
+
+    def _segment_header(self) -> dict:
+        return {
+            "dtype": self.dtype,
+            "model": self.model,
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+        }
+
+    def put(
+        self, key: str, texts: list[str], vectors: Sequence[Sequence[float]] | np.ndarray
+    ) -> Segment:
+        """Persist chunks and vectors for a key as a new segment."""
+        return write_segment(self._segment_stem(key), texts, vectors, **self._segment_header())
+
+    def prune(self) -> int:
+        """Delete segments of released keys no manifest path references; return the count.
+
+        The caller must hold the lock that serializes ingestion into this index,
+        so a segment being committed for a key is never deleted underneath it.
+        """
+        with self._manifest_lock:
+            live = {entry[2] for entry in self._manifest.values()}
+            stale = self._released - live
+            self._manifest_dirty |= bool(self._released)
+            self._released = set()
+        for key in stale:
+            delete_segment(self._segment_stem(key))
+        return len(stale)
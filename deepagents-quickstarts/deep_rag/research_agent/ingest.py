@@ -0,0 +1,92 @@
+"""Parallel file splitting and per-stage timing for upload ingestion."""
+
+import multiprocessing
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence, TypeVar
+
+from research_agent.chunking import iter_file_chunks
+
+T = TypeVar("T")
+
+
+class StageTimings:
+    """Accumulate wall-clock seconds spent in named ingestion stages."""
+
+    def __init__(self) -> None:
+        """Start with no time recorded for any stage."""
+        self.seconds: dict[str, float] = defaultdict(float)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block under ``name``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - started
+
+    def timed(self, name: str, items: Iterable[T]) -> Iterator[T]:
+        """Yield from ``items``, charging the time spent producing them to ``name``."""
+        iterator = iter(items)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def summary(self) -> str:
+        """Return a one-line ``stage=seconds`` summary."""
+        return ", ".join(f"{name}={seconds:.3f}s" for name, seconds in self.seconds.items())
+
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    """Return a start method that is safe to use from the watcher thread.
+
+    Forking a multi-threaded process can deadlock the children, so workers come
+    from a fork server that has the splitter preloaded (imported once rather
+    than per worker), or are spawned where fork servers are unavailable.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+def split_file(path: Path, chunk_size: int, chunk_overlap: int) -> list[str]:
+    """Read and split one file; runs inside worker processes."""
+    return list(iter_file_chunks(path, chunk_size, chunk_overlap))
+
+
+def iter_split_files(
+    paths: Sequence[Path],
+    chunk_size: int,
+    chunk_overlap: int,
+    workers: int = 1,
+    min_files: int = 2,
+) -> Iterator[tuple[Path, Iterable[str]]]:
+    """Yield ``(path, chunks)`` for each path, in the order given.
+
+    With ``workers`` <= 1, chunks are streamed lazily from each file in the
+    calling process, keeping memory bounded by chunk size. With more workers,
+    files are read and split concurrently in a process pool; results still come
+    back in input order, so output is deterministic, but each file's chunks are
+    materialized as a list. The pool is only started for at least ``min_files``
+    paths, since worker startup outweighs the split for a handful of files.
+    """
+    if workers <= 1 or len(paths) < max(2, min_files):
+        for path in paths:
+            yield path, iter_file_chunks(path, chunk_size, chunk_overlap)
+        return
+
+    worker = partial(split_file, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+        chunksize = max(1, len(paths) // (workers * 4))
+        yield from zip(paths, pool.map(worker, paths, chunksize=chunksize))
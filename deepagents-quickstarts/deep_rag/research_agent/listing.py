@@ -0,0 +1,166 @@
+"""Cached snapshot of the files in an upload directory.
+
+Listing thousands of uploads on every ``list_uploaded_files`` call costs a
+``stat`` per file. A ``DirectoryListing`` keeps the last scan and only rescans
+when a directory's mtime changed, which happens when a file is added, removed
+or renamed in it (or a bucket subdirectory is created), or after
+``invalidate()``, which ingestion calls when file contents change in place.
+Checking the snapshot costs one ``stat`` per directory.
+
+A directory modified within ``RACY_NS`` of the last scan is always rescanned,
+since a change in the same timestamp tick as the scan would not move its mtime.
+"""
+
+import fnmatch
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Sequence
+
+RACY_NS = 2_000_000_000
+
+
+@dataclass(frozen=True)
+class FileEntry:
+    """One upload file, identified by its path relative to the upload directory."""
+
+    path: str
+    size: int
+    mtime_ns: int
+
+    @property
+    def name(self) -> str:
+        """Return the file name without its bucket directory."""
+        return PurePosixPath(self.path).name
+
+    @property
+    def bucket(self) -> str:
+        """Return the bucket subdirectory, or an empty string for top-level files."""
+        parent = PurePosixPath(self.path).parent.as_posix()
+        return "" if parent == "." else parent
+
+    @property
+    def suffix(self) -> str:
+        """Return the lowercase file extension, including the dot."""
+        return PurePosixPath(self.path).suffix.lower()
+
+
+def _scan(root: Path) -> tuple[list[FileEntry], dict[str, int]]:
+    """Walk ``root`` once, returning its files and the mtime of every directory.
+
+    Hidden files and directories (such as ``.rag_index``) are skipped, as in
+    ``watcher.iter_upload_files``.
+    """
+    entries: list[FileEntry] = []
+    dirs: dict[str, int] = {}
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            dirs[str(directory)] = directory.stat().st_mtime_ns
+            children = list(os.scandir(directory))
+        except OSError:
+            continue
+        for child in children:
+            if child.name.startswith("."):
+                continue
+            try:
+                if child.is_dir():
+                    pending.append(Path(child.path))
+                elif child.is_file():
+                    stat = child.stat()
+                    path = Path(child.path).relative_to(root).as_posix()
+                    entries.append(FileEntry(path, stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                continue
+    entries.sort(key=lambda entry: entry.path)
+    return entries, dirs
+
+
+class DirectoryListing:
+    """Snapshot of an upload directory's files, rescanned only when it changed."""
+
+    def __init__(self, root: Path) -> None:
+        """Track the files under ``root``; nothing is scanned until first use."""
+        self.root = Path(root)
+        self.scans = 0
+        self._entries: list[FileEntry] | None = None
+        self._dirs: dict[str, int] = {}
+        self._scanned_ns = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """Drop the snapshot so the next lookup rescans."""
+        with self._lock:
+            self._entries = None
+
+    def _fresh(self) -> bool:
+        for directory, mtime_ns in self._dirs.items():
+            try:
+                current = os.stat(directory).st_mtime_ns
+            except OSError:
+                return False
+            if current != mtime_ns or current >= self._scanned_ns - RACY_NS:
+                return False
+        return True
+
+    def entries(self) -> list[FileEntry]:
+        """Return every file, sorted by relative path, rescanning if needed."""
+        with self._lock:
+            if self._entries is None or not self._fresh():
+                self._scanned_ns = time.time_ns()
+                self._entries, self._dirs = _scan(self.root)
+                self.scans += 1
+            return self._entries
+
+
+def filter_entries(
+    entries: Sequence[FileEntry],
+    name: str | None = None,
+    extensions: Sequence[str] | None = None,
+    bucket: str | None = None,
+) -> list[FileEntry]:
+    """Filter entries by name, extension and bucket, all case-insensitive.
+
+    ``name`` is a glob when it contains ``*``, ``?`` or ``[``, else a substring
+    of the relative path. ``bucket`` "" selects top-level files.
+    """
+    wanted = {
+        ext.lower() if ext.startswith(".") else f".{ext.lower()}"
+        for ext in extensions or []
+        if ext
+    }
+    pattern = name.lower() if name else None
+    glob = pattern is not None and any(char in pattern for char in "*?[")
+    folder = bucket.strip("/").lower() if bucket is not None else None
+
+    kept = []
+    for entry in entries:
+        if wanted and entry.suffix not in wanted:
+            continue
+        if folder is not None and entry.bucket.lower() != folder:
+            continue
+        if pattern is not None:
+            texts = (entry.path.lower(), entry.name.lower())
+            if glob and not any(fnmatch.fnmatchcase(text, pattern) for text in texts):
+                continue
+            if not glob and pattern not in texts[0]:
+                continue
+        kept.append(entry)
+    return kept
+
+
+def format_size(size: int) -> str:
+    """Render a byte count with a binary unit."""
+    if size < 1024:
+        return f"{size} B"
+    value = size / 1024
+    for unit in ("KB", "MB", "GB"):
+        if value < 1024:
+            break
+        value /= 1024
+    else:
+        unit = "TB"
+    return f"{value:.1f} {unit}"
@@ -0,0 +1,177 @@
+"""Token-budget packing of retrieved chunks with maximal marginal relevance.
+
+Retrieval returns a ranked pool of candidate rows. Packing reorders the pool
+with maximal marginal relevance (MMR) over the stored chunk embeddings, so
+near-duplicate chunks give way to ones that add new information, and then
+greedily fills a token budget. Selected chunks that are neighbours in the same
+file are merged into one passage with their shared overlap removed, so the
+overlap is not paid for twice.
+
+Token counts are estimated from character length, which is close enough for
+budgeting and needs no tokenizer for the local chat model.
+"""
+
+import math
+from dataclasses import dataclass
+
+import numpy as np
+from langchain_core.documents import Document
+
+from research_agent.vectorstore import SegmentStore, normalize_rows
+
+CHARS_PER_TOKEN = 4
+PASSAGE_OVERHEAD_TOKENS = 8
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the prompt tokens used by ``text``."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def mmr_order(
+    vectors: np.ndarray, relevance: np.ndarray, lambda_mult: float = 0.7
+) -> list[int]:
+    """Order candidates by maximal marginal relevance.
+
+    Args:
+        vectors: Unit-length candidate embeddings, one row per candidate; rows of
+            zeros mark candidates without embeddings, which never count as
+            redundant.
+        relevance: Relevance of each candidate to the query, higher is better.
+        lambda_mult: Weight of relevance versus diversity, in ``[0, 1]``.
+
+    Returns:
+        Candidate indices, most marginally relevant first.
+    """
+    count = len(relevance)
+    redundancy = np.zeros(count, dtype=np.float32)
+    available = np.ones(count, dtype=bool)
+    order: list[int] = []
+    for _ in range(count):
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        pick = int(np.argmax(scores))
+        order.append(pick)
+        available[pick] = False
+        # One matrix-vector product updates every candidate's similarity to the picks.
+        np.maximum(redundancy, vectors @ vectors[pick], out=redundancy)
+    return order
+
+
+def merge_overlap(head: str, tail: str, max_overlap: int) -> str:
+    """Join consecutive chunks, dropping the text they share at the seam."""
+    for size in range(min(len(head), len(tail), max_overlap), 0, -1):
+        if head.endswith(tail[:size]):
+            return head + tail[size:]
+    return head + "\n" + tail
+
+
+@dataclass
+class _Passage:
+    seg_idx: int
+    first: int
+    last: int
+    rank: int
+    text: str
+
+
+def _passages(
+    store: SegmentStore, picks: list[tuple[int, int]], max_overlap: int
+) -> list[_Passage]:
+    """Merge ``(rank, row)`` picks into passages of consecutive rows per file."""
+    located = sorted((*store.locate(row), rank) for rank, row in picks)
+    passages: list[_Passage] = []
+    for seg_idx, local, rank in located:
+        text = store.segments[seg_idx].text(local).strip()
+        last = passages[-1] if passages else None
+        if last is not None and last.seg_idx == seg_idx and last.last + 1 == local:
+            last.last, last.rank = local, min(last.rank, rank)
+            last.text = merge_overlap(last.text, text, max_overlap)
+        else:
+            passages.append(_Passage(seg_idx, local, local, rank, text))
+    return sorted(passages, key=lambda passage: passage.rank)
+
+
+def _cost(passages: list[_Passage]) -> int:
+    return sum(estimate_tokens(p.text) + PASSAGE_OVERHEAD_TOKENS for p in passages)
+
+
+def _sources(store: SegmentStore, passage: _Passage, also: dict[int, list[str]]) -> list[str]:
+    """Return the files a passage was found in, its own file first."""
+    sources = list(store.sources(passage.seg_idx))
+    start = store.segment_start(passage.seg_idx)
+    for local in range(passage.first, passage.last + 1):
+        sources.extend(s for s in also.get(start + local, ()) if s not in sources)
+    return sources
+
+
+def pack_context(
+    store: SegmentStore,
+    rows: list[int],
+    max_chunks: int,
+    token_budget: int,
+    lambda_mult: float = 0.7,
+    max_overlap: int = 200,
+    also: dict[int, list[str]] | None = None,
+) -> list[Document]:
+    """Select and merge ranked rows into passages that fit a token budget.
+
+    Args:
+        store: Store the rows belong to.
+        rows: Candidate rows, best first.
+        max_chunks: Maximum number of chunks to select.
+        token_budget: Estimated token budget for all passages together.
+        lambda_mult: MMR weight of relevance versus diversity.
+        max_overlap: Longest shared text to remove when merging neighbours.
+        also: Other files containing a duplicate of a row, as returned by
+            ``dedup.collapse_rows``.
+
+    Returns:
+        One Document per passage, in relevance order. Metadata is that of the
+        source file plus ``chunks``, the number of chunks merged into it, and
+        ``sources``, every file the passage's text was found in.
+    """
+    if not rows:
+        return []
+
+    vectors: list[np.ndarray | None] = []
+    for row in rows:
+        seg_idx, local = store.locate(row)
+        segment_vectors = store.segments[seg_idx].vectors
+        vectors.append(
+            None if segment_vectors is None else np.asarray(segment_vectors[local], np.float32)
+        )
+    dim = next((vector.shape[0] for vector in vectors if vector is not None), 1)
+    matrix = normalize_rows(
+        np.stack([np.zeros(dim, np.float32) if v is None else v for v in vectors])
+    )
+    # Rank-based relevance works for dense, lexical and fused rankings alike.
+    relevance = 1.0 - np.arange(len(rows), dtype=np.float32) / len(rows)
+
+    picks: list[tuple[int, int]] = []
+    for rank in mmr_order(matrix, relevance, lambda_mult):
+        if len(picks) >= max_chunks:
+            break
+        trial = picks + [(rank, rows[rank])]
+        if _cost(_passages(store, trial, max_overlap)) <= token_budget:
+            picks = trial
+
+    if picks:
+        passages = _passages(store, picks, max_overlap)
+    else:
+        # Even the best chunk is over budget: keep a truncated copy of it.
+        passages = _passages(store, [(0, rows[0])], max_overlap)
+        limit = max(token_budget - PASSAGE_OVERHEAD_TOKENS, 1) * CHARS_PER_TOKEN
+        passages[0].text = passages[0].text[:limit].rstrip() + "..."
+
+    return [
+        Document(
+            page_content=passage.text,
+            metadata={
+                **store.metadatas[passage.seg_idx],
+                "chunks": passage.last - passage.first + 1,
+                "sources": _sources(store, passage, also or {}),
+            },
+        )
+        for passage in passages
+    ]
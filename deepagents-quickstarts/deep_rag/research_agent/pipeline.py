@@ -0,0 +1,201 @@
+"""Batched, concurrent embedding pipeline for ingesting uploaded files."""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Sequence
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Client errors worth retrying (timeout, conflict, rate limit); other 4xx never succeed on retry.
+RETRYABLE_STATUS = {408, 409, 429}
+
+# Monotonic time until which each embedder is skipped after a failed run.
+_cooldowns: dict[tuple[str, str], float] = {}
+_cooldowns_lock = threading.Lock()
+
+
+@dataclass
+class EmbeddingStats:
+    """Counters for one pipeline run."""
+
+    chunks: int = 0
+    embedded: int = 0
+    failed: int = 0
+    requests: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+    final_batch_size: int = 0
+
+    @property
+    def chunks_per_sec(self) -> float:
+        """Return embedding throughput over the wall-clock duration."""
+        return self.embedded / self.seconds if self.seconds else 0.0
+
+
+def _embedder_key(embeddings: Embeddings) -> tuple[str, str]:
+    # Backends are rebuilt per ingest, so identify them by class and model.
+    return type(embeddings).__qualname__, str(getattr(embeddings, "model", ""))
+
+
+def cooling_down(embeddings: Embeddings) -> bool:
+    """Return whether ``embeddings`` is skipped after a recent failed pipeline run."""
+    with _cooldowns_lock:
+        until = _cooldowns.get(_embedder_key(embeddings), 0.0)
+    return time.monotonic() < until
+
+
+def _is_retryable(exc: Exception) -> bool:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(status, int) and 400 <= status < 500:
+        return status in RETRYABLE_STATUS
+    return True
+
+
+class EmbeddingPipeline:
+    """Embed texts in adaptive batches with bounded concurrency.
+
+    Batches start at ``batch_size`` and double (up to ``max_batch_size``) while
+    requests finish under ``target_latency`` seconds; a failure halves the batch
+    size. Only failed batches are retried: large ones are split in half, small
+    ones are retried with exponential backoff up to ``max_retries`` times.
+    Chunks that still fail come back as ``None`` so callers can keep everything
+    that did succeed.
+
+    After a run in which any chunk failed, the embedder is skipped for
+    ``failure_cooldown`` seconds: every pipeline over the same backend and
+    model returns ``None`` for all texts without calling it, so callers fall
+    back to keyword search at once instead of waiting out retries against a
+    service that is down.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        batch_size: int = 64,
+        max_batch_size: int = 512,
+        min_batch_size: int = 8,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        target_latency: float = 2.0,
+        failure_cooldown: float = 0.0,
+    ) -> None:
+        """Configure batching, concurrency, retries and the failure cooldown."""
+        self.embeddings = embeddings
+        self.batch_size = max(1, batch_size)
+        self.max_batch_size = max(self.batch_size, max_batch_size)
+        self.min_batch_size = max(1, min(min_batch_size, self.batch_size))
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.target_latency = target_latency
+        self.failure_cooldown = failure_cooldown
+        self.last_stats = EmbeddingStats()
+
+    def _call(self, texts: list[str], delay: float) -> tuple[list[list[float]], float]:
+        if delay:
+            time.sleep(delay)
+        started = time.perf_counter()
+        vectors = self.embeddings.embed_documents(texts)
+        if len(vectors) != len(texts):
+            raise ValueError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+        return vectors, time.perf_counter() - started
+
+    def embed(self, texts: Sequence[str]) -> list[list[float] | None]:
+        """Embed ``texts`` and return one vector (or None on failure) per text."""
+        texts = list(texts)
+        results: list[list[float] | None] = [None] * len(texts)
+        stats = EmbeddingStats(chunks=len(texts))
+        if texts and cooling_down(self.embeddings):
+            logger.info("Skipping %d chunks: embedding service failed recently", len(texts))
+            stats.failed = len(texts)
+            self.last_stats = stats
+            return results
+        started = time.perf_counter()
+        cursor = 0
+        retry_queue: list[tuple[int, int, int]] = []
+        running: dict[Future, tuple[int, int, int]] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            while cursor < len(texts) or retry_queue or running:
+                while len(running) < self.max_concurrency and (
+                    retry_queue or cursor < len(texts)
+                ):
+                    if retry_queue:
+                        start, end, attempt = retry_queue.pop(0)
+                    else:
+                        start, attempt = cursor, 0
+                        end = cursor = min(cursor + self.batch_size, len(texts))
+                    delay = 0.0
+                    if attempt:
+                        delay = self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                    future = pool.submit(self._call, texts[start:end], delay)
+                    running[future] = (start, end, attempt)
+                    stats.requests += 1
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start, end, attempt = running.pop(future)
+                    try:
+                        vectors, elapsed = future.result()
+                    except Exception as exc:  # noqa: BLE001
+                        self._handle_failure(exc, start, end, attempt, retry_queue, stats)
+                        continue
+                    results[start:end] = vectors
+                    stats.embedded += end - start
+                    if elapsed < self.target_latency and end - start >= self.batch_size:
+                        self.batch_size = min(self.batch_size * 2, self.max_batch_size)
+
+        stats.seconds = time.perf_counter() - started
+        stats.final_batch_size = self.batch_size
+        self.last_stats = stats
+        with _cooldowns_lock:
+            if stats.failed and self.failure_cooldown > 0:
+                _cooldowns[_embedder_key(self.embeddings)] = (
+                    time.monotonic() + self.failure_cooldown
+                )
+            elif stats.embedded:
+                _cooldowns.pop(_embedder_key(self.embeddings), None)
+        logger.info(
+            "Embedded %d/%d chunks in %.2fs (%.1f chunks/sec, %d requests, %d retries, %d failed)",
+            stats.embedded,
+            stats.chunks,
+            stats.seconds,
+            stats.chunks_per_sec,
+            stats.requests,
+            stats.retries,
+            stats.failed,
+        )
+        return results
+
+    def _handle_failure(
+        self,
+        exc: Exception,
+        start: int,
+        end: int,
+        attempt: int,
+        retry_queue: list[tuple[int, int, int]],
+        stats: EmbeddingStats,
+    ) -> None:
+        self.batch_size = max(self.batch_size // 2, self.min_batch_size)
+        if not _is_retryable(exc) or attempt >= self.max_retries:
+            logger.warning(
+                "Giving up on %d chunks after %d attempts: %s", end - start, attempt + 1, exc
+            )
+            stats.failed += end - start
+            return
+
+        stats.retries += 1
+        if end - start > self.min_batch_size:
+            middle = (start + end) // 2
+            retry_queue.extend([(start, middle, attempt + 1), (middle, end, attempt + 1)])
+        else:
+            retry_queue.append((start, end, attempt + 1))
@@ -0,0 +1,250 @@
+"""Quantized vector codes with full-precision rescoring for segment search.
+
+Two compact forms are supported:
+
+- ``int8``: symmetric scalar quantization with one scale per dimension and
+  segment; 4x smaller than float32 vectors.
+- ``binary``: one sign bit per dimension, compared by Hamming distance; 32x
+  smaller than float32 vectors.
+
+Codes are built once per segment and saved in a ``<stem>.q8`` or ``<stem>.qb``
+sidecar. A query scans only the codes, which are held in memory, to build a
+shortlist of ``k * rescore`` rows, then rescores that shortlist exactly against
+the memory-mapped full-precision vectors, so only those rows are paged in.
+
+``quantization_report`` measures memory saved and recall@k lost against exact
+search; ``benchmarks/quantization_recall.py`` runs it on an upload index.
+"""
+
+import io
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Collection, Iterator, Sequence
+
+import numpy as np
+
+from research_agent.segments import (
+    Segment,
+    TextSegment,
+    on_segment_delete,
+    write_atomic,
+)
+from research_agent.vectorstore import SegmentStore, normalize_rows, top_k_indices
+
+QUANTIZATIONS = {"int8": ".q8", "binary": ".qb"}
+DEFAULT_RESCORE = {"int8": 4, "binary": 32}
+SCORE_BLOCK_ROWS = 65_536
+
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def _blocks(vectors: np.ndarray) -> Iterator[np.ndarray]:
+    for start in range(0, len(vectors), SCORE_BLOCK_ROWS):
+        yield np.asarray(vectors[start : start + SCORE_BLOCK_ROWS], dtype=np.float32)
+
+
+def int8_scales(vectors: np.ndarray) -> np.ndarray:
+    """Return per-dimension scales mapping the largest magnitude to 127."""
+    peak = np.zeros(vectors.shape[1], dtype=np.float32)
+    for block in _blocks(vectors):
+        np.maximum(peak, np.abs(block).max(axis=0), out=peak)
+    return np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+
+
+def quantize_int8(vectors: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Return int8 codes of a block of vectors under per-dimension ``scales``."""
+    scaled = np.rint(np.asarray(vectors, dtype=np.float32) / scales)
+    return np.clip(scaled, -127, 127).astype(np.int8)
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """Return sign bits of a block of vectors, packed eight dimensions per byte."""
+    return np.packbits(np.asarray(vectors) > 0, axis=1)
+
+
+_live_indexes: "weakref.WeakSet[QuantizedIndex]" = weakref.WeakSet()
+
+
+@on_segment_delete
+def _forget_codes(stem: Path) -> None:
+    for index in list(_live_indexes):
+        with index._lock:
+            index._codes.pop(str(stem), None)
+
+
+class QuantizedIndex:
+    """Compact-code search with exact rescoring, shared across upload indexes."""
+
+    def __init__(self, kind: str, rescore: int | None = None) -> None:
+        """Search with ``kind`` codes, rescoring ``rescore`` times ``top_k`` candidates."""
+        if kind not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {kind}")
+        self.kind = kind
+        self.rescore = max(1, rescore or DEFAULT_RESCORE[kind])
+        self._codes: dict[str, tuple[np.ndarray, np.ndarray | None]] = {}
+        self._lock = threading.Lock()
+        _live_indexes.add(self)
+
+    def codes(self, segment: Segment) -> tuple[np.ndarray, np.ndarray | None]:
+        """Return ``(codes, int8 scales or None)`` for a segment.
+
+        Codes are computed once per segment, then reused from memory or the
+        segment's sidecar.
+        """
+        key = str(segment.stem)
+        with self._lock:
+            cached = self._codes.get(key)
+        if cached is not None:
+            return cached
+
+        sidecar = segment.stem.with_suffix(QUANTIZATIONS[self.kind])
+        try:
+            with np.load(sidecar) as data:
+                codes = data["codes"]
+                scales = data["scales"] if self.kind == "int8" else None
+        except (OSError, ValueError, KeyError):
+            codes, scales = self._encode(segment)
+            buffer = io.BytesIO()
+            if scales is None:
+                np.savez(buffer, codes=codes)
+            else:
+                np.savez(buffer, codes=codes, scales=scales)
+            try:
+                write_atomic(sidecar, buffer.getvalue())
+            except OSError:
+                pass
+
+        with self._lock:
+            self._codes[key] = (codes, scales)
+        return codes, scales
+
+    def _encode(self, segment: Segment) -> tuple[np.ndarray, np.ndarray | None]:
+        if self.kind == "binary":
+            return np.concatenate([quantize_binary(b) for b in _blocks(segment.vectors)]), None
+        scales = int8_scales(segment.vectors)
+        codes = np.concatenate([quantize_int8(b, scales) for b in _blocks(segment.vectors)])
+        return codes, scales
+
+    def approx_scores(self, segment: Segment, query: np.ndarray) -> np.ndarray:
+        """Score every row of a segment from its codes; higher is closer."""
+        codes, scales = self.codes(segment)
+        scores = np.empty(len(segment), dtype=np.float32)
+        if self.kind == "int8":
+            weights = query * scales
+            for start in range(0, len(segment), SCORE_BLOCK_ROWS):
+                block = codes[start : start + SCORE_BLOCK_ROWS]
+                scores[start : start + len(block)] = block.astype(np.float32) @ weights
+        else:
+            bits = quantize_binary(query[None, :])[0]
+            for start in range(0, len(segment), SCORE_BLOCK_ROWS):
+                block = codes[start : start + SCORE_BLOCK_ROWS]
+                hamming = _POPCOUNT[block ^ bits].sum(axis=1, dtype=np.int32)
+                scores[start : start + len(block)] = -hamming
+        return scores
+
+    def search(
+        self,
+        store: SegmentStore,
+        embedding: Sequence[float] | np.ndarray,
+        k: int,
+        segments: Collection[int] | None = None,
+        rescore: int | None = None,
+    ) -> np.ndarray:
+        """Return top-k global row ids for an embedding, best first.
+
+        With ``segments``, only rows of those segments are considered.
+        """
+        query = normalize_rows(np.asarray(embedding, dtype=np.float32))
+        allowed = set(segments) if segments is not None else None
+        approx = np.full(len(store), -np.inf, dtype=np.float32)
+        for seg_idx, segment in enumerate(store.segments):
+            if isinstance(segment, TextSegment) or not len(segment):
+                continue
+            if allowed is not None and seg_idx not in allowed:
+                continue
+            start = store.segment_start(seg_idx)
+            approx[start : start + len(segment)] = self.approx_scores(segment, query)
+
+        shortlist = top_k_indices(approx, k * (rescore or self.rescore))
+        shortlist = np.sort(shortlist[np.isfinite(approx[shortlist])])
+        if not shortlist.size:
+            return np.empty(0, dtype=np.int64)
+
+        exact = np.empty(shortlist.size, dtype=np.float32)
+        seg_ids = np.searchsorted(store.starts, shortlist, side="right") - 1
+        for seg_idx in np.unique(seg_ids):
+            picked = seg_ids == seg_idx
+            local = shortlist[picked] - store.segment_start(int(seg_idx))
+            exact[picked] = store.segments[int(seg_idx)].vectors[local] @ query
+        return shortlist[top_k_indices(exact, k)]
+
+    def nbytes(self, store: SegmentStore) -> int:
+        """Return the in-memory size of the codes for every embedded segment."""
+        total = 0
+        for segment in store.segments:
+            if isinstance(segment, TextSegment) or not len(segment):
+                continue
+            codes, scales = self.codes(segment)
+            total += codes.nbytes + (scales.nbytes if scales is not None else 0)
+        return total
+
+
+def quantization_report(
+    store: SegmentStore,
+    kinds: Sequence[str] = ("int8", "binary"),
+    k: int = 10,
+    rescores: Sequence[int] = (1, 4, 16, 64),
+    queries: int = 100,
+    seed: int = 0,
+) -> dict:
+    """Measure memory saved, recall@k and latency of quantized search vs exact.
+
+    Query vectors are sampled from stored chunks, so no embedding calls are made.
+    """
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(store), min(queries, len(store)), replace=False)
+    vectors = []
+    for row in picks:
+        seg_idx, local = store.locate(int(row))
+        vectors.append(np.asarray(store.segments[seg_idx].vectors[local], dtype=np.float32))
+
+    started = time.perf_counter()
+    exact = [set(top_k_indices(store.scores(v), k).tolist()) for v in vectors]
+    exact_ms = 1000 * (time.perf_counter() - started) / len(vectors)
+    vector_bytes = sum(
+        segment.vectors.nbytes for segment in store.segments if segment.vectors is not None
+    )
+
+    results = []
+    for kind in kinds:
+        index = QuantizedIndex(kind)
+        code_bytes = index.nbytes(store)
+        for rescore in rescores:
+            started = time.perf_counter()
+            found = [index.search(store, v, k, rescore=rescore) for v in vectors]
+            latency_ms = 1000 * (time.perf_counter() - started) / len(vectors)
+            recall = np.mean(
+                [len(truth & set(f.tolist())) / len(truth) for truth, f in zip(exact, found)]
+            )
+            results.append(
+                {
+                    "kind": kind,
+                    "rescore": rescore,
+                    "code_bytes": code_bytes,
+                    "memory_saved": round(1 - code_bytes / vector_bytes, 4),
+                    "recall": round(float(recall), 4),
+                    "recall_lost": round(1 - float(recall), 4),
+                    "latency_ms": round(latency_ms, 3),
+                }
+            )
+
+    return {
+        "rows": len(store),
+        "k": k,
+        "queries": len(vectors),
+        "vector_bytes": vector_bytes,
+        "exact_latency_ms": round(exact_ms, 3),
+        "results": results,
+    }
@@ -0,0 +1,240 @@
+"""Append-only, memory-mapped segment files for chunk embeddings.
+
+A segment is written once and never modified. It consists of four files that
+share a stem:
+
+- ``<stem>.vec``: raw row-major float32 or float16 vectors, L2-normalized.
+- ``<stem>.txt``: UTF-8 chunk texts concatenated into one blob.
+- ``<stem>.off``: little-endian int64 byte offsets into the blob (count + 1).
+- ``<stem>.json``: header with count, dimension and dtype.
+
+Derived indexes such as BM25 postings (``<stem>.bm25``), IVF buckets
+(``<stem>.ivf``), quantized codes (``<stem>.q8``, ``<stem>.qb``), chunk
+fingerprints (``<stem>.mh``) and columnar tables of CSV/JSON files
+(``<stem>.tab``) are stored as sidecars with the same stem and are deleted along
+with the segment. Modules that cache derived data in memory register an
+``on_segment_delete`` hook so the cache entry goes with the files.
+
+The header is renamed into place last, so a segment is visible only once all of
+its data is on disk. Readers map the files with ``np.memmap``; several worker
+processes opening the same segment share its pages through the OS page cache
+instead of each copying the corpus into its own heap.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Sequence
+
+import numpy as np
+
+SEGMENT_SUFFIXES = (".vec", ".txt", ".off", ".bm25", ".ivf", ".q8", ".qb", ".mh", ".tab", ".json")
+SUPPORTED_DTYPES = {"float32", "float16"}
+
+_open_segments: dict[str, "Segment"] = {}
+_open_lock = threading.Lock()
+_delete_hooks: list[Callable[[Path], None]] = []
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Write ``data`` to ``path`` via a temporary file and rename."""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+class SegmentWriter:
+    """Build a segment incrementally, one batch of chunks at a time.
+
+    Data goes to temporary files that are renamed into place by ``commit``, so
+    peak memory is bounded by the batch size rather than the segment size.
+    """
+
+    def __init__(self, stem: Path, dtype: str = "float32", **header: object) -> None:
+        """Start a segment at ``stem``; ``header`` is stored in its metadata."""
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported segment dtype: {dtype}")
+        self.stem = Path(stem)
+        self.dtype = dtype
+        self.header = header
+        self.count = 0
+        self.dim: int | None = None
+        self._bytes = 0
+        tag = f"{os.getpid()}.{threading.get_ident()}.tmp"
+        self._tmp = {
+            suffix: self.stem.with_name(f"{self.stem.name}{suffix}.{tag}")
+            for suffix in (".vec", ".txt", ".off")
+        }
+        self.stem.parent.mkdir(parents=True, exist_ok=True)
+        for path in self._tmp.values():
+            path.write_bytes(b"")
+        self._append(".off", np.zeros(1, dtype="<i8").tobytes())
+
+    def _append(self, suffix: str, data: bytes) -> None:
+        with open(self._tmp[suffix], "ab") as handle:
+            handle.write(data)
+
+    def append(
+        self, texts: Sequence[str], vectors: Sequence[Sequence[float]] | np.ndarray
+    ) -> None:
+        """Append chunks and their embeddings."""
+        if not len(texts):
+            return
+        rows = np.asarray(vectors, dtype=np.float32)
+        if rows.ndim != 2 or rows.shape[0] != len(texts):
+            raise ValueError("vectors must be a 2-D array with one row per text")
+        if self.dim is None:
+            self.dim = int(rows.shape[1])
+        elif rows.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {rows.shape[1]} != {self.dim}")
+
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        encoded = [text.encode("utf-8") for text in texts]
+        offsets = self._bytes + np.cumsum([len(chunk) for chunk in encoded], dtype="<i8")
+        self._append(".vec", (rows / norms).astype(self.dtype).tobytes())
+        self._append(".txt", b"".join(encoded))
+        self._append(".off", offsets.tobytes())
+        self._bytes = int(offsets[-1])
+        self.count += len(encoded)
+
+    def commit(self) -> "Segment":
+        """Move the data into place, write the header last, and open the segment."""
+        for suffix, path in self._tmp.items():
+            os.replace(path, self.stem.with_suffix(suffix))
+        meta = {**self.header, "count": self.count, "dim": self.dim or 0, "dtype": self.dtype}
+        write_atomic(self.stem.with_suffix(".json"), json.dumps(meta).encode("utf-8"))
+        return open_segment(self.stem)
+
+    def abort(self) -> None:
+        """Discard everything written so far."""
+        for path in self._tmp.values():
+            path.unlink(missing_ok=True)
+
+
+def write_segment(
+    stem: Path,
+    texts: Sequence[str],
+    vectors: Sequence[Sequence[float]] | np.ndarray,
+    dtype: str = "float32",
+    **header: object,
+) -> "Segment":
+    """Write a new segment at ``stem`` and return it opened for reading."""
+    writer = SegmentWriter(stem, dtype, **header)
+    try:
+        writer.append(texts, vectors)
+    except Exception:
+        writer.abort()
+        raise
+    return writer.commit()
+
+
+class Segment:
+    """Read-only, memory-mapped view of one segment."""
+
+    def __init__(self, stem: Path) -> None:
+        """Map the segment files stored under ``stem``."""
+        self.stem = Path(stem)
+        self.key = self.stem.name
+        self.header = json.loads(self.stem.with_suffix(".json").read_text("utf-8"))
+        self.count = int(self.header["count"])
+        self.dim = int(self.header["dim"])
+        self.dtype = str(self.header["dtype"])
+        if self.count:
+            self.vectors = np.memmap(
+                self.stem.with_suffix(".vec"),
+                dtype=self.dtype,
+                mode="r",
+                shape=(self.count, self.dim),
+            )
+            self.offsets = np.memmap(
+                self.stem.with_suffix(".off"), dtype="<i8", mode="r", shape=(self.count + 1,)
+            )
+            self._blob = np.memmap(self.stem.with_suffix(".txt"), dtype=np.uint8, mode="r")
+        else:
+            self.vectors = np.empty((0, self.dim), dtype=self.dtype)
+            self.offsets = np.zeros(1, dtype="<i8")
+            self._blob = np.empty(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        """Return the number of chunks in the segment."""
+        return self.count
+
+    def text(self, row: int) -> str:
+        """Decode the chunk text stored at ``row``."""
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return self._blob[start:end].tobytes().decode("utf-8")
+
+    def texts(self) -> list[str]:
+        """Decode every chunk text in the segment."""
+        return [self.text(row) for row in range(self.count)]
+
+
+class TextSegment:
+    """In-memory chunks that have not been embedded or written to disk.
+
+    Used to serve lexical search over files that have no stored segment yet,
+    for example while the embedding service is unreachable. ``key`` is the
+    index key of the file content, when known.
+    """
+
+    stem = None
+    vectors = None
+
+    def __init__(self, texts: Sequence[str], key: str | None = None) -> None:
+        """Hold ``texts`` in memory under the optional index ``key``."""
+        self.key = key
+        self._texts = list(texts)
+        self.count = len(self._texts)
+
+    def __len__(self) -> int:
+        """Return the number of chunks held in memory."""
+        return self.count
+
+    def text(self, row: int) -> str:
+        """Return the chunk text stored at ``row``."""
+        return self._texts[row]
+
+    def texts(self) -> list[str]:
+        """Return every chunk text in the segment."""
+        return list(self._texts)
+
+
+def open_segment(stem: Path) -> Segment | None:
+    """Open a segment, reusing an existing mapping in this process.
+
+    Segments are immutable, so a mapping stays valid for the life of the
+    process. Returns None if the segment is missing or incomplete.
+    """
+    key = str(stem)
+    with _open_lock:
+        segment = _open_segments.get(key)
+        if segment is not None:
+            return segment
+    try:
+        segment = Segment(stem)
+    except (OSError, ValueError, KeyError):
+        return None
+    with _open_lock:
+        return _open_segments.setdefault(key, segment)
+
+
+def on_segment_delete(hook: Callable[[Path], None]) -> Callable[[Path], None]:
+    """Register ``hook(stem)`` to run whenever a segment is deleted; usable as a decorator."""
+    _delete_hooks.append(hook)
+    return hook
+
+
+def delete_segment(stem: Path) -> None:
+    """Remove a segment's files and drop any cached mapping or derived data."""
+    with _open_lock:
+        _open_segments.pop(str(stem), None)
+    for hook in _delete_hooks:
+        hook(Path(stem))
+    # Header first, so readers never open a segment with missing data files.
+    for suffix in reversed(SEGMENT_SUFFIXES):
+        try:
+            Path(stem).with_suffix(suffix).unlink()
+        except OSError:
+            continue
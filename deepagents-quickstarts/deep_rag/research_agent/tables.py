@@ -0,0 +1,546 @@
+"""Row-aware ingestion and a columnar side index for CSV and JSON uploads.
+
+CSV rows and JSON records are read as flat records: nested JSON objects become
+dotted column names (``address.city``) and lists of scalars are joined. Two
+things are built from the records:
+
+- Row-group chunks for embedding: consecutive rows rendered as CSV under a
+  repeated header line, never splitting a row unless it alone exceeds the
+  chunk size.
+- A ``Table`` with one NumPy array per column, saved as a ``<stem>.tab``
+  sidecar next to the file's segment. Numeric columns are float64 with NaN for
+  missing cells; text columns are dictionary-encoded as int32 codes into a
+  label list. The arrays are preallocated after a first pass over the records
+  and filled in batches, so building them never holds a Python object per
+  cell. Filters and aggregates run on these arrays, so exact counts and sums
+  never go through embeddings.
+
+JSON counts as tabular when it holds at least two records: a top-level list, a
+list of objects under some key, or JSON Lines. Other files fall back to plain
+text chunking.
+"""
+
+import csv
+import io
+import itertools
+import json
+import math
+import re
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Sequence
+
+import numpy as np
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from research_agent.segments import on_segment_delete, write_atomic
+
+TABLE_SUFFIXES = {".csv", ".json"}
+AGGREGATES = ("count", "sum", "mean", "min", "max")
+SNIFF_BYTES = 64 * 1024
+TABLE_BATCH_ROWS = 4096
+
+_LEADING_ZERO = re.compile(r"^[+-]?0\d")
+_FILTER = re.compile(r"^\s*(.+?)\s*(==|!=|>=|<=|=|>|<|\scontains\s)\s*(.*?)\s*$", re.IGNORECASE)
+
+_table_cache: dict[str, "Table"] = {}
+_table_lock = threading.Lock()
+
+
+@on_segment_delete
+def _forget_table(stem: Path) -> None:
+    with _table_lock:
+        _table_cache.pop(str(stem.with_suffix(".tab")), None)
+
+
+def _flatten(value: object, prefix: str = "") -> dict[str, object]:
+    """Flatten nested objects into dotted keys with scalar values."""
+    if isinstance(value, dict):
+        flat: dict[str, object] = {}
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    if isinstance(value, list):
+        if all(not isinstance(item, (dict, list)) for item in value):
+            value = "; ".join(_cell(item) for item in value)
+        else:
+            value = json.dumps(value, ensure_ascii=False)
+    return {prefix or "value": value}
+
+
+def _cell(value: object) -> str:
+    """Render a record value as cell text."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _json_records(path: Path) -> list[dict[str, object]] | None:
+    """Return the flattened records of a JSON or JSON Lines file, if it has any."""
+    text = path.read_text("utf-8", errors="ignore")
+    try:
+        data = json.loads(text)
+    except ValueError:
+        try:
+            data = [json.loads(line) for line in text.splitlines() if line.strip()]
+        except ValueError:
+            return None
+
+    if isinstance(data, dict):
+        # An envelope such as {"data": [...]}: take its largest list of objects.
+        lists = [
+            value
+            for value in data.values()
+            if isinstance(value, list) and value and all(isinstance(v, dict) for v in value)
+        ]
+        data = max(lists, key=len) if lists else [data]
+    if not isinstance(data, list):
+        return None
+    return [_flatten(item) for item in data]
+
+
+def _iter_csv_records(path: Path, dialect: type[csv.Dialect]) -> Iterator[dict[str, object]]:
+    with open(path, newline="", encoding="utf-8", errors="ignore") as handle:
+        reader = csv.reader(handle, dialect)
+        header = next(reader, None) or []
+        names = [name.strip() or f"column_{idx + 1}" for idx, name in enumerate(header)]
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            if len(row) > len(names):
+                names += [f"column_{idx + 1}" for idx in range(len(names), len(row))]
+            yield dict(zip(names, row))
+
+
+def _csv_dialect(path: Path) -> type[csv.Dialect] | None:
+    """Detect the delimiter of a CSV file with a header and at least one row."""
+    with open(path, newline="", encoding="utf-8", errors="ignore") as handle:
+        sample = handle.read(SNIFF_BYTES)
+    if sample.count("\n") < 1:
+        return None
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        return csv.excel
+
+
+def iter_records(path: Path) -> Iterator[dict[str, object]] | None:
+    """Return an iterator over a file's flat records, or None if it is not tabular.
+
+    CSV files are streamed row by row; JSON files are parsed whole.
+    """
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        dialect = _csv_dialect(path)
+        return None if dialect is None else _iter_csv_records(path, dialect)
+    if suffix == ".json":
+        records = _json_records(path)
+        return iter(records) if records is not None and len(records) >= 2 else None
+    return None
+
+
+def _render(cells: Iterable[object]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="").writerow([_cell(cell) for cell in cells])
+    return buffer.getvalue()
+
+
+def _render_group(rows: list[dict[str, object]], columns: list[str]) -> str:
+    lines = [_render(columns)]
+    lines.extend(_render(row.get(column) for column in columns) for row in rows)
+    return "\n".join(lines)
+
+
+def iter_row_chunks(path: Path, chunk_size: int = 800) -> Iterator[str] | None:
+    """Return row-group chunks of a CSV or JSON file, or None if it is not tabular.
+
+    Each chunk is a header line naming the columns present in the group,
+    followed by whole rows up to about ``chunk_size`` characters. A row that
+    alone exceeds the chunk size is split, with the header repeated on every
+    piece.
+    """
+    records = iter_records(path)
+    if records is None:
+        return None
+    return _iter_row_groups(records, chunk_size)
+
+
+def _iter_row_groups(records: Iterator[dict[str, object]], chunk_size: int) -> Iterator[str]:
+    columns: dict[str, None] = {}
+    rows: list[dict[str, object]] = []
+    size = 0
+    for record in records:
+        line = len(_render(record.values())) + 1
+        # A row costs its line plus header space for the columns it adds to the group.
+        cost = line + sum(len(name) + 1 for name in record if name not in columns)
+        if rows and size + cost > chunk_size:
+            yield _render_group(rows, list(columns))
+            columns, rows, size = {}, [], 0
+            cost = line + sum(len(name) + 1 for name in record)
+        if not rows and cost > chunk_size:
+            yield from _split_row(_render(record), _render(record.values()), chunk_size)
+            continue
+        columns.update(dict.fromkeys(record))
+        rows.append(record)
+        size += cost
+    if rows:
+        yield _render_group(rows, list(columns))
+
+
+def _split_row(header: str, row: str, chunk_size: int) -> Iterator[str]:
+    """Split one oversized row, prefixing every piece with the header."""
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=max(chunk_size - len(header) - 1, chunk_size // 4), chunk_overlap=0
+    )
+    for piece in splitter.split_text(row):
+        yield f"{header}\n{piece}"
+
+
+class Column:
+    """One column of a table: float64 values, or int32 codes into ``labels``."""
+
+    def __init__(self, name: str, values: np.ndarray, labels: list[str] | None = None) -> None:
+        """Wrap column values; ``labels`` makes it a categorical column."""
+        self.name = name
+        self.values = values
+        self.labels = labels
+
+    @property
+    def numeric(self) -> bool:
+        """Return True for float columns, False for categorical ones."""
+        return self.labels is None
+
+    @classmethod
+    def from_cells(cls, name: str, cells: Sequence[object]) -> "Column":
+        """Build a numeric column if every present cell parses as a number."""
+        texts = [_cell(cell).strip() for cell in cells]
+        builder = _ColumnBuilder(name, len(texts), all(_is_number(text) for text in texts))
+        builder.fill(0, texts)
+        return builder.column()
+
+    def missing(self) -> np.ndarray:
+        """Return a mask of rows without a value."""
+        return np.isnan(self.values) if self.numeric else self.values < 0
+
+    def cell(self, row: int) -> str:
+        """Render one cell for display."""
+        value = self.values[row]
+        if self.numeric:
+            return "" if math.isnan(value) else format_number(value)
+        return "" if value < 0 else self.labels[value]
+
+    def match(self, op: str, operand: str) -> np.ndarray:
+        """Return the mask of rows whose value satisfies ``<op> operand``.
+
+        Text equality and ``contains`` ignore case. Comparisons on a text column
+        are lexicographic, which orders ISO dates correctly.
+        """
+        if op == "contains":
+            needle = operand.casefold()
+            if self.numeric:
+                return np.array([needle in self.cell(row) for row in range(len(self.values))])
+            hits = [code for code, label in enumerate(self.labels) if needle in label.casefold()]
+            return np.isin(self.values, hits)
+
+        if self.numeric:
+            try:
+                target = float(operand)
+            except ValueError:
+                raise ValueError(
+                    f"Column '{self.name}' is numeric; cannot compare it with '{operand}'."
+                ) from None
+            with np.errstate(invalid="ignore"):
+                return _COMPARE[op](self.values, target) & ~self.missing()
+
+        if op in ("==", "!="):
+            wanted = operand.casefold()
+            hits = [code for code, label in enumerate(self.labels) if label.casefold() == wanted]
+            mask = np.isin(self.values, hits)
+            return mask if op == "==" else ~mask & ~self.missing()
+        hits = [code for code, label in enumerate(self.labels) if _COMPARE[op](label, operand)]
+        return np.isin(self.values, hits)
+
+
+def _is_number(text: str) -> bool:
+    """Return whether a stripped cell may sit in a numeric column (empty cells may)."""
+    if not text:
+        return True
+    # Codes with leading zeros (zip codes, IDs) stay text so they keep their digits.
+    if _LEADING_ZERO.match(text):
+        return False
+    try:
+        return not math.isinf(float(text))
+    except ValueError:
+        return False
+
+
+class _ColumnBuilder:
+    """Preallocated column filled one batch of cell texts at a time."""
+
+    def __init__(self, name: str, rows: int, numeric: bool) -> None:
+        self.name = name
+        self.numeric = numeric
+        if numeric:
+            self.values = np.full(rows, math.nan, dtype=np.float64)
+        else:
+            self.values = np.full(rows, -1, dtype=np.int32)
+        self.labels: dict[str, int] = {}
+
+    def fill(self, start: int, texts: Sequence[str]) -> None:
+        """Store the stripped cell texts of rows ``start`` onwards."""
+        stop = start + len(texts)
+        if self.numeric:
+            self.values[start:stop] = [float(text) if text else math.nan for text in texts]
+            return
+        labels = self.labels
+        self.values[start:stop] = [
+            labels.setdefault(text, len(labels)) if text else -1 for text in texts
+        ]
+
+    def column(self) -> Column:
+        return Column(self.name, self.values, None if self.numeric else list(self.labels))
+
+
+_COMPARE = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+}
+
+
+def format_number(value: float) -> str:
+    """Render a number without float noise; integers print without a decimal point."""
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return f"{value:.6g}"
+
+
+def parse_filter(condition: str) -> tuple[str, str, str]:
+    """Split ``"<column> <op> <value>"`` into its parts; quotes around the value are dropped."""
+    match = _FILTER.match(condition)
+    if match is None:
+        raise ValueError(
+            f"Cannot parse condition '{condition}'. Use '<column> <op> <value>' with op one of "
+            "==, !=, >, >=, <, <=, contains."
+        )
+    column, op, value = match.groups()
+    op = op.strip().lower()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+        value = value[1:-1]
+    return column.strip("'\"` "), "==" if op == "=" else op, value
+
+
+class Table:
+    """Columnar copy of a CSV or JSON file's records."""
+
+    def __init__(self, columns: list[Column], rows: int) -> None:
+        """Wrap typed columns holding ``rows`` records each."""
+        self.columns = columns
+        self.rows = rows
+        self._by_name = {column.name.casefold(): column for column in columns}
+
+    def __len__(self) -> int:
+        """Return the number of records."""
+        return self.rows
+
+    @classmethod
+    def from_records(cls, records: Callable[[], Iterable[dict[str, object]]]) -> "Table":
+        """Build typed columns from two passes over ``records()``; missing cells stay empty.
+
+        The first pass counts rows and decides which columns are numeric. The
+        second fills preallocated float64 or int32 arrays ``TABLE_BATCH_ROWS``
+        records at a time, so besides the arrays only the text labels and one
+        batch of cells are held, never a Python object per cell.
+        """
+        numeric: dict[str, bool] = {}
+        rows = 0
+        for record in records():
+            for name, value in record.items():
+                if numeric.setdefault(name, True):
+                    numeric[name] = _is_number(_cell(value).strip())
+            rows += 1
+
+        builders = [_ColumnBuilder(name, rows, is_numeric) for name, is_numeric in numeric.items()]
+        # Rows beyond the first pass's count (a file rewritten meanwhile) are ignored.
+        source = itertools.islice(records(), rows)
+        start = 0
+        while batch := list(itertools.islice(source, TABLE_BATCH_ROWS)):
+            for builder in builders:
+                builder.fill(start, [_cell(record.get(builder.name)).strip() for record in batch])
+            start += len(batch)
+        return cls([builder.column() for builder in builders], rows)
+
+    def column(self, name: str) -> Column:
+        """Look up a column by name, ignoring case."""
+        column = self._by_name.get(name.strip().casefold())
+        if column is None:
+            names = ", ".join(column.name for column in self.columns)
+            raise ValueError(f"Unknown column '{name}'. Columns: {names}")
+        return column
+
+    def mask(self, conditions: Sequence[str]) -> np.ndarray:
+        """Return the rows meeting every condition (see ``parse_filter``)."""
+        mask = np.ones(self.rows, dtype=bool)
+        for condition in conditions:
+            name, op, value = parse_filter(condition)
+            mask &= self.column(name).match(op, value)
+        return mask
+
+    def aggregate(
+        self,
+        op: str,
+        mask: np.ndarray,
+        target: str | None = None,
+        group_by: str | None = None,
+    ) -> list[tuple[str, float, int]]:
+        """Aggregate matching rows, optionally per group.
+
+        Returns ``(group label, value, rows)`` tuples, largest value first (smallest
+        first for ``min``). Without ``group_by`` there is one tuple with an empty
+        label. ``count`` counts rows, or rows with a value when ``target`` is given.
+        """
+        if op not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate '{op}'. Use one of: {', '.join(AGGREGATES)}.")
+        if op != "count" and target is None:
+            raise ValueError(f"Aggregate '{op}' needs a numeric column.")
+
+        values = np.ones(self.rows)
+        present = mask.copy()
+        if target is not None:
+            column = self.column(target)
+            if not column.numeric and op != "count":
+                raise ValueError(f"Column '{column.name}' is not numeric; only count applies.")
+            present &= ~column.missing()
+            if column.numeric:
+                values = column.values
+
+        if group_by is None:
+            groups, labels = np.zeros(self.rows, dtype=np.int64), [""]
+        else:
+            groups, labels = self._groups(self.column(group_by))
+
+        size = len(labels)
+        rows = np.bincount(groups[mask], minlength=size)
+        counts = np.bincount(groups[present], minlength=size)
+        if op == "count":
+            result = counts.astype(np.float64)
+        elif op in ("sum", "mean"):
+            result = np.bincount(groups[present], weights=values[present], minlength=size)
+            if op == "mean":
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    result = result / counts
+        else:
+            result = np.full(size, np.inf if op == "min" else -np.inf)
+            ufunc = np.minimum if op == "min" else np.maximum
+            ufunc.at(result, groups[present], values[present])
+
+        keep = np.flatnonzero(rows if group_by is not None else np.ones(1, dtype=bool))
+        keep = keep[np.isfinite(result[keep]) | (op == "count")]
+        order = keep[np.argsort(result[keep] if op == "min" else -result[keep], kind="stable")]
+        return [(labels[g], float(result[g]), int(rows[g])) for g in order]
+
+    @staticmethod
+    def _groups(column: Column) -> tuple[np.ndarray, list[str]]:
+        """Map rows to group ids, with missing values grouped under ``(missing)``."""
+        if column.numeric:
+            uniques, inverse = np.unique(column.values, return_inverse=True)
+            labels = ["(missing)" if math.isnan(v) else format_number(v) for v in uniques]
+            return inverse.astype(np.int64), labels
+        return (column.values + 1).astype(np.int64), ["(missing)", *column.labels]
+
+    def render(self, rows: np.ndarray, columns: Sequence[str] | None = None) -> str:
+        """Render rows as a pipe-separated table with a header line."""
+        picked = [self.column(name) for name in columns] if columns else self.columns
+        lines = [" | ".join(column.name for column in picked)]
+        lines.extend(" | ".join(column.cell(int(row)) for column in picked) for row in rows)
+        return "\n".join(lines)
+
+    def describe(self) -> list[str]:
+        """Summarize each column: its kind and value range or distinct count."""
+        lines = []
+        for column in self.columns:
+            missing = int(column.missing().sum())
+            note = f", {missing} missing" if missing else ""
+            if column.numeric and missing < self.rows:
+                values = column.values[~column.missing()]
+                lines.append(
+                    f"- {column.name} (number, min {format_number(values.min())}, "
+                    f"max {format_number(values.max())}, mean {format_number(values.mean())}{note})"
+                )
+            elif column.numeric:
+                lines.append(f"- {column.name} (empty)")
+            else:
+                lines.append(f"- {column.name} (text, {len(column.labels)} distinct{note})")
+        return lines
+
+    def to_bytes(self) -> bytes:
+        """Serialize the table for a ``.tab`` sidecar."""
+        header = {
+            "rows": self.rows,
+            "columns": [column.name for column in self.columns],
+            "numeric": [column.numeric for column in self.columns],
+        }
+        arrays = {"header": np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8)}
+        for idx, column in enumerate(self.columns):
+            arrays[f"values_{idx}"] = column.values
+            if not column.numeric:
+                encoded = [label.encode("utf-8") for label in column.labels]
+                arrays[f"labels_{idx}"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+                arrays[f"offsets_{idx}"] = np.cumsum([0, *map(len, encoded)], dtype=np.int64)
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_file(cls, sidecar: Path) -> "Table":
+        """Load a table saved by ``to_bytes``."""
+        with np.load(sidecar) as data:
+            header = json.loads(data["header"].tobytes().decode("utf-8"))
+            columns = []
+            for idx, (name, numeric) in enumerate(zip(header["columns"], header["numeric"])):
+                labels = None
+                if not numeric:
+                    blob = data[f"labels_{idx}"].tobytes()
+                    offsets = data[f"offsets_{idx}"]
+                    labels = [
+                        blob[start:end].decode("utf-8")
+                        for start, end in zip(offsets[:-1], offsets[1:])
+                    ]
+                columns.append(Column(name, data[f"values_{idx}"], labels))
+        return cls(columns, header["rows"])
+
+
+def load_table(sidecar: Path, path: Path) -> Table | None:
+    """Return the columnar table of a file, building the ``sidecar`` on first use.
+
+    ``sidecar`` is derived from the index key of the file's current content, so
+    an edited file gets a new table. Returns None for files that are not tabular.
+    """
+    key = str(sidecar)
+    with _table_lock:
+        cached = _table_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        table = Table.from_file(sidecar)
+    except (OSError, ValueError, KeyError):
+        records = iter_records(path)
+        if records is None:
+            return None
+        # The first pass reuses the records already opened; the second reopens the file.
+        pending = [records]
+        table = Table.from_records(lambda: pending.pop() if pending else iter_records(path))
+        try:
+            sidecar.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(sidecar, table.to_bytes())
+        except OSError:
+            pass
+
+    with _table_lock:
+        return _table_cache.setdefault(key, table)
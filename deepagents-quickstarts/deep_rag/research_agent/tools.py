@@ -1,72 +1,521 @@
-"""RAG tools for answering questions against uploaded files."""
+"""RAG tools for answering questions against uploaded files.
 
+Every tool is synchronous for ``invoke``. The retrieval and listing tools also
+carry a native coroutine for ``ainvoke``, which LangGraph uses in async runs:
+embedding calls are awaited and disk or NumPy work runs in worker threads.
+"""
+
+import asyncio
+import logging
 import os
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from itertools import groupby
 from pathlib import Path
-from typing import Iterable, Sequence
+from typing import Iterable, Iterator, Sequence
 
+import numpy as np
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_core.tools import InjectedToolArg, tool
-from langchain_core.vectorstores import InMemoryVectorStore
-from langchain_openai import OpenAIEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from typing_extensions import Annotated
 
+from research_agent.ann import IVFIndex
+from research_agent.bm25 import BM25Index, load_postings, reciprocal_rank_fusion
+from research_agent.cache import LRUCache, normalize_query
+from research_agent.chunking import chunk_format, iter_file_chunks
+from research_agent.dedup import (
+    DuplicateIndex,
+    collapse_rows,
+    earlier_duplicates,
+    fingerprint,
+    load_fingerprints,
+    save_fingerprints,
+)
+from research_agent.embeddings import create_embeddings
+from research_agent.index import UploadIndex
+from research_agent.ingest import StageTimings, iter_split_files
+from research_agent.listing import (
+    DirectoryListing,
+    FileEntry,
+    filter_entries,
+    format_size,
+)
+from research_agent.packing import pack_context
+from research_agent.pipeline import EmbeddingPipeline, cooling_down
+from research_agent.quantize import QuantizedIndex
+from research_agent.segments import Segment, SegmentWriter, TextSegment
+from research_agent.tables import Table, format_number, load_table
+from research_agent.vectorstore import NumpyVectorStore, SegmentStore, top_k_indices
+from research_agent.watcher import UploadWatcher, iter_upload_files
+
 DEFAULT_UPLOAD_DIR = Path(
     os.getenv("UPLOAD_DIR", Path(__file__).resolve().parents[3] / "uploads")
 )
-MAX_FILE_BYTES = 15 * 1024 * 1024  # 15 MB
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
 EMBEDDING_BASE_URL = os.getenv("EMBEDDING_BASE_URL")
 EMBEDDING_API_KEY = os.getenv("EMBEDDING_API_KEY")
+RAG_INDEX_DIR = os.getenv("RAG_INDEX_DIR")
+RAG_VECTOR_DTYPE = os.getenv("RAG_VECTOR_DTYPE", "float32")
+RAG_SEARCH_MODE = os.getenv("RAG_SEARCH_MODE", "hybrid")
+SEARCH_MODES = ("hybrid", "dense", "lexical")
+HYBRID_CANDIDATES = 50
+MAX_BATCH_QUERIES = 8
+LIST_PAGE_SIZE = 50
+RAG_CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", "1200"))
+RAG_MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+MMR_CANDIDATES = 20
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "3"))
+EMBEDDING_FAILURE_COOLDOWN = float(os.getenv("EMBEDDING_FAILURE_COOLDOWN", "30"))
+INGEST_GROUP_CHUNKS = 1024
+RAG_INGEST_WORKERS = int(os.getenv("RAG_INGEST_WORKERS", "1"))
+INGEST_PARALLEL_MIN_FILES = 8
+INGEST_DEDUP_RECENT = 8192
+RAG_NEAR_DUP_THRESHOLD = float(os.getenv("RAG_NEAR_DUP_THRESHOLD", "0.9"))
+RAG_ANN = os.getenv("RAG_ANN", "").strip().lower()
+RAG_ANN_NPROBE = int(os.getenv("RAG_ANN_NPROBE", "8"))
+RAG_ANN_MIN_ROWS = int(os.getenv("RAG_ANN_MIN_ROWS", "50000"))
+RAG_QUANTIZATION = os.getenv("RAG_QUANTIZATION", "").strip().lower()
+RAG_RESCORE_FACTOR = int(os.getenv("RAG_RESCORE_FACTOR") or "0")
 
+RAG_WATCH_INTERVAL = float(os.getenv("RAG_WATCH_INTERVAL", "2"))
+RAG_QUERY_CACHE_SIZE = int(os.getenv("RAG_QUERY_CACHE_SIZE", "1024"))
+RAG_RESULT_CACHE_SIZE = int(os.getenv("RAG_RESULT_CACHE_SIZE", "256"))
 
-def _load_text_files(
-    upload_dir: Path, only: Sequence[str] | None = None
-) -> list[Document]:
-    """Load text-like files from disk into Document objects."""
+_registry_lock = threading.Lock()
+_indexes: dict[str, UploadIndex] = {}
+_ingest_locks: dict[str, threading.RLock] = {}
+_ann_indexes: dict[str, IVFIndex] = {}
+_duplicate_indexes: dict[str, DuplicateIndex] = {}
+_quantized: QuantizedIndex | None = None
+_watchers: dict[str, UploadWatcher] = {}
+_listings: dict[str, DirectoryListing] = {}
+_query_embeddings = LRUCache(RAG_QUERY_CACHE_SIZE)
+_results = LRUCache(RAG_RESULT_CACHE_SIZE)
+_result_versions: dict[str, str] = {}
+_lexical_indexes = LRUCache(8)
+_grounding_filters = LRUCache(64)
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 200
+TEXT_SUFFIXES = {".txt", ".md", ".markdown", ".json", ".csv", ".log"}
+
+logger = logging.getLogger(__name__)
+
+
+def _iter_text_files(upload_dir: Path, only: Sequence[str] | None = None) -> Iterator[Path]:
+    """Yield supported upload files in path order, honoring an optional allowlist.
+
+    Bucket subdirectories are included; allowlist entries may name a file by its
+    bare name or by its path relative to the upload directory.
+    """
     if not upload_dir.exists():
-        return []
+        return
 
     allowlist = {name.lower() for name in only} if only else None
-    documents: list[Document] = []
-    splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=200)
-
-    for path in sorted(upload_dir.iterdir()):
-        if not path.is_file():
+    for path in iter_upload_files(upload_dir, TEXT_SUFFIXES):
+        if allowlist and not (
+            path.name.lower() in allowlist
+            or path.relative_to(upload_dir).as_posix().lower() in allowlist
+        ):
             continue
 
-        if allowlist and path.name.lower() not in allowlist:
-            continue
+        yield path
 
-        if path.suffix.lower() not in {".txt", ".md", ".markdown", ".json", ".csv"}:
-            continue
 
-        try:
-            size_bytes = path.stat().st_size
-            if size_bytes > MAX_FILE_BYTES:
-                continue
+def _file_metadata(path: Path, upload_dir: Path, size_bytes: int) -> dict:
+    """Build the metadata attached to every chunk of a file."""
+    return {
+        "source": path.relative_to(upload_dir).as_posix(),
+        "path": str(path),
+        "bytes": size_bytes,
+    }
 
-            content = path.read_text(encoding="utf-8", errors="ignore")
-            if not content.strip():
-                continue
 
-            base_doc = Document(
-                page_content=content,
-                metadata={
-                    "source": path.name,
-                    "path": str(path),
-                    "bytes": size_bytes,
-                },
+def _load_text_files(
+    upload_dir: Path,
+    only: Sequence[str] | None = None,
+    workers: int | None = None,
+) -> list[Document]:
+    """Load text-like files from disk into Document objects.
+
+    With ``workers`` > 1 (default ``RAG_INGEST_WORKERS``), files are read and
+    split in a process pool. Documents are ordered by file path either way.
+    """
+    timings = StageTimings()
+    with timings.stage("scan"):
+        paths = list(_iter_text_files(upload_dir, only))
+
+    documents: list[Document] = []
+    for path, chunks in _iter_split(paths, workers, timings):
+        try:
+            metadata = _file_metadata(path, upload_dir, path.stat().st_size)
+            documents.extend(
+                Document(page_content=chunk, metadata=dict(metadata))
+                for chunk in timings.timed("split", chunks)
             )
-            documents.extend(splitter.split_documents([base_doc]))
         except Exception:
             continue
 
+    logger.info(
+        "Loaded %d chunks from %d files (%s)", len(documents), len(paths), timings.summary()
+    )
     return documents
 
 
-def _build_vector_store(docs: Iterable[Document]) -> InMemoryVectorStore | None:
-    """Create an in-memory vector store from the provided documents."""
+def _iter_chunks(path: Path) -> Iterator[str]:
+    """Stream a file's chunks with the configured size and overlap."""
+    return iter_file_chunks(path, CHUNK_SIZE, CHUNK_OVERLAP)
+
+
+def _iter_split(
+    paths: Sequence[Path], workers: int | None, timings: StageTimings
+) -> Iterator[tuple[Path, Iterable[str]]]:
+    """Split files in path order, in a process pool when ``workers`` > 1."""
+    split = iter_split_files(
+        paths,
+        CHUNK_SIZE,
+        CHUNK_OVERLAP,
+        workers=RAG_INGEST_WORKERS if workers is None else workers,
+        min_files=INGEST_PARALLEL_MIN_FILES,
+    )
+    return timings.timed("split", split)
+
+
+def _get_embeddings() -> Embeddings:
+    """Create the embeddings backend configured by the EMBEDDING_* env vars."""
+    return create_embeddings(
+        EMBEDDING_MODEL, base_url=EMBEDDING_BASE_URL, api_key=EMBEDDING_API_KEY
+    )
+
+
+def _get_index(upload_dir: Path) -> UploadIndex:
+    """Return the persistent embedding index for an upload directory."""
+    root = Path(RAG_INDEX_DIR) if RAG_INDEX_DIR else upload_dir / ".rag_index"
+    with _registry_lock:
+        index = _indexes.get(str(root))
+        if index is None:
+            index = _indexes[str(root)] = UploadIndex(
+                root, EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, dtype=RAG_VECTOR_DTYPE
+            )
+            _ingest_locks[str(root)] = threading.RLock()
+    return index
+
+
+def _load_segment_store(
+    upload_dir: Path,
+    embeddings: Embeddings | None,
+    only: Sequence[str] | None = None,
+    prune: bool = False,
+) -> SegmentStore:
+    """Open indexed segments for uploads, embedding only files missing from the index.
+
+    Files are identified by a hash of their bytes, so renamed or unchanged files
+    reuse stored segments, and identical copies of a file share one store entry
+    whose ``sources`` metadata lists every copy. With ``prune``, the caller holds
+    the index's ingest lock (see ``_sync_segment_store``), and segments of
+    files under ``upload_dir`` that were edited or deleted are removed once this
+    scan is done, so no ingest can be committing them meanwhile. Without
+    ``embeddings``, files missing from the index are split into in-memory text
+    segments that only support lexical search, so no embedding call is made.
+    """
+    index = _get_index(upload_dir)
+    store = SegmentStore(embeddings)
+    entries: dict[str, dict] = {}
+    segments: dict[str, Segment | TextSegment] = {}
+    missing: dict[str, Path] = {}
+    seen: set[str] = set()
+    timings = StageTimings()
+
+    for path in timings.timed("scan", _iter_text_files(upload_dir, only)):
+        with timings.stage("hash"):
+            try:
+                stat = path.stat()
+                key = index.path_key(path, stat)
+            except OSError:
+                continue
+
+        seen.add(str(path))
+        if key in entries:
+            # Identical content is searched and cited once, under every copy.
+            entries[key]["sources"].append(path.relative_to(upload_dir).as_posix())
+            continue
+        metadata = _file_metadata(path, upload_dir, stat.st_size)
+        entries[key] = {**metadata, "sources": [metadata["source"]]}
+        segment = index.get(key)
+        if segment is not None:
+            segments[key] = segment
+        else:
+            missing[key] = path
+
+    if missing:
+        # Serialize ingestion so the watcher and concurrent queries never embed
+        # the same file twice; whoever waits picks up the other's segments.
+        with _ingest_locks[str(index.root)]:
+            for key in list(missing):
+                segment = index.get(key)
+                if segment is not None:
+                    segments[key] = segment
+                    del missing[key]
+            segments.update(
+                _embed_missing(index, embeddings, missing, timings, list(segments.values()))
+            )
+            with timings.stage("tables"):
+                for key, path in missing.items():
+                    if chunk_format(path) == "rows":
+                        load_table(index.sidecar(key, ".tab"), path)
+        # New or edited contents may not have moved a directory mtime.
+        _get_listing(upload_dir).invalidate()
+        embedded = sum(1 for key in missing if isinstance(segments[key], Segment))
+        logger.info(
+            "Ingested %d new files, %d embedded and %d keyword-only (%s)",
+            len(missing),
+            embedded,
+            len(missing) - embedded,
+            timings.summary(),
+        )
+
+    for key, metadata in entries.items():
+        store.add_segment(segments[key], metadata)
+
+    if prune and not only:
+        index.forget_paths_except(seen, upload_dir)
+        index.prune()
+    index.save_manifest()
+
+    return store
+
+
+def _sync_segment_store(upload_dir: Path, embeddings: Embeddings | None) -> SegmentStore:
+    """Open the segments of every upload and prune those of edited or deleted files.
+
+    The scan runs under the index's ingest lock, so pruning never races an
+    ingest committing a file the scan did not see. Both the upload watcher and
+    the search tools call this, so deleted uploads are pruned even when the
+    watcher is disabled.
+    """
+    with _ingest_locks[str(_get_index(upload_dir).root)]:
+        return _load_segment_store(upload_dir, embeddings, prune=True)
+
+
+def _duplicate_index(
+    index: UploadIndex, live: Iterable[Segment | TextSegment]
+) -> DuplicateIndex:
+    """Return the chunk fingerprint index of an upload index.
+
+    Live embedded segments are registered on first sight from their ``.mh``
+    sidecars, without filling the fingerprint cache, and segments that no
+    longer exist are discarded, so it never points at deleted rows for long.
+    """
+    with _registry_lock:
+        duplicates = _duplicate_indexes.get(str(index.root))
+        if duplicates is None:
+            duplicates = _duplicate_indexes[str(index.root)] = DuplicateIndex(
+                RAG_NEAR_DUP_THRESHOLD
+            )
+    duplicates.discard([key for key in duplicates.owners() if index.get(key) is None])
+    for segment in live:
+        if isinstance(segment, Segment) and segment.key not in duplicates:
+            duplicates.add(segment.key, *load_fingerprints(segment, cache=False))
+    return duplicates
+
+
+def _stored_vector(
+    index: UploadIndex, ref: tuple[str, int], recent: LRUCache
+) -> np.ndarray | None:
+    """Return the embedding of a registered chunk, or None if it is gone."""
+    vector = recent.get(ref)
+    if vector is None:
+        key, row = ref
+        segment = index.get(key)
+        if segment is not None and row < len(segment):
+            vector = np.asarray(segment.vectors[row], dtype=np.float32)
+    return vector
+
+
+def _embed_missing(
+    index: UploadIndex,
+    embeddings: Embeddings | None,
+    missing: dict[str, Path],
+    timings: StageTimings | None = None,
+    live: Iterable[Segment | TextSegment] = (),
+) -> dict[str, Segment | TextSegment]:
+    """Stream new files through the embedding pipeline into index segments.
+
+    Chunks from all new files are embedded together in groups of
+    ``INGEST_GROUP_CHUNKS`` and appended to per-file segment writers, so memory
+    stays bounded by the group size however large the files are. Files whose
+    chunks all embedded are committed to the index; a file with any failed chunk
+    is discarded to an in-memory text segment (lexical search only) and retried
+    on the next query, without re-embedding the files that succeeded. While the
+    embedder cools down after a failure (``EMBEDDING_FAILURE_COOLDOWN``), new
+    files are not sent to it at all.
+
+    A chunk identical or near-identical (``RAG_NEAR_DUP_THRESHOLD``) to one
+    already embedded, in ``live`` segments or earlier in this ingest, reuses that
+    embedding instead of being sent to the embedding service.
+
+    Reading and splitting go through a process pool when ``RAG_INGEST_WORKERS``
+    is above 1; time spent splitting, deduplicating, embedding and writing is
+    added to ``timings``.
+    """
+    timings = timings or StageTimings()
+    keys = {path: key for key, path in missing.items()}
+    split = _iter_split(list(missing.values()), None, timings)
+    if embeddings is None or cooling_down(embeddings):
+        if embeddings is not None:
+            logger.info("Not embedding %d new files: embedding service failed recently", len(keys))
+        return {
+            keys[path]: TextSegment(list(timings.timed("split", chunks)), key=keys[path])
+            for path, chunks in split
+        }
+
+    pipeline = EmbeddingPipeline(
+        embeddings,
+        batch_size=EMBEDDING_BATCH_SIZE,
+        max_concurrency=EMBEDDING_MAX_CONCURRENCY,
+        max_retries=EMBEDDING_MAX_RETRIES,
+        failure_cooldown=EMBEDDING_FAILURE_COOLDOWN,
+    )
+    duplicates = _duplicate_index(index, live)
+    recent = LRUCache(INGEST_DEDUP_RECENT)
+    next_row: defaultdict[str, int] = defaultdict(int)
+    fingerprints: dict[str, list[tuple[np.ndarray, np.ndarray]]] = defaultdict(list)
+    writers: dict[str, SegmentWriter] = {}
+    failed: set[str] = set()
+    pending: list[tuple[str, str]] = []
+    counts = {"chunks": 0, "embedded": 0, "reused": 0, "failed": 0}
+
+    def signature_of(ref: tuple[str, int]) -> np.ndarray | None:
+        key, row = ref
+        blocks = fingerprints.get(key)
+        if blocks is None:
+            segment = index.get(key)
+            if segment is None or row >= len(segment):
+                return None
+            blocks = [load_fingerprints(segment)]
+        for _, signatures in blocks:
+            if row < len(signatures):
+                return signatures[row]
+            row -= len(signatures)
+        return None
+
+    def flush() -> None:
+        texts = [text for _, text in pending]
+        with timings.stage("dedup"):
+            digests, signatures = fingerprint(texts)
+            refs: list[tuple[str, int]] = []
+            for key, _ in pending:
+                refs.append((key, next_row[key]))
+                next_row[key] += 1
+            matches = duplicates.match(digests, signatures, signature_of)
+            earlier = earlier_duplicates(digests, signatures, RAG_NEAR_DUP_THRESHOLD)
+            vectors: list[np.ndarray | None] = [None] * len(pending)
+            # Chunks to embed, keyed by their ref, with the positions sharing each result.
+            groups: dict[tuple[str, int], list[int]] = {}
+            leaders: dict[int, tuple[str, int]] = {}
+            for pos, ref in enumerate(refs):
+                match, first = matches[pos], int(earlier[pos])
+                if match is not None and (
+                    vector := _stored_vector(index, match, recent)
+                ) is not None:
+                    vectors[pos] = vector
+                elif first >= 0 and vectors[first] is not None:
+                    vectors[pos] = vectors[first]
+                elif first >= 0:
+                    leaders[pos] = leaders[first]
+                    groups[leaders[pos]].append(pos)
+                else:
+                    leaders[pos] = ref
+                    groups[ref] = [pos]
+            start = 0
+            for key, group in groupby(pending, key=lambda item: item[0]):
+                block = slice(start, start + len(list(group)))
+                start = block.stop
+                duplicates.add(key, digests[block], signatures[block], refs[block.start][1])
+                fingerprints[key].append((digests[block], signatures[block]))
+        counts["chunks"] += len(pending)
+        counts["reused"] += len(pending) - sum(len(positions) for positions in groups.values())
+
+        with timings.stage("embed"):
+            embedded = pipeline.embed([texts[positions[0]] for positions in groups.values()])
+            for positions, vector in zip(groups.values(), embedded):
+                if vector is None:
+                    counts["failed"] += len(positions)
+                else:
+                    counts["embedded"] += 1
+                    counts["reused"] += len(positions) - 1
+                for pos in positions:
+                    vectors[pos] = vector
+        for ref, vector in zip(refs, vectors):
+            if vector is not None:
+                recent.put(ref, vector)
+
+        with timings.stage("write"):
+            start = 0
+            for key, group in groupby(pending, key=lambda item: item[0]):
+                block = slice(start, start + len(list(group)))
+                start = block.stop
+                if key in failed:
+                    continue
+                if any(vector is None for vector in vectors[block]):
+                    failed.add(key)
+                    continue
+                writers[key].append(texts[block], vectors[block])
+        pending.clear()
+
+    try:
+        for path, chunks in split:
+            key = keys[path]
+            writers[key] = index.writer(key)
+            for text in timings.timed("split", chunks):
+                if key in failed:
+                    break
+                pending.append((key, text))
+                if len(pending) >= INGEST_GROUP_CHUNKS:
+                    flush()
+        if pending:
+            flush()
+    except BaseException:
+        for writer in writers.values():
+            writer.abort()
+        raise
+
+    segments: dict[str, Segment | TextSegment] = {}
+    for key, path in missing.items():
+        if key in failed:
+            writers[key].abort()
+            segments[key] = TextSegment(list(_iter_chunks(path)), key=key)
+            continue
+        with timings.stage("write"):
+            segment = segments[key] = writers[key].commit()
+            if fingerprints[key]:
+                digests, signatures = zip(*fingerprints[key])
+                save_fingerprints(segment, np.concatenate(digests), np.concatenate(signatures))
+            if (ann := _ann_for_root(index.root)) is not None:
+                # Bucket now so the first query after training never assigns rows.
+                ann.add_segment(segment)
+    logger.info(
+        "Embedded %d of %d new files; of %d chunks, %d embedded, %d reused "
+        "(exact or near duplicates), %d failed",
+        len(missing) - len(failed),
+        len(missing),
+        counts["chunks"],
+        counts["embedded"],
+        counts["reused"],
+        counts["failed"],
+    )
+    return segments
+
+
+def _build_vector_store(
+    docs: Iterable[Document],
+    vectors: Sequence[list[float]] | None = None,
+    embeddings: Embeddings | None = None,
+) -> NumpyVectorStore | None:
+    """Create a matrix-backed vector store, reusing precomputed vectors if given."""
     docs_list = list(docs)
     if not docs_list:
         return None
@@ -75,43 +524,590 @@ def _build_vector_store(docs: Iterable[Document]) -> InMemoryVectorStore | None:
         return None
 
     try:
-        embeddings = OpenAIEmbeddings(
-            model=EMBEDDING_MODEL,
-            api_key=EMBEDDING_API_KEY,
-            base_url=EMBEDDING_BASE_URL,
-        )
-        return InMemoryVectorStore.from_documents(docs_list, embeddings)
+        store = NumpyVectorStore(embeddings or _get_embeddings())
+        store.add_documents(docs_list, vectors)
+        return store
     except Exception:
         return None
 
 
+def _get_ann(upload_dir: Path) -> IVFIndex | None:
+    """Return the shared IVF index for an upload directory when RAG_ANN=ivf."""
+    return _ann_for_root(_get_index(upload_dir).root)
+
+
+def _ann_for_root(root: Path) -> IVFIndex | None:
+    """Return the shared IVF index for an index root when RAG_ANN=ivf."""
+    if RAG_ANN != "ivf":
+        return None
+    ann = _ann_indexes.get(str(root))
+    if ann is None:
+        ann = _ann_indexes.setdefault(
+            str(root), IVFIndex(root, nprobe=RAG_ANN_NPROBE, min_rows=RAG_ANN_MIN_ROWS)
+        )
+    return ann
+
+
+def _get_quantized() -> QuantizedIndex | None:
+    """Return the shared quantized-code index when RAG_QUANTIZATION is set."""
+    global _quantized
+    if not RAG_QUANTIZATION:
+        return None
+    if _quantized is None or _quantized.kind != RAG_QUANTIZATION:
+        _quantized = QuantizedIndex(RAG_QUANTIZATION, RAG_RESCORE_FACTOR or None)
+    return _quantized
+
+
+def _embed_query(embeddings: Embeddings, query: str) -> np.ndarray:
+    """Embed a query, reusing the vector of an earlier query with the same normalized text."""
+    return _query_embeddings.get_or_compute(
+        (EMBEDDING_MODEL, normalize_query(query)),
+        lambda: np.asarray(embeddings.embed_query(query), dtype=np.float32),
+    )
+
+
+def _split_cached_queries(
+    queries: Sequence[str],
+) -> tuple[list[tuple[str, str]], dict[tuple[str, str], np.ndarray], dict[tuple[str, str], str]]:
+    """Return each query's cache key, the cached vectors, and one text per uncached key."""
+    keys = [(EMBEDDING_MODEL, normalize_query(query)) for query in queries]
+    found: dict[tuple[str, str], np.ndarray] = {}
+    todo: dict[tuple[str, str], str] = {}
+    for key, query in zip(keys, queries):
+        if key in found or key in todo:
+            continue
+        vector = _query_embeddings.get(key)
+        if vector is None:
+            todo[key] = query
+        else:
+            found[key] = vector
+    return keys, found, todo
+
+
+def _store_query_vectors(
+    found: dict[tuple[str, str], np.ndarray],
+    todo: dict[tuple[str, str], str],
+    vectors: Sequence[Sequence[float]],
+) -> None:
+    """Cache freshly embedded query vectors and add them to ``found``."""
+    for key, vector in zip(todo, vectors):
+        found[key] = np.asarray(vector, dtype=np.float32)
+        _query_embeddings.put(key, found[key])
+
+
+def _embed_queries(embeddings: Embeddings, queries: Sequence[str]) -> np.ndarray:
+    """Embed several queries, sending the uncached ones in a single request."""
+    keys, found, todo = _split_cached_queries(queries)
+    if todo:
+        _store_query_vectors(found, todo, embeddings.embed_documents(list(todo.values())))
+    return np.stack([found[key] for key in keys])
+
+
+async def _aembed_query(embeddings: Embeddings, query: str) -> np.ndarray:
+    """Async ``_embed_query``: awaits the embedding client instead of blocking a thread."""
+    key = (EMBEDDING_MODEL, normalize_query(query))
+    vector = _query_embeddings.get(key)
+    if vector is None:
+        vector = np.asarray(await embeddings.aembed_query(query), dtype=np.float32)
+        _query_embeddings.put(key, vector)
+    return vector
+
+
+async def _aembed_queries(embeddings: Embeddings, queries: Sequence[str]) -> np.ndarray:
+    """Async ``_embed_queries``: one awaited request for the uncached queries."""
+    keys, found, todo = _split_cached_queries(queries)
+    if todo:
+        vectors = await embeddings.aembed_documents(list(todo.values()))
+        _store_query_vectors(found, todo, vectors)
+    return np.stack([found[key] for key in keys])
+
+
+def _cached_result(scope: str, version: str, key: tuple) -> str | None:
+    """Look up a formatted result, first dropping results for older index versions."""
+    with _registry_lock:
+        changed = _result_versions.get(scope) != version
+        _result_versions[scope] = version
+    if changed:
+        _results.invalidate(lambda cached: cached[0] == scope)
+    return _results.get((scope, version, *key))
+
+
+def retrieval_cache_stats() -> dict[str, dict[str, float]]:
+    """Return size and hit/miss counters of the query-embedding and result caches."""
+    return {"query_embeddings": _query_embeddings.stats(), "results": _results.stats()}
+
+
+def _lexical_index(store: SegmentStore) -> BM25Index:
+    """Return a BM25 index whose rows line up with ``store``, shared per index version."""
+
+    def build() -> BM25Index:
+        bm25 = BM25Index()
+        for segment in store.segments:
+            bm25.add(load_postings(segment))
+        return bm25
+
+    return _lexical_indexes.get_or_compute(store.version, build)
+
+
+def _grounding_filter(
+    store: SegmentStore, grounding_files: Sequence[str] | None
+) -> tuple[list[int], np.ndarray] | None:
+    """Return the selected segment ids and row mask for a grounding selection.
+
+    Entries match a file by bare name or by path relative to the upload
+    directory, as in ``_iter_text_files``; a segment shared by identical copies
+    is selected when any copy is. The filter is computed once per
+    selection and index version, so toggling files never reloads the index.
+    Returns None when no selection is given.
+    """
+    if not grounding_files:
+        return None
+    selection = tuple(sorted({name.lower() for name in grounding_files}))
+
+    def build() -> tuple[list[int], np.ndarray]:
+        wanted = set(selection)
+        segments = [
+            seg_idx
+            for seg_idx in range(len(store.segments))
+            if any(
+                source.lower() in wanted or Path(source).name.lower() in wanted
+                for source in store.sources(seg_idx)
+            )
+        ]
+        return segments, store.row_mask(segments)
+
+    return _grounding_filters.get_or_compute((store.version, selection), build)
+
+
+def _rank_rows(
+    store: SegmentStore,
+    query: str,
+    k: int,
+    mode: str,
+    ann: IVFIndex | None = None,
+    grounding: tuple[list[int], np.ndarray] | None = None,
+    dense: list[int] | None = None,
+    query_vector: np.ndarray | None = None,
+) -> list[int]:
+    """Rank store rows for a query by dense, lexical, or fused hybrid scoring.
+
+    Dense ranking goes through ``ann`` once it is trained, otherwise through
+    quantized codes with exact rescoring when RAG_QUANTIZATION is set, and an
+    exact scan otherwise. Rows of files that are not embedded yet are only
+    reachable through lexical ranking. ``grounding`` (from ``_grounding_filter``)
+    restricts ranking to the selected files. A precomputed ``dense`` ranking,
+    such as one row of a batch score matrix, replaces the dense search, and a
+    precomputed ``query_vector`` replaces the query embedding call.
+    """
+    depth = k if mode != "hybrid" else max(k, HYBRID_CANDIDATES)
+    segments, mask = grounding if grounding is not None else (None, None)
+    rankings: list[list[int]] = []
+    if mode in ("dense", "hybrid") and dense is not None:
+        rankings.append(dense)
+    elif mode in ("dense", "hybrid"):
+        if query_vector is None:
+            query_vector = _embed_query(store.embedding, query)
+        if ann is not None and ann.ready:
+            rankings.append(ann.search(store, query_vector, depth, segments=segments).tolist())
+        elif (quantized := _get_quantized()) is not None:
+            rankings.append(quantized.search(store, query_vector, depth, segments).tolist())
+        else:
+            dense = store.scores(query_vector, segments)
+            top = top_k_indices(dense, depth)
+            rankings.append(top[np.isfinite(dense[top])].tolist())
+    if mode in ("lexical", "hybrid"):
+        lexical = _lexical_index(store).scores(query)
+        if mask is not None:
+            lexical[~mask] = 0.0
+        top = top_k_indices(lexical, depth)
+        rankings.append(top[lexical[top] > 0].tolist())
+
+    if len(rankings) == 1:
+        return rankings[0][:k]
+    return reciprocal_rank_fusion(rankings)[:k]
+
+
+def _source_label(sources: Sequence[str]) -> str:
+    """Cite the primary source of a snippet and any files duplicating it."""
+    if len(sources) < 2:
+        return sources[0] if sources else "unknown"
+    return f"{sources[0]} (also in: {', '.join(sources[1:])})"
+
+
+def _format_results(query: str, passages: list[Document], fallback: str) -> str:
+    """Render packed passages as numbered, source-attributed snippets."""
+    if not passages:
+        return f"No uploaded file chunks matched the terms in '{query}'."
+
+    formatted: list[str] = []
+    for idx, doc in enumerate(passages, start=1):
+        source = _source_label(doc.metadata.get("sources") or [doc.metadata.get("source")])
+        formatted.append(f"[{idx}] Source: {source}\n{doc.page_content}")
+
+    header = "Retrieved context from uploaded files"
+    if fallback:
+        header += f" ({fallback})"
+    return header + ":\n\n" + "\n\n".join(formatted)
+
+
+def _format_batch_results(
+    store: SegmentStore, queries: Sequence[str], ranked: Sequence[list[int]], fallback: str
+) -> str:
+    """Render per-query snippets, numbering each chunk once across all queries.
+
+    Duplicate chunks within a query's ranking are shown once, citing every file
+    they were found in.
+    """
+    numbers: dict[int, int] = {}
+    sections: list[str] = []
+    for query_idx, (query, rows) in enumerate(zip(queries, ranked), start=1):
+        rows, also = collapse_rows(store, rows, RAG_NEAR_DUP_THRESHOLD)
+        lines = [f"## Query {query_idx}: {query}"]
+        repeats: list[str] = []
+        for row in rows:
+            if row in numbers:
+                repeats.append(f"[{numbers[row]}]")
+                continue
+            numbers[row] = len(numbers) + 1
+            doc = store.document(row)
+            snippet = doc.page_content.strip()
+            if len(snippet) > 800:
+                snippet = snippet[:800] + "..."
+            sources = store.sources(store.locate(row)[0])
+            source = _source_label(sources + [s for s in also.get(row, ()) if s not in sources])
+            lines.append(f"[{numbers[row]}] Source: {source}\n{snippet}")
+        if repeats:
+            lines.append(f"Also relevant: {', '.join(repeats)} (shown above)")
+        if not rows:
+            lines.append("No uploaded file chunks matched the terms in this query.")
+        sections.append("\n\n".join(lines))
+
+    noun = "query" if len(queries) == 1 else "queries"
+    header = f"Retrieved context from uploaded files for {len(queries)} {noun}"
+    if fallback:
+        header += f" ({fallback})"
+    return header + ":\n\n" + "\n\n".join(sections)
+
+
+def start_upload_watcher(
+    upload_dir: Path | None = None, interval: float | None = None
+) -> UploadWatcher | None:
+    """Start (once per directory) a background watcher that keeps the index hot.
+
+    New, changed and deleted uploads, bucket subdirectories included, are
+    embedded or pruned shortly after they land, so the first query after an
+    upload only pays for search. Returns None when embeddings are not configured
+    or the interval is not positive.
+    """
+    interval = RAG_WATCH_INTERVAL if interval is None else interval
+    if not EMBEDDING_MODEL or interval <= 0:
+        return None
+
+    base_dir = Path(upload_dir) if upload_dir else DEFAULT_UPLOAD_DIR
+
+    def sync() -> bool:
+        return _sync_segment_store(base_dir, _get_embeddings()).has_vectors
+
+    with _registry_lock:
+        watcher = _watchers.get(str(base_dir))
+        if watcher is None:
+            watcher = _watchers[str(base_dir)] = UploadWatcher(
+                base_dir,
+                sync,
+                TEXT_SUFFIXES,
+                interval=interval,
+            )
+    watcher.start()
+    return watcher
+
+
+def _get_listing(upload_dir: Path) -> DirectoryListing:
+    """Return the shared file listing snapshot for an upload directory."""
+    with _registry_lock:
+        listing = _listings.get(str(upload_dir))
+        if listing is None:
+            listing = _listings[str(upload_dir)] = DirectoryListing(upload_dir)
+    return listing
+
+
+def _summarize_files(
+    entries: Sequence[FileEntry], selected: set[str], scope: str, limit: int
+) -> str:
+    """Count files and bytes per bucket and per file type."""
+    by_bucket: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+    by_type: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+    for entry in entries:
+        for totals in (by_bucket[entry.bucket], by_type[entry.suffix]):
+            totals[0] += 1
+            totals[1] += entry.size
+
+    picked = sum(1 for entry in entries if _is_selected(entry, selected))
+    total = sum(entry.size for entry in entries)
+    lines = [
+        f"Uploaded files{scope}: {len(entries)} files, {format_size(total)}, {picked} selected"
+    ]
+    for title, groups in (("By folder", by_bucket), ("By type", by_type)):
+        lines.append(f"{title}:")
+        ranked = sorted(groups.items(), key=lambda item: (-item[1][0], item[0]))
+        for key, (count, size) in ranked[:limit]:
+            if groups is by_bucket:
+                label = key or "(top level)"
+            else:
+                label = (key or "(no extension)") + (
+                    "" if key in TEXT_SUFFIXES else ", not searchable"
+                )
+            lines.append(f"- {label}: {count} files, {format_size(size)}")
+        if len(ranked) > limit:
+            lines.append(f"- ... {len(ranked) - limit} more")
+    return "\n".join(lines)
+
+
+def _is_selected(entry: FileEntry, selected: set[str]) -> bool:
+    return entry.name.lower() in selected or entry.path.lower() in selected
+
+
 @tool(parse_docstring=True)
 def list_uploaded_files(
+    name: str | None = None,
+    extensions: list[str] | None = None,
+    bucket: str | None = None,
+    offset: int = 0,
+    limit: int = LIST_PAGE_SIZE,
+    summary: bool = False,
     grounding_files: Annotated[list[str] | None, InjectedToolArg] = None,
+    upload_dir: Annotated[str | None, InjectedToolArg] = None,
 ) -> str:
     """List available uploaded files and indicate which are selected for grounding.
 
+    Long listings are paged; pass `offset` to continue, filter by name, extension
+    or bucket to narrow them, or set `summary` for counts per folder and type.
+
     Args:
+        name: Only files whose path contains this text, or matches it as a glob such as "*report*".
+        extensions: Only files with these extensions (e.g. ["csv", "md"]).
+        bucket: Only files in this bucket subdirectory; "" for top-level files.
+        offset: Number of matching files to skip (default: 0).
+        limit: Maximum number of files to list (default: 50).
+        summary: Return file counts and sizes per folder and type instead of names.
         grounding_files: (Injected) Files the user marked for RAG grounding.
+        upload_dir: (Injected) Override upload directory path.
     """
-    upload_dir = DEFAULT_UPLOAD_DIR
-    if not upload_dir.exists():
+    base_dir = Path(upload_dir) if upload_dir else DEFAULT_UPLOAD_DIR
+    if not base_dir.exists():
         return "No uploads directory found. Upload files via the UI first."
 
-    paths = [p for p in sorted(upload_dir.iterdir()) if p.is_file()]
-    if not paths:
-        return f"No files in upload directory: {upload_dir}"
+    # A cached snapshot, rescanned only when the directory or ingestion changed.
+    entries = _get_listing(base_dir).entries()
+    if not entries:
+        return f"No files in upload directory: {base_dir}"
+
+    filters = [
+        f"{label} {value!r}"
+        for label, value in (("name", name), ("extensions", extensions), ("bucket", bucket))
+        if value is not None
+    ]
+    scope = f" matching {', '.join(filters)}" if filters else ""
+    matched = filter_entries(entries, name, extensions, bucket)
+    if not matched:
+        return f"No uploaded files{scope}. There are {len(entries)} files in total."
 
     selected = {f.lower() for f in grounding_files or []}
+    limit = max(1, limit)
+    if summary:
+        return _summarize_files(matched, selected, scope, limit)
+
+    offset = max(0, offset)
+    page = matched[offset : offset + limit]
+    if not page:
+        return f"Offset {offset} is past the end: {len(matched)} files{scope}."
     lines = []
-    for path in paths:
-        marker = "[*]" if path.name.lower() in selected else "[ ]"
+    for entry in page:
+        marker = "[*]" if _is_selected(entry, selected) else "[ ]"
+        note = "" if entry.suffix in TEXT_SUFFIXES else ", not searchable"
+        lines.append(f"{marker} {entry.path} ({entry.size} bytes{note})")
+
+    result = f"Available uploaded files{scope}:\n" + "\n".join(lines)
+    if len(page) < len(matched):
+        end = offset + len(page)
+        result += f"\n\nShowing {offset + 1}-{end} of {len(matched)} files."
+        if end < len(matched):
+            result += f" Call again with offset={end} for more."
+    return result
+
+
+async def _alist_uploaded_files(
+    name: str | None = None,
+    extensions: list[str] | None = None,
+    bucket: str | None = None,
+    offset: int = 0,
+    limit: int = LIST_PAGE_SIZE,
+    summary: bool = False,
+    grounding_files: list[str] | None = None,
+    upload_dir: str | None = None,
+) -> str:
+    """Async ``list_uploaded_files``: snapshot checks and rescans run in a worker thread."""
+    return await asyncio.to_thread(
+        list_uploaded_files.func,
+        name,
+        extensions,
+        bucket,
+        offset,
+        limit,
+        summary,
+        grounding_files,
+        upload_dir,
+    )
+
+
+list_uploaded_files.coroutine = _alist_uploaded_files
+
+
+@dataclass
+class _SearchContext:
+    """Store and settings shared by the retrieval tools for one call."""
+
+    store: SegmentStore
+    mode: str
+    fallback: str
+    cacheable: bool
+    grounding: tuple[list[int], np.ndarray] | None
+    ann: IVFIndex | None
+
+    @property
+    def rows(self) -> int:
+        """Return how many rows the grounding selection leaves searchable."""
+        return len(self.store) if self.grounding is None else int(self.grounding[1].sum())
+
+    def to_lexical(self) -> None:
+        """Fall back to keyword search after the embedding service failed."""
+        self.mode = "lexical"
+        self.fallback = "lexical search only: embedding service unavailable"
+        self.cacheable = False
+
+
+def _open_search(
+    base_dir: Path, search_mode: str | None, grounding_files: Sequence[str] | None
+) -> _SearchContext | str:
+    """Open the shared index and resolve the search mode, or return an error message.
+
+    Falls back to lexical search when embeddings are not configured or the
+    embedding service is unreachable or cooling down after a failure, and to
+    hybrid search when some selected files are not embedded yet.
+    """
+    mode = (search_mode or RAG_SEARCH_MODE).strip().lower()
+    if mode not in SEARCH_MODES:
+        return f"Unknown search mode '{mode}'. Use one of: {', '.join(SEARCH_MODES)}."
+
+    fallback = ""
+    cacheable = True
+    if mode != "lexical" and not EMBEDDING_MODEL:
+        mode, fallback = "lexical", "lexical search only: EMBEDDING_MODEL is not set"
+
+    try:
+        embeddings = _get_embeddings() if mode != "lexical" else None
+        store = _sync_segment_store(base_dir, embeddings)
+    except Exception:
+        mode, fallback = "lexical", "lexical search only: embedding service unavailable"
+        cacheable = False
         try:
-            size = path.stat().st_size
-            lines.append(f"{marker} {path.name} ({size} bytes)")
+            store = _sync_segment_store(base_dir, None)
         except Exception:
-            lines.append(f"{marker} {path.name}")
-    return "Available uploaded files:\n" + "\n".join(lines)
+            return "Vector store unavailable. Check EMBEDDING_* env vars and file types."
+    if mode != "lexical" and cooling_down(embeddings):
+        # Embedding just failed; do not wait on the service again for the query.
+        mode, fallback = "lexical", "lexical search only: embedding service unavailable"
+        cacheable = False
+
+    # One index covers every upload; the grounding selection is a row filter.
+    grounding = _grounding_filter(store, grounding_files)
+    selected = range(len(store.segments)) if grounding is None else grounding[0]
+    if not selected:
+        return (
+            "No usable uploaded files found. Upload text/markdown/CSV/JSON files "
+            "and select them for grounding."
+        )
+
+    unembedded = sum(1 for seg_idx in selected if store.segments[seg_idx].vectors is None)
+    if mode != "lexical" and unembedded:
+        if unembedded == len(selected):
+            mode, fallback = "lexical", "lexical search only: embedding service unavailable"
+            cacheable = False
+        else:
+            fallback = f"{unembedded} file(s) not embedded yet are matched by keyword only"
+            mode = "hybrid"
+
+    ann = _get_ann(base_dir) if mode != "lexical" else None
+    if ann is not None:
+        ann.maybe_train(store)
+    return _SearchContext(store, mode, fallback, cacheable, grounding, ann)
+
+
+def _batch_dense_rankings(
+    search: _SearchContext, vectors: np.ndarray, depth: int
+) -> list[list[int] | None]:
+    """Rank rows for several embedded queries at once.
+
+    Exact search scores every query with one matrix-matrix product per
+    segment. When IVF or quantized search is active, each query is ranked by
+    ``_rank_rows`` instead (None entries).
+    """
+    if (search.ann is not None and search.ann.ready) or _get_quantized() is not None:
+        return [None] * len(vectors)
+
+    segments = search.grounding[0] if search.grounding is not None else None
+    scores = search.store.batch_scores(vectors, segments)
+    rankings: list[list[int] | None] = []
+    for row_scores in scores:
+        top = top_k_indices(row_scores, depth)
+        rankings.append(top[np.isfinite(row_scores[top])].tolist())
+    return rankings
+
+
+def _result_key(
+    query: str,
+    top_k: int,
+    budget: int,
+    grounding_files: Sequence[str] | None,
+    search: _SearchContext,
+) -> tuple:
+    """Key a formatted result by everything that changes it except the index version."""
+    ann = search.ann
+    return (
+        normalize_query(query),
+        top_k,
+        budget,
+        tuple(sorted({name.lower() for name in grounding_files})) if grounding_files else None,
+        search.mode,
+        ann.state[0] if ann is not None and ann.ready else None,
+    )
+
+
+def _answer_query(
+    search: _SearchContext,
+    query: str,
+    top_k: int,
+    budget: int,
+    query_vector: np.ndarray | None = None,
+) -> str:
+    """Rank, deduplicate and pack context for one query, then format it."""
+    store, ann = search.store, search.ann
+    # Rank a wider pool than top_k so MMR packing can trade duplicates for coverage.
+    k = max(1, min(top_k, search.rows))
+    pool = min(max(k, MMR_CANDIDATES), search.rows)
+    try:
+        rows = _rank_rows(
+            store, query, pool, search.mode, ann, search.grounding, query_vector=query_vector
+        )
+    except Exception:
+        if search.mode == "lexical":
+            return "Search over uploaded files failed."
+        search.to_lexical()
+        rows = _rank_rows(store, query, pool, search.mode, grounding=search.grounding)
+
+    # Duplicated chunks are packed once and cite every file they appear in.
+    rows, also = collapse_rows(store, rows, RAG_NEAR_DUP_THRESHOLD)
+    passages = pack_context(store, rows, k, budget, RAG_MMR_LAMBDA, CHUNK_OVERLAP, also)
+    return _format_results(query, passages, search.fallback)
 
 
 @tool(parse_docstring=True)
@@ -120,6 +1116,8 @@ def retrieve_uploaded_context(
     top_k: int = 4,
     grounding_files: Annotated[list[str] | None, InjectedToolArg] = None,
     upload_dir: Annotated[str | None, InjectedToolArg] = None,
+    search_mode: Annotated[str | None, InjectedToolArg] = None,
+    token_budget: Annotated[int | None, InjectedToolArg] = None,
 ) -> str:
     """Search uploaded files for context to answer the user's question.
 
@@ -128,29 +1126,262 @@ def retrieve_uploaded_context(
         top_k: Maximum number of chunks to return (default: 4).
         grounding_files: (Injected) Optional list of files pre-selected in the UI.
         upload_dir: (Injected) Override upload directory path.
+        search_mode: (Injected) "hybrid", "dense" or "lexical"; defaults to RAG_SEARCH_MODE.
+        token_budget: (Injected) Approximate token budget for the returned context;
+            defaults to RAG_CONTEXT_TOKENS.
     """
+    # Query embeddings and formatted results are cached (see retrieval_cache_stats);
+    # results are keyed by the index version, so any upload change misses.
     base_dir = Path(upload_dir) if upload_dir else DEFAULT_UPLOAD_DIR
-    docs = _load_text_files(base_dir, grounding_files)
-    if not docs:
-        return (
-            "No usable uploaded files found. Upload text/markdown/CSV/JSON files "
-            "and select them for grounding."
-        )
+    search = _open_search(base_dir, search_mode, grounding_files)
+    if isinstance(search, str):
+        return search
+    budget = token_budget or RAG_CONTEXT_TOKENS
 
-    store = _build_vector_store(docs)
-    if store is None:
-        return "Vector store unavailable. Check EMBEDDING_* env vars and file types."
+    result_key = _result_key(query, top_k, budget, grounding_files, search)
+    if search.cacheable:
+        cached = _cached_result(str(base_dir), search.store.version, result_key)
+        if cached is not None:
+            return cached
 
-    results = store.similarity_search(query, k=max(1, min(top_k, len(docs))))
-    formatted: list[str] = []
-    for idx, doc in enumerate(results, start=1):
-        snippet = doc.page_content.strip()
-        if len(snippet) > 800:
-            snippet = snippet[:800] + "..."
-        source = doc.metadata.get("source", "unknown")
-        formatted.append(f"[{idx}] Source: {source}\n{snippet}")
-
-    return "Retrieved context from uploaded files:\n\n" + "\n\n".join(formatted)
+    result = _answer_query(search, query, top_k, budget)
+    if search.cacheable:
+        _results.put((str(base_dir), search.store.version, *result_key), result)
+    return result
+
+
+async def _aretrieve_uploaded_context(
+    query: str,
+    top_k: int = 4,
+    grounding_files: list[str] | None = None,
+    upload_dir: str | None = None,
+    search_mode: str | None = None,
+    token_budget: int | None = None,
+) -> str:
+    """Async ``retrieve_uploaded_context``, used when the tool is awaited.
+
+    The query embedding is awaited on the async embedding client, while index
+    loading and ranking (disk and NumPy work) run in worker threads, so runs
+    sharing an event loop overlap instead of queuing behind a blocking call.
+    """
+    base_dir = Path(upload_dir) if upload_dir else DEFAULT_UPLOAD_DIR
+    search = await asyncio.to_thread(_open_search, base_dir, search_mode, grounding_files)
+    if isinstance(search, str):
+        return search
+    budget = token_budget or RAG_CONTEXT_TOKENS
+
+    result_key = _result_key(query, top_k, budget, grounding_files, search)
+    if search.cacheable:
+        cached = _cached_result(str(base_dir), search.store.version, result_key)
+        if cached is not None:
+            return cached
+
+    query_vector = None
+    if search.mode != "lexical":
+        try:
+            query_vector = await _aembed_query(search.store.embedding, query)
+        except Exception:
+            search.to_lexical()
+    result = await asyncio.to_thread(_answer_query, search, query, top_k, budget, query_vector)
+    if search.cacheable:
+        _results.put((str(base_dir), search.store.version, *result_key), result)
+    return result
+
+
+retrieve_uploaded_context.coroutine = _aretrieve_uploaded_context
+
+
+def _unique_queries(queries: Sequence[str]) -> list[str]:
+    """Drop blank and repeated queries (by normalized text), keeping the first few."""
+    unique: dict[str, str] = {}
+    for query in queries:
+        if query and query.strip():
+            unique.setdefault(normalize_query(query), query.strip())
+    return list(unique.values())[:MAX_BATCH_QUERIES]
+
+
+def _answer_queries(
+    search: _SearchContext,
+    queries: Sequence[str],
+    top_k: int,
+    vectors: np.ndarray | None = None,
+) -> str:
+    """Rank rows for every query, embedding them in one request, then format them."""
+    k = max(1, min(top_k, search.rows))
+    depth = k if search.mode != "hybrid" else max(k, HYBRID_CANDIDATES)
+    try:
+        if search.mode == "lexical":
+            dense: list[list[int] | None] = [None] * len(queries)
+            vectors = [None] * len(queries)
+        else:
+            if vectors is None:
+                vectors = _embed_queries(search.store.embedding, queries)
+            dense = _batch_dense_rankings(search, vectors, depth)
+        ranked = [
+            _rank_rows(
+                search.store, query, k, search.mode, search.ann, search.grounding, ranking, vector
+            )
+            for query, ranking, vector in zip(queries, dense, vectors)
+        ]
+    except Exception:
+        if search.mode == "lexical":
+            return "Search over uploaded files failed."
+        search.to_lexical()
+        ranked = [
+            _rank_rows(search.store, query, k, search.mode, grounding=search.grounding)
+            for query in queries
+        ]
+
+    return _format_batch_results(search.store, queries, ranked, search.fallback)
+
+
+@tool(parse_docstring=True)
+def retrieve_uploaded_context_batch(
+    queries: list[str],
+    top_k: int = 4,
+    grounding_files: Annotated[list[str] | None, InjectedToolArg] = None,
+    upload_dir: Annotated[str | None, InjectedToolArg] = None,
+    search_mode: Annotated[str | None, InjectedToolArg] = None,
+) -> str:
+    """Search uploaded files for several related questions in one step.
+
+    Use this for multi-part questions instead of calling retrieve_uploaded_context
+    once per part. Snippets are grouped by query; a chunk that answers several
+    queries is shown once and referenced by number afterwards.
+
+    Args:
+        queries: Up to 8 distinct questions or sub-questions to retrieve context for.
+        top_k: Maximum number of chunks per query (default: 4).
+        grounding_files: (Injected) Optional list of files pre-selected in the UI.
+        upload_dir: (Injected) Override upload directory path.
+        search_mode: (Injected) "hybrid", "dense" or "lexical"; defaults to RAG_SEARCH_MODE.
+    """
+    queries = _unique_queries(queries)
+    if not queries:
+        return "No queries given. Pass one or more questions to retrieve context for."
+
+    base_dir = Path(upload_dir) if upload_dir else DEFAULT_UPLOAD_DIR
+    search = _open_search(base_dir, search_mode, grounding_files)
+    if isinstance(search, str):
+        return search
+    return _answer_queries(search, queries, top_k)
+
+
+async def _aretrieve_uploaded_context_batch(
+    queries: list[str],
+    top_k: int = 4,
+    grounding_files: list[str] | None = None,
+    upload_dir: str | None = None,
+    search_mode: str | None = None,
+) -> str:
+    """Async ``retrieve_uploaded_context_batch``; see ``_aretrieve_uploaded_context``."""
+    queries = _unique_queries(queries)
+    if not queries:
+        return "No queries given. Pass one or more questions to retrieve context for."
+
+    base_dir = Path(upload_dir) if upload_dir else DEFAULT_UPLOAD_DIR
+    search = await asyncio.to_thread(_open_search, base_dir, search_mode, grounding_files)
+    if isinstance(search, str):
+        return search
+    vectors = None
+    if search.mode != "lexical":
+        try:
+            vectors = await _aembed_queries(search.store.embedding, queries)
+        except Exception:
+            search.to_lexical()
+    return await asyncio.to_thread(_answer_queries, search, queries, top_k, vectors)
+
+
+retrieve_uploaded_context_batch.coroutine = _aretrieve_uploaded_context_batch
+
+
+def _describe_table(name: str, table: Table, preview: int) -> str:
+    """Summarize a table's columns and show its first rows."""
+    lines = [f"Table {name}: {len(table)} rows, {len(table.columns)} columns", *table.describe()]
+    if preview and len(table):
+        lines += ["", f"First {min(preview, len(table))} rows:"]
+        lines.append(table.render(np.arange(min(preview, len(table)))))
+    return "\n".join(lines)
+
+
+@tool(parse_docstring=True)
+def query_uploaded_table(
+    file: str,
+    where: list[str] | None = None,
+    columns: list[str] | None = None,
+    group_by: str | None = None,
+    aggregate: str | None = None,
+    column: str | None = None,
+    limit: int = 20,
+    upload_dir: Annotated[str | None, InjectedToolArg] = None,
+) -> str:
+    """Filter and aggregate the rows of an uploaded CSV or JSON file.
+
+    Use this for exact lookups, counts, sums, averages and rankings over tabular
+    files, which text search cannot compute. Call it with only `file` first to
+    see the column names and value ranges.
+
+    Args:
+        file: CSV or JSON file name as shown by list_uploaded_files.
+        where: Conditions rows must all meet, each "<column> <op> <value>" with op one
+            of ==, !=, >, >=, <, <=, contains (e.g. "region == EU", "price > 10").
+        columns: Columns to show for matching rows (default: all).
+        group_by: Column to group matching rows by; each group is aggregated separately.
+        aggregate: One of count, sum, mean, min, max. Defaults to count when group_by is set.
+        column: Numeric column to aggregate; not needed for count.
+        limit: Maximum number of rows or groups to show (default: 20).
+        upload_dir: (Injected) Override upload directory path.
+    """
+    base_dir = Path(upload_dir) if upload_dir else DEFAULT_UPLOAD_DIR
+    path = next(_iter_text_files(base_dir, [file]), None)
+    if path is None:
+        return f"No uploaded file named '{file}'. Call list_uploaded_files to see the files."
+    if chunk_format(path) != "rows":
+        return f"{file} is not a CSV or JSON file; use retrieve_uploaded_context instead."
+
+    index = _get_index(base_dir)
+    try:
+        table = load_table(index.sidecar(index.path_key(path), ".tab"), path)
+    except OSError:
+        return f"Could not read {file}."
+    if table is None:
+        return f"{file} holds no rows or records; use retrieve_uploaded_context instead."
+    name = path.relative_to(base_dir).as_posix()
+    limit = max(1, limit)
+
+    if not (where or columns or group_by or aggregate):
+        return _describe_table(name, table, preview=5)
+
+    try:
+        mask = table.mask(where or [])
+        matched = int(mask.sum())
+        scope = f"{matched} of {len(table)} rows"
+        if where:
+            scope += f" where {' and '.join(where)}"
+        if not (group_by or aggregate):
+            if not matched:
+                return f"No rows of {name} match: {' and '.join(where or [])}"
+            rows = np.flatnonzero(mask)[:limit]
+            shown = f", showing the first {len(rows)}" if len(rows) < matched else ""
+            return f"{name}: {scope}{shown}\n" + table.render(rows, columns)
+
+        aggregate = (aggregate or "count").lower()
+        results = table.aggregate(aggregate, mask, column, group_by)
+    except ValueError as exc:
+        return str(exc)
+
+    label = f"{aggregate}({column})" if column else aggregate
+    if group_by is None:
+        value = format_number(results[0][1]) if results else "no value"
+        return f"{name}: {label} = {value} over {scope}"
+    lines = [f"{name}: {label} by {group_by} over {scope}"]
+    if len(results) > limit:
+        lines[0] += f", top {limit} of {len(results)} groups"
+    lines.append(f"{group_by} | {label} | rows")
+    lines.extend(
+        f"{group} | {format_number(value)} | {rows}" for group, value, rows in results[:limit]
+    )
+    return "\n".join(lines)
 
 
 @tool(parse_docstring=True)
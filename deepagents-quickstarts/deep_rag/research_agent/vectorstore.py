@@ -0,0 +1,281 @@
+"""Matrix-backed vector store for uploaded-file chunks."""
+
+import hashlib
+from bisect import bisect_right
+from typing import Collection, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from research_agent.segments import Segment, TextSegment
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so a dot product equals cosine similarity."""
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return indices of the ``k`` highest scores, best first."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class NumpyVectorStore:
+    """Vector store keeping every embedding in one contiguous float32 matrix.
+
+    Rows are L2-normalized on insert, so a search is a single matrix-vector
+    product followed by an ``argpartition`` top-k. Chunk text and metadata live
+    in lists parallel to the matrix rows.
+    """
+
+    def __init__(self, embedding: Embeddings | None = None, dim: int | None = None) -> None:
+        """Create an empty store; ``dim`` preallocates the matrix width."""
+        self.embedding = embedding
+        self._matrix = np.empty((0, dim or 0), dtype=np.float32)
+        self._size = 0
+        self.texts: list[str] = []
+        self.metadatas: list[dict] = []
+
+    def __len__(self) -> int:
+        """Return the number of stored rows."""
+        return self._size
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Return a view of the populated rows of the embedding matrix."""
+        return self._matrix[: self._size]
+
+    def add_vectors(
+        self,
+        texts: Sequence[str],
+        vectors: Sequence[Sequence[float]] | np.ndarray,
+        metadatas: Sequence[dict] | None = None,
+    ) -> None:
+        """Append chunks with precomputed embeddings."""
+        rows = np.asarray(vectors, dtype=np.float32)
+        if rows.size == 0:
+            return
+        if rows.ndim != 2 or rows.shape[0] != len(texts):
+            raise ValueError("vectors must be a 2-D array with one row per text")
+
+        if self._size == 0 and self._matrix.shape[1] != rows.shape[1]:
+            self._matrix = np.empty((0, rows.shape[1]), dtype=np.float32)
+        if rows.shape[1] != self._matrix.shape[1]:
+            raise ValueError(
+                f"Embedding dimension {rows.shape[1]} does not match store "
+                f"dimension {self._matrix.shape[1]}"
+            )
+
+        needed = self._size + rows.shape[0]
+        if needed > self._matrix.shape[0]:
+            # Grow geometrically so repeated appends stay amortized O(1) per row.
+            capacity = max(needed, 2 * self._matrix.shape[0], 1024)
+            grown = np.empty((capacity, rows.shape[1]), dtype=np.float32)
+            grown[: self._size] = self._matrix[: self._size]
+            self._matrix = grown
+
+        self._matrix[self._size : needed] = normalize_rows(rows)
+        self._size = needed
+        self.texts.extend(texts)
+        if metadatas is None:
+            self.metadatas.extend({} for _ in texts)
+        else:
+            self.metadatas.extend(dict(m) for m in metadatas)
+
+    def add_documents(
+        self,
+        documents: Sequence[Document],
+        vectors: Sequence[Sequence[float]] | np.ndarray | None = None,
+    ) -> None:
+        """Append documents, embedding them first when no vectors are given."""
+        texts = [doc.page_content for doc in documents]
+        if vectors is None:
+            if self.embedding is None:
+                raise ValueError("No embeddings configured to embed documents")
+            vectors = self.embedding.embed_documents(texts)
+        self.add_vectors(texts, vectors, [doc.metadata for doc in documents])
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: Sequence[float] | np.ndarray, k: int = 4
+    ) -> list[tuple[Document, float]]:
+        """Return the ``k`` most similar chunks with cosine scores."""
+        if self._size == 0:
+            return []
+        query = normalize_rows(np.asarray(embedding, dtype=np.float32))
+        scores = self.matrix @ query
+        return [
+            (
+                Document(page_content=self.texts[i], metadata=dict(self.metadatas[i])),
+                float(scores[i]),
+            )
+            for i in top_k_indices(scores, k)
+        ]
+
+    def similarity_search_by_vector(
+        self, embedding: Sequence[float] | np.ndarray, k: int = 4
+    ) -> list[Document]:
+        """Return the ``k`` most similar chunks to an embedding."""
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4) -> list[Document]:
+        """Embed ``query`` and return the ``k`` most similar chunks."""
+        if self.embedding is None:
+            raise ValueError("No embeddings configured to embed the query")
+        return self.similarity_search_by_vector(self.embedding.embed_query(query), k)
+
+
+class SegmentStore:
+    """Vector store searching memory-mapped segments in place.
+
+    Segments are scored one at a time against their mapped vector blocks, so
+    the only per-query allocations are the score arrays. Chunk text is decoded
+    only for the rows that make the top-k. Global row ids follow the order in
+    which segments were added.
+    """
+
+    def __init__(self, embedding: Embeddings | None = None) -> None:
+        """Create an empty store that embeds queries with ``embedding``."""
+        self.embedding = embedding
+        self.segments: list[Segment | TextSegment] = []
+        self.metadatas: list[dict] = []
+        self._starts: list[int] = [0]
+        self._version: str | None = None
+
+    def __len__(self) -> int:
+        """Return the number of rows across all segments."""
+        return self._starts[-1]
+
+    @property
+    def version(self) -> str:
+        """Return a digest of the segments and sources, which changes with the index."""
+        if self._version is None:
+            digest = hashlib.sha256()
+            for seg_idx, segment in enumerate(self.segments):
+                embedded = "v" if segment.vectors is not None else "t"
+                sources = ",".join(self.sources(seg_idx))
+                digest.update(f"{segment.key or id(segment)}|{embedded}|{sources}\n".encode())
+            self._version = digest.hexdigest()
+        return self._version
+
+    @property
+    def has_vectors(self) -> bool:
+        """Return True when every segment carries embeddings for dense search."""
+        return all(segment.vectors is not None for segment in self.segments)
+
+    def add_segment(
+        self, segment: Segment | TextSegment, metadata: dict | None = None
+    ) -> None:
+        """Append a segment whose chunks all share ``metadata``."""
+        if not len(segment):
+            return
+        self.segments.append(segment)
+        self.metadatas.append(dict(metadata or {}))
+        self._starts.append(self._starts[-1] + len(segment))
+        self._version = None
+
+    @property
+    def starts(self) -> list[int]:
+        """Return the first global row id of each segment, plus the total."""
+        return self._starts
+
+    def segment_start(self, seg_idx: int) -> int:
+        """Return the first global row id of a segment."""
+        return self._starts[seg_idx]
+
+    def locate(self, row: int) -> tuple[int, int]:
+        """Map a global row id to ``(segment index, local row)``."""
+        seg_idx = bisect_right(self._starts, row) - 1
+        return seg_idx, row - self._starts[seg_idx]
+
+    def sources(self, seg_idx: int) -> list[str]:
+        """Return every file a segment was loaded for, primary source first."""
+        metadata = self.metadatas[seg_idx]
+        return metadata.get("sources") or [metadata.get("source", "unknown")]
+
+    def row_mask(self, segments: Collection[int]) -> np.ndarray:
+        """Return a boolean mask over all rows that selects the given segments."""
+        mask = np.zeros(len(self), dtype=bool)
+        for seg_idx in segments:
+            mask[self._starts[seg_idx] : self._starts[seg_idx + 1]] = True
+        return mask
+
+    def document(self, row: int) -> Document:
+        """Build the Document for a global row id."""
+        seg_idx, local = self.locate(row)
+        return Document(
+            page_content=self.segments[seg_idx].text(local),
+            metadata=dict(self.metadatas[seg_idx]),
+        )
+
+    def scores(
+        self,
+        embedding: Sequence[float] | np.ndarray,
+        segments: Collection[int] | None = None,
+    ) -> np.ndarray:
+        """Return cosine scores for every row against one query embedding.
+
+        Only the segments listed in ``segments`` (all by default) are scanned;
+        rows of other segments, and of segments without embeddings, score
+        ``-inf``.
+        """
+        query = normalize_rows(np.asarray(embedding, dtype=np.float32))
+        if not self.segments:
+            return np.empty(0, dtype=np.float32)
+        selected = range(len(self.segments)) if segments is None else set(segments)
+        return np.concatenate(
+            [
+                np.asarray(segment.vectors @ query, dtype=np.float32)
+                if segment.vectors is not None and seg_idx in selected
+                else np.full(len(segment), -np.inf, dtype=np.float32)
+                for seg_idx, segment in enumerate(self.segments)
+            ]
+        )
+
+    def batch_scores(
+        self,
+        embeddings: Sequence[Sequence[float]] | np.ndarray,
+        segments: Collection[int] | None = None,
+    ) -> np.ndarray:
+        """Return cosine scores of shape ``(queries, rows)`` for several query embeddings.
+
+        Each segment is scored with one matrix-matrix product against all
+        queries. Unselected and unembedded rows score ``-inf`` as in ``scores``.
+        """
+        queries = normalize_rows(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+        scores = np.full((queries.shape[0], len(self)), -np.inf, dtype=np.float32)
+        selected = range(len(self.segments)) if segments is None else set(segments)
+        for seg_idx, segment in enumerate(self.segments):
+            if segment.vectors is None or seg_idx not in selected:
+                continue
+            start = self._starts[seg_idx]
+            scores[:, start : start + len(segment)] = (segment.vectors @ queries.T).T
+        return scores
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: Sequence[float] | np.ndarray, k: int = 4
+    ) -> list[tuple[Document, float]]:
+        """Return the ``k`` most similar chunks with cosine scores."""
+        scores = self.scores(embedding)
+        return [(self.document(int(row)), float(scores[row])) for row in top_k_indices(scores, k)]
+
+    def similarity_search_by_vector(
+        self, embedding: Sequence[float] | np.ndarray, k: int = 4
+    ) -> list[Document]:
+        """Return the ``k`` most similar chunks to an embedding."""
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4) -> list[Document]:
+        """Embed ``query`` and return the ``k`` most similar chunks."""
+        if self.embedding is None:
+            raise ValueError("No embeddings configured to embed the query")
+        return self.similarity_search_by_vector(self.embedding.embed_query(query), k)
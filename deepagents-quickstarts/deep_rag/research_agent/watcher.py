@@ -0,0 +1,127 @@
+"""Background service that keeps the upload index in sync with the upload directory."""
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Collection, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+def iter_upload_files(upload_dir: Path, suffixes: Collection[str]) -> Iterator[Path]:
+    """Yield upload files with a supported suffix, bucket subdirectories included.
+
+    Hidden entries (such as the ``.rag_index`` directory) are skipped. Files are
+    yielded in order of their path relative to ``upload_dir``.
+    """
+    found: list[tuple[str, Path]] = []
+    for dirpath, dirnames, filenames in os.walk(upload_dir):
+        dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+        for name in filenames:
+            if name.startswith(".") or Path(name).suffix.lower() not in suffixes:
+                continue
+            path = Path(dirpath) / name
+            found.append((path.relative_to(upload_dir).as_posix(), path))
+    for _, path in sorted(found):
+        yield path
+
+
+def snapshot(upload_dir: Path, suffixes: Collection[str]) -> dict[str, tuple[int, int]]:
+    """Map each upload file path to its ``(mtime_ns, size)``."""
+    state: dict[str, tuple[int, int]] = {}
+    for path in iter_upload_files(upload_dir, suffixes):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        state[str(path)] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+class UploadWatcher:
+    """Poll an upload directory and re-sync the index when files change.
+
+    Every ``interval`` seconds the watcher stats all upload files. When the
+    listing differs from the last synced one and has been stable for one poll
+    (so half-written uploads are not ingested), it calls ``sync``, which is
+    expected to embed new or changed files, prune deleted ones, and return
+    whether every file is now indexed.
+    """
+
+    def __init__(
+        self,
+        upload_dir: Path,
+        sync: Callable[[], bool],
+        suffixes: Collection[str],
+        interval: float = 2.0,
+    ) -> None:
+        """Watch ``upload_dir`` for files with ``suffixes``; call ``start`` to begin polling."""
+        self.upload_dir = Path(upload_dir)
+        self.sync = sync
+        self.suffixes = suffixes
+        self.interval = interval
+        self.syncs = 0
+        self._synced: dict[str, tuple[int, int]] | None = None
+        self._previous: dict[str, tuple[int, int]] | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        """Return True while the polling thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def poll(self) -> bool:
+        """Check the directory once and sync if it changed; return True if synced."""
+        current = snapshot(self.upload_dir, self.suffixes)
+        previous, self._previous = self._previous, current
+        if current == self._synced or (self._synced is not None and current != previous):
+            return False
+
+        if self._synced is not None:
+            added = current.keys() - self._synced.keys()
+            removed = self._synced.keys() - current.keys()
+            changed = {
+                path
+                for path in current.keys() & self._synced.keys()
+                if current[path] != self._synced[path]
+            }
+            logger.info(
+                "Upload changes in %s: %d added, %d changed, %d removed",
+                self.upload_dir,
+                len(added),
+                len(changed),
+                len(removed),
+            )
+
+        if not self.sync():
+            # Some files could not be embedded; retry them on the next poll.
+            return False
+        self._synced = current
+        self.syncs += 1
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception:  # noqa: BLE001
+                logger.exception("Upload index sync failed for %s", self.upload_dir)
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        """Start polling in a daemon thread."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="rag-upload-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop polling and wait for the thread to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,88 @@
+import numpy as np
+
+from research_agent.ann import IVFIndex, recall_report, spherical_kmeans
+from research_agent.segments import write_segment
+from research_agent.vectorstore import SegmentStore, normalize_rows, top_k_indices
+
+
+def _clustered(rows: int, seed: int, dim: int = 16, clusters: int = 8) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = normalize_rows(np.random.default_rng(0).normal(size=(clusters, dim)))
+    noise = rng.normal(scale=0.15, size=(rows, dim))
+    return normalize_rows(centers[rng.integers(clusters, size=rows)] + noise).astype(np.float32)
+
+
+def _store(tmp_path, sizes=(300, 200)) -> SegmentStore:
+    store = SegmentStore()
+    for number, rows in enumerate(sizes):
+        vectors = _clustered(rows, seed=number + 1)
+        texts = [f"chunk {number}-{row}" for row in range(rows)]
+        store.add_segment(write_segment(tmp_path / f"seg{number}", texts, vectors))
+    return store
+
+
+def _exact(store: SegmentStore, query: np.ndarray, k: int) -> set[int]:
+    return set(top_k_indices(store.scores(query), k).tolist())
+
+
+def test_spherical_kmeans_returns_unit_centroids():
+    centroids = spherical_kmeans(_clustered(400, seed=3), nlist=8)
+    assert centroids.shape == (8, 16)
+    assert np.allclose(np.linalg.norm(centroids, axis=1), 1.0, atol=1e-5)
+    # Never more lists than points.
+    assert spherical_kmeans(_clustered(5, seed=3), nlist=8).shape[0] == 5
+
+
+def test_untrained_index_waits_for_enough_rows(tmp_path):
+    store = _store(tmp_path)
+    index = IVFIndex(tmp_path / "index", min_rows=10_000)
+    index.maybe_train(store, background=False)
+    assert not index.ready
+
+
+def test_probing_every_list_matches_exact_search(tmp_path):
+    store = _store(tmp_path)
+    index = IVFIndex(tmp_path / "index", nprobe=2, min_rows=100)
+    index.maybe_train(store, background=False)
+    assert index.ready
+    nlist = index.state[1].shape[0]
+
+    query = _clustered(1, seed=9)[0]
+    found = index.search(store, query, 10, nprobe=nlist)
+    assert set(found.tolist()) == _exact(store, query, 10)
+    assert len(index.search(store, query, 10, nprobe=1)) == 10
+
+    only_second = index.search(store, query, 10, nprobe=nlist, segments=[1])
+    assert (only_second >= store.segment_start(1)).all()
+
+    # A fresh index reloads the trained centroids from disk.
+    assert IVFIndex(tmp_path / "index").state[0] == index.state[0]
+
+
+def test_recall_report_reaches_full_recall(tmp_path):
+    store = _store(tmp_path)
+    index = IVFIndex(tmp_path / "index", min_rows=100)
+    index.maybe_train(store, background=False)
+    nlist = int(index.state[1].shape[0])
+    report = recall_report(store, index, k=5, nprobes=(1, nlist), queries=20)
+    assert report["rows"] == 500 and report["nlist"] == nlist
+    recalls = [result["recall"] for result in report["results"]]
+    assert recalls[-1] == 1.0
+    assert recalls[0] <= recalls[-1]
+
+
+def test_segment_added_after_training_is_still_found(tmp_path):
+    store = _store(tmp_path)
+    index = IVFIndex(tmp_path / "index", min_rows=100)
+    index.maybe_train(store, background=False)
+
+    vectors = _clustered(50, seed=5)
+    late = write_segment(tmp_path / "late", [f"late {row}" for row in range(50)], vectors)
+    store.add_segment(late)
+    # Rows with no buckets yet are scanned exactly, whatever lists are probed.
+    found = index.search(store, vectors[7], 5, nprobe=1)
+    assert found[0] == store.segment_start(2) + 7
+    nlist = index.state[1].shape[0]
+    assert set(index.search(store, vectors[7], 5, nprobe=nlist).tolist()) == _exact(
+        store, vectors[7], 5
+    )
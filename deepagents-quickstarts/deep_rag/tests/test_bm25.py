@@ -0,0 +1,51 @@
+import numpy as np
+
+from research_agent.bm25 import BM25Index, Postings, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_keeps_identifiers_whole():
+    assert tokenize("Error ERR-4012 in v1.2.3 for user_id.") == [
+        "error", "err-4012", "in", "v1.2.3", "for", "user_id",
+    ]  # fmt: skip
+
+
+def test_scores_prefer_rare_terms_and_offset_later_blocks():
+    index = BM25Index()
+    index.add(Postings.from_texts(["the cat sat", "the dog sat"]))
+    index.add(Postings.from_texts([]))
+    index.add(Postings.from_texts(["the dog barked at the cat", "nothing here"]))
+    assert len(index) == 4
+    assert len(index.blocks) == 2
+
+    scores = index.scores("dog barked")
+    assert scores.shape == (4,)
+    assert int(np.argmax(scores)) == 2
+    assert scores[0] == 0 and scores[3] == 0
+    # "the" is in most rows, so it weighs less than the rarer "cat".
+    assert index.scores("cat")[0] > index.scores("the")[0]
+    assert not index.scores("unicorn").any()
+
+
+def test_shorter_rows_win_on_equal_term_frequency():
+    index = BM25Index()
+    index.add(Postings.from_texts(["invoice total", "invoice total due in thirty days net"]))
+    scores = index.scores("invoice")
+    assert scores[0] > scores[1] > 0
+
+
+def test_postings_round_trip_through_json():
+    postings = Postings.from_texts(["a b a", "b c"])
+    loaded = Postings.from_json(postings.to_json())
+    assert loaded.lengths.tolist() == [3, 2]
+    rows, tfs = loaded.terms["a"]
+    assert rows.tolist() == [0] and tfs.tolist() == [2.0]
+    assert loaded.terms["b"][0].tolist() == [0, 1]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    dense = [4, 1, 7]
+    lexical = [1, 9, 4]
+    assert reciprocal_rank_fusion([dense, lexical]) == [1, 4, 9, 7]
+    # Equal fused scores fall back to the lower row id.
+    assert reciprocal_rank_fusion([[2, 5], [5, 2]]) == [2, 5]
+    assert reciprocal_rank_fusion([]) == []
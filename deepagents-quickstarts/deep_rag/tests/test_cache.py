@@ -0,0 +1,142 @@
+import zlib
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from research_agent import pipeline, tools
+from research_agent.cache import LRUCache, normalize_query
+
+
+class _Embeddings(Embeddings):
+    """Deterministic random vectors per text, counting query embedding calls."""
+
+    def __init__(self) -> None:
+        self.queries = 0
+
+    @staticmethod
+    def _vector(text: str) -> list[float]:
+        return np.random.default_rng(zlib.crc32(text.encode())).normal(size=8).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        self.queries += 1
+        return self._vector(text)
+
+
+def _retrieve(query: str, upload_dir) -> str:
+    return tools.retrieve_uploaded_context.func(query=query, upload_dir=str(upload_dir))
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get_or_compute("a", lambda: 0) == 1
+    assert cache.get_or_compute("d", lambda: 4) == 4
+    assert len(cache) == 2
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 2
+
+
+def test_lru_cache_invalidate_and_disable():
+    cache = LRUCache(8)
+    for key in [("x", 1), ("x", 2), ("y", 1)]:
+        cache.put(key, key)
+    assert cache.invalidate(lambda key: key[0] == "x") == 2
+    assert len(cache) == 1
+
+    disabled = LRUCache(0)
+    disabled.put("a", 1)
+    assert disabled.get("a") is None and len(disabled) == 0
+
+
+def test_normalize_query_folds_case_width_and_spacing():
+    assert normalize_query("  What\tis  ＡＰＩ latency? ") == "what is api latency?"
+
+
+def test_results_are_cached_until_an_upload_changes(tmp_path, monkeypatch):
+    embeddings = _Embeddings()
+    monkeypatch.setattr(tools, "EMBEDDING_MODEL", "fake-embeddings")
+    monkeypatch.setattr(tools, "_get_embeddings", lambda: embeddings)
+    tools._results.clear()
+    tools._query_embeddings.clear()
+    (tmp_path / "notes.md").write_text("The launch date is March 3.")
+
+    first = _retrieve("When is the launch?", tmp_path)
+    again = _retrieve(" when is the LAUNCH?", tmp_path)
+    assert "March 3" in first
+    assert again == first
+    assert tools._results.stats()["hits"] == 1
+    assert embeddings.queries == 1
+
+    (tmp_path / "notes.md").write_text("The launch date moved to May 9, after review.")
+    edited = _retrieve("When is the launch?", tmp_path)
+    assert "May 9" in edited and "March 3" not in edited
+    # The query vector is still reused; only the result had to be recomputed.
+    assert embeddings.queries == 1
+
+
+def test_searches_prune_deleted_uploads(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "EMBEDDING_MODEL", "fake-embeddings")
+    monkeypatch.setattr(tools, "_get_embeddings", lambda: _Embeddings())
+    (tmp_path / "keep.md").write_text("Kept notes about the launch.")
+    (tmp_path / "old.md").write_text("Retired notes about the launch.")
+    index = tools._get_index(tmp_path)
+    old_key = index.path_key(tmp_path / "old.md")
+    _retrieve("launch notes", tmp_path)
+    assert index.get(old_key) is not None
+
+    (tmp_path / "old.md").unlink()
+    assert "Retired" not in _retrieve("retired launch notes", tmp_path)
+    assert index.get(old_key) is None
+
+
+class _DownEmbeddings(_Embeddings):
+    """An embedding service that rejects every document batch."""
+
+    calls = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        _DownEmbeddings.calls += 1
+        raise ConnectionError("embedding service down")
+
+
+def test_lexical_fallback_results_are_not_cached(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(tools, "EMBEDDING_MODEL", "fake-embeddings")
+    monkeypatch.setattr(tools, "EMBEDDING_MAX_RETRIES", 0)
+    monkeypatch.setattr(tools, "_get_embeddings", lambda: _DownEmbeddings())
+    monkeypatch.setattr(pipeline, "_cooldowns", {})
+    tools._results.clear()
+    (tmp_path / "notes.md").write_text("The launch date is March 3.")
+
+    with caplog.at_level("INFO", logger=tools.__name__):
+        result = _retrieve("When is the launch?", tmp_path)
+    assert "March 3" in result and "embedding service unavailable" in result
+    assert len(tools._results) == 0
+    assert "Embedded 0 of 1 new files; of 1 chunks, 0 embedded, 0 reused" in caplog.text
+    assert "Ingested 1 new files, 0 embedded and 1 keyword-only" in caplog.text
+
+
+def test_failed_ingest_skips_the_embedder_during_the_cooldown(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "EMBEDDING_MODEL", "fake-embeddings")
+    monkeypatch.setattr(tools, "EMBEDDING_MAX_RETRIES", 0)
+    monkeypatch.setattr(tools, "EMBEDDING_FAILURE_COOLDOWN", 60.0)
+    monkeypatch.setattr(tools, "_get_embeddings", lambda: _DownEmbeddings())
+    monkeypatch.setattr(pipeline, "_cooldowns", {})
+    monkeypatch.setattr(_DownEmbeddings, "calls", 0)
+    (tmp_path / "notes.md").write_text("The launch date is March 3.")
+
+    _retrieve("When is the launch?", tmp_path)
+    assert _DownEmbeddings.calls == 1
+    (tmp_path / "more.md").write_text("The review is on May 9.")
+    result = _retrieve("When is the review?", tmp_path)
+    assert "May 9" in result and "embedding service unavailable" in result
+    assert _DownEmbeddings.calls == 1
+
+    pipeline._cooldowns.clear()
+    _retrieve("When is the review?", tmp_path)
+    assert _DownEmbeddings.calls == 2
@@ -0,0 +1,121 @@
+import random
+
+import numpy as np
+
+from research_agent.dedup import (
+    NUM_PERM,
+    DuplicateIndex,
+    earlier_duplicates,
+    fingerprint,
+    minhash_signature,
+    similarity,
+)
+
+THRESHOLD = 0.9
+
+
+def _document(words: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    vocabulary = [f"w{index}" for index in range(5000)]
+    return [rng.choice(vocabulary) for _ in range(words)]
+
+
+def _shingles(words: list[str]) -> set[str]:
+    return {" ".join(words[i : i + 3]) for i in range(len(words) - 2)}
+
+
+def _jaccard(left: list[str], right: list[str]) -> float:
+    a, b = _shingles(left), _shingles(right)
+    return len(a & b) / len(a | b)
+
+
+def test_overlapping_neighbour_chunks_are_not_near_duplicates():
+    words = _document(2000)
+    size, step = 130, 100  # ~800-character chunks overlapping by ~200 characters
+    chunks = [words[start : start + size] for start in range(0, len(words) - size, step)]
+    for left, right in zip(chunks, chunks[1:]):
+        estimate = similarity(minhash_signature(" ".join(left)), minhash_signature(" ".join(right)))
+        assert _jaccard(left, right) < 0.25
+        assert estimate < THRESHOLD
+        assert abs(estimate - _jaccard(left, right)) < 0.2
+
+
+def test_unrelated_chunks_are_not_near_duplicates():
+    for seed in range(20):
+        left = " ".join(_document(130, seed=seed))
+        right = " ".join(_document(130, seed=seed + 100))
+        assert similarity(minhash_signature(left), minhash_signature(right)) < 0.2
+
+
+def test_small_edit_is_a_near_duplicate():
+    words = _document(130)
+    edited = list(words)
+    edited[60] = "changed"
+    estimate = similarity(minhash_signature(" ".join(words)), minhash_signature(" ".join(edited)))
+    assert estimate >= THRESHOLD
+
+
+def test_permutations_pick_different_minimum_shingles():
+    words = _document(21)
+    shingles = sorted(_shingles(words))
+    per_shingle = np.stack([minhash_signature(shingle) for shingle in shingles])
+    winners = {int(np.argmin(per_shingle[:, perm])) for perm in range(NUM_PERM)}
+    # Independent permutations spread the minimum over almost every shingle.
+    assert len(winners) >= 15
+
+
+def _lookup(signatures: np.ndarray):
+    return lambda ref: signatures[ref[1]]
+
+
+def test_duplicate_index_matches_exact_and_near_copies_only():
+    words = _document(400)
+    base = " ".join(words[:130])
+    near = base.replace(words[60], "changed", 1)
+    neighbour = " ".join(words[100:230])
+    digests, signatures = fingerprint([base, near, neighbour, "  ".join(base.split())])
+
+    index = DuplicateIndex(THRESHOLD)
+    index.add("base", digests[:1], signatures[:1])
+    matches = index.match(digests[1:], signatures[1:], _lookup(signatures))
+    assert matches == [("base", 0), None, ("base", 0)]
+
+
+def test_exact_only_threshold_ignores_near_copies():
+    words = _document(130)
+    near = list(words)
+    near[60] = "changed"
+    digests, signatures = fingerprint([" ".join(words), " ".join(near), " ".join(words)])
+    index = DuplicateIndex(1.0)
+    index.add("base", digests[:1], signatures[:1])
+    assert index.match(digests[1:], signatures[1:], _lookup(signatures)) == [None, ("base", 0)]
+
+
+def test_duplicate_index_survives_merges_and_discard():
+    texts = [" ".join(_document(130, seed=seed)) for seed in range(40)]
+    digests, signatures = fingerprint(texts)
+    index = DuplicateIndex(THRESHOLD)
+    for owner in range(10):
+        block = slice(owner * 4, owner * 4 + 4)
+        index.add(f"seg{owner}", digests[block], signatures[block], start=100)
+    assert len(index) == 40
+
+    def lookup(ref):
+        return signatures[int(ref[0][3:]) * 4 + ref[1] - 100]
+
+    matches = index.match(digests, signatures, lookup)
+    assert matches == [(f"seg{pos // 4}", 100 + pos % 4) for pos in range(40)]
+
+    index.discard(["seg3"])
+    assert "seg3" not in index and len(index) == 36
+    assert index.match(digests[12:16], signatures[12:16], lookup) == [None] * 4
+
+
+def test_earlier_duplicates_within_a_block():
+    words = _document(400)
+    base = " ".join(words[:130])
+    near = base.replace(words[60], "changed", 1)
+    other = " ".join(words[200:330])
+    digests, signatures = fingerprint([base, other, near, base])
+    assert earlier_duplicates(digests, signatures, THRESHOLD).tolist() == [-1, -1, 0, 0]
+    assert earlier_duplicates(digests, signatures, 1.0).tolist() == [-1, -1, -1, 0]
@@ -0,0 +1,54 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from research_agent.embeddings import (
+    DEFAULT_HASHING_DIM,
+    HashingEmbeddings,
+    create_embeddings,
+    local_backend,
+    register_backend,
+)
+
+
+def test_hashing_embeddings_are_deterministic_unit_vectors():
+    first = HashingEmbeddings().embed_documents(["Quarterly revenue grew 12%", ""])
+    second = HashingEmbeddings().embed_documents(["Quarterly revenue grew 12%", ""])
+    assert first == second
+    assert len(first[0]) == DEFAULT_HASHING_DIM
+    assert np.linalg.norm(first[0]) == pytest.approx(1.0, abs=1e-6)
+    assert not any(first[1])
+    query = asyncio.run(HashingEmbeddings().aembed_query("Quarterly revenue grew 12%"))
+    assert query == first[0]
+
+
+def test_related_texts_score_higher_than_unrelated_ones():
+    model = HashingEmbeddings(256)
+    query, related, unrelated = (
+        np.asarray(vector)
+        for vector in model.embed_documents(
+            ["invoice payment overdue", "the invoice payment is overdue", "hiking trail map"]
+        )
+    )
+    assert query @ related > query @ unrelated + 0.3
+
+
+def test_model_names_pick_the_dimension():
+    assert HashingEmbeddings.from_model("local-hashing").dim == DEFAULT_HASHING_DIM
+    assert HashingEmbeddings.from_model("local-hashing-64").dim == 64
+    assert len(create_embeddings("local-hashing-32").embed_query("text")) == 32
+    for model in ("local-hashing-x", "local-hashingx", "hashing-64"):
+        with pytest.raises(ValueError, match="Unknown local hashing model"):
+            HashingEmbeddings.from_model(model)
+    with pytest.raises(ValueError, match="at least 16"):
+        HashingEmbeddings.from_model("local-hashing-8")
+
+
+def test_only_registered_prefixes_are_served_locally(monkeypatch):
+    monkeypatch.setattr("research_agent.embeddings.LOCAL_BACKENDS", {})
+    assert local_backend("local-hashing") is None
+    register_backend("stub", lambda model: HashingEmbeddings(16))
+    assert local_backend("stub-small") is not None
+    assert local_backend("stubborn") is None
+    assert create_embeddings("stub").dim == 16
@@ -0,0 +1,50 @@
+from research_agent import tools
+from research_agent.segments import TextSegment
+from research_agent.vectorstore import SegmentStore
+
+
+def _store() -> SegmentStore:
+    store = SegmentStore()
+    store.add_segment(TextSegment(["alpha one", "alpha two"]), {"source": "a.md"})
+    store.add_segment(
+        TextSegment(["beta one"]), {"source": "docs/b.md", "sources": ["docs/b.md", "copy.md"]}
+    )
+    store.add_segment(TextSegment(["gamma one", "gamma two"]), {"source": "c.md"})
+    return store
+
+
+def test_row_mask_covers_the_rows_of_selected_segments():
+    store = _store()
+    assert store.row_mask([0, 2]).tolist() == [True, True, False, True, True]
+    assert not store.row_mask([]).any()
+
+
+def test_grounding_filter_matches_names_paths_and_copies():
+    store = _store()
+    assert tools._grounding_filter(store, None) is None
+    assert tools._grounding_filter(store, []) is None
+
+    segments, mask = tools._grounding_filter(store, ["B.MD"])
+    assert segments == [1]
+    assert mask.tolist() == [False, False, True, False, False]
+    assert tools._grounding_filter(store, ["docs/b.md"])[0] == [1]
+    # Selecting any copy of shared content selects its segment.
+    assert tools._grounding_filter(store, ["copy.md", "c.md"])[0] == [1, 2]
+    assert tools._grounding_filter(store, ["missing.md"])[0] == []
+
+
+def test_retrieval_only_returns_selected_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "EMBEDDING_MODEL", "")
+    (tmp_path / "plan.md").write_text("The budget for the plan is ten thousand.")
+    (tmp_path / "memo.md").write_text("The budget in this memo was cut.")
+
+    result = tools.retrieve_uploaded_context.func(
+        query="budget", grounding_files=["memo.md"], upload_dir=str(tmp_path)
+    )
+    assert "memo was cut" in result
+    assert "plan.md" not in result
+
+    missing = tools.retrieve_uploaded_context.func(
+        query="budget", grounding_files=["other.md"], upload_dir=str(tmp_path)
+    )
+    assert missing.startswith("No usable uploaded files")
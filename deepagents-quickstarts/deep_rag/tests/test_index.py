@@ -0,0 +1,51 @@
+import numpy as np
+
+from research_agent.index import UploadIndex
+
+
+def _ingest(index: UploadIndex, path) -> str:
+    key = index.path_key(path)
+    if index.get(key) is None:
+        index.put(key, [path.read_text()], np.ones((1, 4), dtype=np.float32))
+    return key
+
+
+def test_prune_removes_released_keys_of_one_upload_dir_only(tmp_path):
+    index = UploadIndex(tmp_path / "index", "model", 800, 200)
+    first, second = tmp_path / "a", tmp_path / "b"
+    first.mkdir()
+    second.mkdir()
+    (first / "edited.md").write_text("old text")
+    (first / "deleted.md").write_text("gone soon")
+    (second / "other.md").write_text("other dir")
+    (second / "copy.md").write_text("gone soon")
+    old = _ingest(index, first / "edited.md")
+    deleted = _ingest(index, first / "deleted.md")
+    other = _ingest(index, second / "other.md")
+    assert _ingest(index, second / "copy.md") == deleted
+
+    (first / "edited.md").write_text("new text, new size")
+    (first / "deleted.md").unlink()
+    new = _ingest(index, first / "edited.md")
+    index.forget_paths_except({str(first / "edited.md")}, first)
+
+    assert index.prune() == 1
+    assert index.get(old) is None
+    assert index.get(new) is not None
+    assert index.get(deleted) is not None  # still referenced by the other dir's copy
+    assert index.get(other) is not None
+
+
+def test_released_keys_survive_a_restart(tmp_path):
+    root, uploads = tmp_path / "index", tmp_path / "uploads"
+    uploads.mkdir()
+    (uploads / "file.md").write_text("first")
+    index = UploadIndex(root, "model", 800, 200)
+    old = _ingest(index, uploads / "file.md")
+    (uploads / "file.md").write_text("second version")
+    _ingest(index, uploads / "file.md")
+    index.save_manifest()
+
+    reopened = UploadIndex(root, "model", 800, 200)
+    assert reopened.prune() == 1
+    assert reopened.get(old) is None
@@ -0,0 +1,90 @@
+from research_agent import listing, tools
+from research_agent.listing import (
+    DirectoryListing,
+    FileEntry,
+    filter_entries,
+    format_size,
+)
+
+
+def _uploads(tmp_path):
+    (tmp_path / "reports").mkdir()
+    (tmp_path / "reports" / "q1.csv").write_text("a,b\n1,2\n")
+    (tmp_path / "reports" / "Q2 summary.md").write_text("# Q2\n")
+    (tmp_path / "notes.txt").write_text("notes")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG")
+    (tmp_path / ".rag_index").mkdir()
+    (tmp_path / ".rag_index" / "manifest.json").write_text("{}")
+    return tmp_path
+
+
+def test_listing_rescans_only_when_a_directory_changed(tmp_path, monkeypatch):
+    monkeypatch.setattr(listing, "RACY_NS", 0)
+    snapshot = DirectoryListing(_uploads(tmp_path))
+    paths = [entry.path for entry in snapshot.entries()]
+    assert paths == ["logo.png", "notes.txt", "reports/Q2 summary.md", "reports/q1.csv"]
+    snapshot.entries()
+    assert snapshot.scans == 1
+
+    (tmp_path / "reports" / "q3.csv").write_text("a\n")
+    assert "reports/q3.csv" in [entry.path for entry in snapshot.entries()]
+    assert snapshot.scans == 2
+
+    # Editing a file in place does not move any directory mtime.
+    (tmp_path / "notes.txt").write_text("longer notes")
+    assert next(e for e in snapshot.entries() if e.name == "notes.txt").size == 5
+    snapshot.invalidate()
+    assert next(e for e in snapshot.entries() if e.name == "notes.txt").size == 12
+    assert snapshot.scans == 3
+
+
+def test_recent_directory_changes_are_always_rescanned(tmp_path):
+    snapshot = DirectoryListing(_uploads(tmp_path))
+    snapshot.entries()
+    snapshot.entries()
+    assert snapshot.scans == 2
+
+
+def test_filter_entries_by_name_extension_and_bucket():
+    entries = [
+        FileEntry("notes.txt", 5, 0),
+        FileEntry("reports/Q2 summary.md", 10, 0),
+        FileEntry("reports/q1.csv", 8, 0),
+    ]
+
+    def paths(**filters) -> list[str]:
+        return [entry.path for entry in filter_entries(entries, **filters)]
+
+    assert paths(name="q1") == ["reports/q1.csv"]
+    assert paths(name="q*") == ["reports/Q2 summary.md", "reports/q1.csv"]
+    assert paths(extensions=["CSV", ".txt"]) == ["notes.txt", "reports/q1.csv"]
+    assert paths(bucket="") == ["notes.txt"]
+    assert paths(bucket="/Reports/", extensions=["md"]) == ["reports/Q2 summary.md"]
+
+
+def test_format_size_uses_binary_units():
+    assert format_size(512) == "512 B"
+    assert format_size(1536) == "1.5 KB"
+    assert format_size(5 * 1024**3) == "5.0 GB"
+    assert format_size(2 * 1024**4) == "2.0 TB"
+
+
+def test_list_uploaded_files_pages_and_summarizes(tmp_path):
+    uploads = _uploads(tmp_path)
+    page = tools.list_uploaded_files.func(
+        limit=2, grounding_files=["q1.csv"], upload_dir=str(uploads)
+    )
+    assert "[ ] logo.png (4 bytes, not searchable)" in page
+    assert "Showing 1-2 of 4 files. Call again with offset=2 for more." in page
+
+    last = tools.list_uploaded_files.func(
+        offset=2, limit=2, grounding_files=["q1.csv"], upload_dir=str(uploads)
+    )
+    assert "[*] reports/q1.csv" in last
+    assert "Showing 3-4 of 4 files." in last and "offset=4" not in last
+    assert "past the end" in tools.list_uploaded_files.func(offset=9, upload_dir=str(uploads))
+
+    summary = tools.list_uploaded_files.func(summary=True, upload_dir=str(uploads))
+    assert summary.startswith("Uploaded files: 4 files")
+    assert "- reports: 2 files" in summary
+    assert "- .png, not searchable: 1 files, 4 B" in summary
@@ -0,0 +1,70 @@
+import numpy as np
+
+from research_agent.packing import (
+    estimate_tokens,
+    merge_overlap,
+    mmr_order,
+    pack_context,
+)
+from research_agent.segments import TextSegment
+from research_agent.vectorstore import SegmentStore
+
+
+def test_mmr_order_skips_near_duplicates():
+    vectors = np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    relevance = np.array([1.0, 0.95, 0.6], dtype=np.float32)
+    assert mmr_order(vectors, relevance, lambda_mult=0.5) == [0, 2, 1]
+    # With relevance only, the ranking is kept.
+    assert mmr_order(vectors, relevance, lambda_mult=1.0) == [0, 1, 2]
+
+
+def test_mmr_order_never_penalizes_rows_without_embeddings():
+    vectors = np.array([[1.0, 0.0], [0.0, 0.0], [1.0, 0.0]], dtype=np.float32)
+    relevance = np.array([1.0, 0.5, 0.9], dtype=np.float32)
+    assert mmr_order(vectors, relevance, lambda_mult=0.5) == [0, 1, 2]
+
+
+def test_merge_overlap_drops_the_shared_seam():
+    assert merge_overlap("alpha beta gamma", "beta gamma delta", 20) == "alpha beta gamma delta"
+    assert merge_overlap("alpha beta gamma", "beta gamma delta", 4) == (
+        "alpha beta gamma\nbeta gamma delta"
+    )
+    assert merge_overlap("one", "two", 10) == "one\ntwo"
+
+
+def _store() -> SegmentStore:
+    store = SegmentStore()
+    store.add_segment(
+        TextSegment(["First part shared", "shared second part", "Third, unrelated"]),
+        {"source": "a.md"},
+    )
+    store.add_segment(TextSegment(["Other file chunk"]), {"source": "b.md"})
+    return store
+
+
+def test_pack_context_merges_neighbours_and_reports_sources():
+    docs = pack_context(_store(), [1, 3, 0], max_chunks=3, token_budget=1000, also={3: ["c.md"]})
+    assert [doc.page_content for doc in docs] == [
+        "First part shared second part",
+        "Other file chunk",
+    ]
+    assert docs[0].metadata == {"source": "a.md", "chunks": 2, "sources": ["a.md"]}
+    assert docs[1].metadata["sources"] == ["b.md", "c.md"]
+
+
+def test_pack_context_respects_budget_and_chunk_limit():
+    store = _store()
+    docs = pack_context(store, [2, 3, 0], max_chunks=1, token_budget=1000)
+    assert [doc.page_content for doc in docs] == ["Third, unrelated"]
+
+    budget = estimate_tokens("Third, unrelated") + 8
+    docs = pack_context(store, [2, 3], max_chunks=5, token_budget=budget)
+    assert [doc.page_content for doc in docs] == ["Third, unrelated"]
+
+
+def test_pack_context_truncates_an_oversized_best_chunk():
+    store = SegmentStore()
+    store.add_segment(TextSegment(["x" * 400]), {"source": "big.md"})
+    (doc,) = pack_context(store, [0], max_chunks=3, token_budget=10)
+    assert doc.page_content == "x" * 8 + "..."
+    assert pack_context(store, [], max_chunks=3, token_budget=10) == []
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from research_agent.quantize import (
+    QuantizedIndex,
+    int8_scales,
+    quantization_report,
+    quantize_binary,
+    quantize_int8,
+)
+from research_agent.segments import write_segment
+from research_agent.vectorstore import SegmentStore, normalize_rows, top_k_indices
+
+
+def _vectors(rows: int, seed: int, dim: int = 32) -> np.ndarray:
+    return normalize_rows(np.random.default_rng(seed).normal(size=(rows, dim))).astype(np.float32)
+
+
+def _store(tmp_path) -> SegmentStore:
+    store = SegmentStore()
+    for number, rows in enumerate((120, 80)):
+        texts = [f"chunk {number}-{row}" for row in range(rows)]
+        store.add_segment(write_segment(tmp_path / f"seg{number}", texts, _vectors(rows, number)))
+    return store
+
+
+def test_int8_codes_round_trip_within_one_step():
+    vectors = _vectors(50, seed=3)
+    scales = int8_scales(vectors)
+    codes = quantize_int8(vectors, scales)
+    assert codes.dtype == np.int8
+    assert np.abs(codes).max() == 127
+    assert np.abs(codes * scales - vectors).max() <= scales.max() / 2 + 1e-6
+
+
+def test_binary_codes_pack_sign_bits():
+    codes = quantize_binary(np.array([[1.0, -1.0] * 4 + [0.5] * 2]))
+    assert codes.shape == (1, 2)
+    assert codes.tolist() == [[0b10101010, 0b11000000]]
+
+
+@pytest.mark.parametrize("kind", ["int8", "binary"])
+def test_full_rescoring_matches_exact_search(tmp_path, kind):
+    store = _store(tmp_path)
+    index = QuantizedIndex(kind)
+    query = _vectors(1, seed=9)[0]
+    exact = top_k_indices(store.scores(query), 5).tolist()
+    # A shortlist covering every row leaves the exact rescoring to decide.
+    assert index.search(store, query, 5, rescore=len(store)).tolist() == exact
+    # The stored row itself always comes back first.
+    assert index.search(store, store.segments[1].vectors[3], 1)[0] == store.segment_start(1) + 3
+
+    limited = index.search(store, query, 5, segments=[1], rescore=len(store))
+    assert (limited >= store.segment_start(1)).all()
+
+
+def test_codes_are_saved_next_to_the_segment(tmp_path):
+    store = _store(tmp_path)
+    codes, scales = QuantizedIndex("int8").codes(store.segments[0])
+    assert (tmp_path / "seg0.q8").exists()
+    reloaded, reloaded_scales = QuantizedIndex("int8").codes(store.segments[0])
+    assert np.array_equal(codes, reloaded) and np.array_equal(scales, reloaded_scales)
+
+    binary = QuantizedIndex("binary")
+    assert binary.nbytes(store) == len(store) * 32 // 8
+    with pytest.raises(ValueError, match="Unknown quantization"):
+        QuantizedIndex("int4")
+
+
+def test_quantization_report_counts_memory_saved(tmp_path):
+    store = _store(tmp_path)
+    report = quantization_report(store, k=5, rescores=(200,), queries=10)
+    results = {result["kind"]: result for result in report["results"]}
+    assert results["binary"]["memory_saved"] == pytest.approx(1 - 1 / 32, abs=1e-4)
+    assert results["int8"]["memory_saved"] < results["binary"]["memory_saved"]
+    assert all(result["recall"] == 1.0 for result in report["results"])
@@ -0,0 +1,91 @@
+import math
+
+import numpy as np
+import pytest
+
+from research_agent import tables
+from research_agent.tables import Table, load_table, parse_filter
+
+RECORDS = [
+    {"city": "Boston", "zip": "02134", "price": "10", "qty": 1},
+    {"city": "boston", "zip": "02139", "price": "2.5", "qty": 3},
+    {"city": "Denver", "zip": "80202", "price": "", "qty": 2},
+    {"city": "Austin", "zip": "73301", "price": "4", "qty": None},
+    {"city": "Denver", "zip": "80203", "price": "1"},
+]
+
+
+def _table(records=RECORDS) -> Table:
+    return Table.from_records(lambda: iter(records))
+
+
+def test_parse_filter_normalizes_operator_and_quotes():
+    assert parse_filter("city = 'Boston'") == ("city", "==", "Boston")
+    assert parse_filter('`zip code` != "02134"') == ("zip code", "!=", "02134")
+    assert parse_filter("Title CONTAINS war and peace") == ("Title", "contains", "war and peace")
+    assert parse_filter("price>=2.5") == ("price", ">=", "2.5")
+    with pytest.raises(ValueError, match="Cannot parse"):
+        parse_filter("price is cheap")
+
+
+def test_from_records_types_columns_and_keeps_missing_cells():
+    table = _table()
+    assert len(table) == 5
+    assert table.column("PRICE").numeric
+    assert math.isnan(table.column("price").values[2])
+    assert table.column("qty").missing().tolist() == [False, False, False, True, True]
+    # Leading zeros keep the whole column as text, so zip codes keep their digits.
+    zips = table.column("zip")
+    assert not zips.numeric
+    assert zips.cell(0) == "02134"
+    with pytest.raises(ValueError, match="Unknown column"):
+        table.column("country")
+
+
+def test_from_records_fills_across_batches(monkeypatch):
+    monkeypatch.setattr(tables, "TABLE_BATCH_ROWS", 2)
+    records = [{"n": str(i), "tag": "x" if i % 3 else ""} for i in range(7)]
+    table = _table(records)
+    assert table.column("n").values.tolist() == list(range(7))
+    assert table.column("tag").values.tolist() == [-1, 0, 0, -1, 0, 0, -1]
+    assert table.column("tag").labels == ["x"]
+
+
+def test_mask_combines_conditions_case_insensitively():
+    table = _table()
+    assert np.flatnonzero(table.mask(["city == BOSTON"])).tolist() == [0, 1]
+    assert np.flatnonzero(table.mask(["city contains ver", "price > 0"])).tolist() == [4]
+    # Missing values never satisfy a comparison, not even !=.
+    assert np.flatnonzero(table.mask(["price != 4"])).tolist() == [0, 1, 4]
+    with pytest.raises(ValueError, match="numeric"):
+        table.mask(["price > cheap"])
+
+
+def test_aggregate_by_group():
+    table = _table()
+    everything = np.ones(len(table), dtype=bool)
+    assert table.aggregate("sum", everything, "qty") == [("", 6.0, 5)]
+    assert table.aggregate("count", everything, group_by="city") == [
+        ("Denver", 2.0, 2),
+        ("Boston", 1.0, 1),
+        ("boston", 1.0, 1),
+        ("Austin", 1.0, 1),
+    ]
+    # Groups without any value for the target are dropped.
+    assert table.aggregate("max", table.mask(["qty > 1"]), "price", "city") == [
+        ("boston", 2.5, 1),
+    ]
+    with pytest.raises(ValueError, match="not numeric"):
+        table.aggregate("mean", everything, "city")
+
+
+def test_load_table_round_trips_the_sidecar(tmp_path):
+    path = tmp_path / "sales.csv"
+    path.write_text("region,amount\nnorth,3\nsouth,4\nnorth,5\n")
+    sidecar = tmp_path / "index" / "key.tab"
+    table = load_table(sidecar, path)
+    assert sidecar.exists()
+    stored = Table.from_file(sidecar)
+    assert stored.aggregate("sum", stored.mask(["region = north"]), "amount") == [("", 8.0, 2)]
+    assert table.column("region").labels == stored.column("region").labels
+    assert load_table(tmp_path / "index" / "other.tab", tmp_path / "notes.txt") is None
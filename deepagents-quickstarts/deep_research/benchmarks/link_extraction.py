@@ -0,0 +1,114 @@
+"""Micro-benchmark link extraction from saved news homepages.
+
+Every ``*.html`` page under ``--fixtures`` (default ``benchmarks/fixtures``) is
+passed through ``_extract_article_links`` once per registered link parser
+(``research_agent.links.LINK_PARSERS``), ``--repeat`` times each. For every page
+and parser the median time and the number of anchors are reported, along with
+whether the anchors and the selected article links are identical to the
+BeautifulSoup (``bs4``) reference.
+
+The committed fixtures are two generated homepages shaped like large news
+fronts (inline JSON state, navigation, teaser grids, footers) and a page of
+malformed markup. ``--save URL ...`` downloads real homepages into the fixture
+directory first, so later runs measure those pages offline.
+
+Usage:
+    python benchmarks/link_extraction.py --topic politics --repeat 20
+    python benchmarks/link_extraction.py --save https://apnews.com/ https://www.bbc.com/news
+"""
+
+import argparse
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from research_agent import links, tools  # noqa: E402
+from research_agent.http_client import get_client  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+BASE_URL = "https://news.example.com/"
+
+
+def save_pages(urls: list[str], fixtures: Path) -> None:
+    """Download homepages into ``fixtures``, named after their host and path."""
+    fixtures.mkdir(parents=True, exist_ok=True)
+    for url in urls:
+        parts = urlsplit(url)
+        name = re.sub(r"[^a-z0-9]+", "-", f"{parts.netloc}{parts.path}".lower()).strip("-")
+        response = get_client().get(url)
+        response.raise_for_status()
+        (fixtures / f"{name}.html").write_text(response.text, encoding="utf-8")
+
+
+def time_call(func, repeat: int) -> tuple[float, object]:
+    """Return the median seconds of ``repeat`` calls and the last result."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def bench_page(path: Path, topic: str, max_articles: int, repeat: int) -> dict:
+    """Time every link parser on one page and compare it with the bs4 reference."""
+    html = path.read_text(encoding="utf-8", errors="replace")
+    reference = list(links.soup_anchors(html))
+    links.SCRAPE_LINK_PARSER = "bs4"
+    reference_links = tools._extract_article_links(html, BASE_URL, topic, max_articles)
+    page = {"page": path.name, "html_kb": round(len(html.encode("utf-8")) / 1024, 1)}
+    parsers = {}
+    for name in links.LINK_PARSERS:
+        links.SCRAPE_LINK_PARSER = name
+        seconds, selected = time_call(
+            lambda: tools._extract_article_links(html, BASE_URL, topic, max_articles), repeat
+        )
+        anchors = list(links.anchors(html, name))
+        parsers[name] = {
+            "median_ms": round(seconds * 1000, 2),
+            "anchors": len(anchors),
+            "identical_anchors": anchors == reference,
+            "identical_links": selected == reference_links,
+        }
+    page["parsers"] = parsers
+    if "bs4" in parsers:
+        for name, result in parsers.items():
+            baseline = parsers["bs4"]["median_ms"]
+            result["speedup"] = round(baseline / max(result["median_ms"], 1e-6), 2)
+    return page
+
+
+def main() -> None:
+    """Run the benchmark over every fixture page and print the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES)
+    parser.add_argument("--save", nargs="+", default=[], metavar="URL")
+    parser.add_argument("--topic", default="")
+    parser.add_argument("--max-articles", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.save:
+        save_pages(args.save, args.fixtures)
+    pages = sorted(args.fixtures.glob("*.html"))
+    if not pages:
+        parser.error(f"No *.html fixtures in {args.fixtures}")
+
+    configured = links.SCRAPE_LINK_PARSER
+    try:
+        results = [bench_page(path, args.topic, args.max_articles, args.repeat) for path in pages]
+    finally:
+        links.SCRAPE_LINK_PARSER = configured
+    report = {"topic": args.topic, "repeat": args.repeat, "pages": results}
+    print(json.dumps(report, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""Readability-style main-content extraction for scraped articles.
+
+News pages wrap a few kilobytes of article text in navigation, footers, ads,
+scripts and related-story widgets. Converting all of it to markdown is slow on
+large pages and fills the sub-agent's context with tokens the local model must
+prefill. ``extract_article`` keeps only the article:
+
+1. Scripts, styles, embeds and form controls are removed.
+2. Every paragraph outside layout elements (forms, navigation, headers,
+   footers, asides) and elements whose class or id looks like boilerplate
+   (share bars, comments, promos, newsletter boxes...) scores its parent (and
+   half of that its grandparent) by text length and commas; containers are
+   weighted by class/id hints and penalized by link density. The best container
+   wins, together with sibling containers that score nearly as well. If that
+   finds no article, paragraphs inside layout elements are scored too: ASP.NET
+   WebForms pages, for one, wrap the whole body in a ``<form>``.
+3. Layout and boilerplate elements are removed, except those containing the
+   chosen content; if removing them would leave nothing, the page is kept
+   unstripped.
+4. Title, byline and publication date are read from metadata tags first, then
+   from the page.
+
+The result is converted to markdown from the already parsed tree and cut at a
+paragraph boundary to ``max_tokens`` estimated tokens (about 4 characters each).
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Collection
+
+from bs4 import BeautifulSoup, Tag
+from markdownify import MarkdownConverter
+
+CHARS_PER_TOKEN = 4
+MIN_PARAGRAPH_CHARS = 25
+MIN_ARTICLE_CHARS = 200
+SIBLING_SCORE_RATIO = 0.2
+JUNK_TAGS = (
+    "script", "style", "noscript", "template", "iframe", "svg", "canvas", "button",
+    "input", "select",
+)  # fmt: skip
+LAYOUT_TAGS = ("form", "nav", "header", "footer", "aside")
+NEGATIVE = re.compile(
+    r"\b(ad|ads|advert\w*|banner|comment\w*|cookie\w*|footer|masthead|menu|meta|"
+    r"modal|nav\w*|newsletter|outbrain|paywall|popup|promo\w*|related|share\w*|"
+    r"sidebar|social|sponsor\w*|subscri\w*|taboola|tags?|widget)\b",
+    re.IGNORECASE,
+)
+POSITIVE = re.compile(
+    r"\b(article\w*|body|content|entry|main|post|story|text)\b", re.IGNORECASE
+)
+BYLINE = re.compile(r"\b(byline|author)\b", re.IGNORECASE)
+
+_converter = MarkdownConverter(heading_style="ATX", strip=["img"])
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the prompt tokens used by ``text``."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@dataclass
+class Article:
+    """Extracted article text and the size of the page it came from."""
+
+    title: str
+    byline: str
+    published: str
+    markdown: str
+    html_bytes: int
+    truncated_tokens: int = 0
+
+    @property
+    def markdown_bytes(self) -> int:
+        """Return the UTF-8 size of the extracted markdown."""
+        return len(self.markdown.encode("utf-8"))
+
+
+def _hints(tag: Tag) -> str:
+    classes = tag.get("class") or []
+    return " ".join([*classes, tag.get("id") or ""]) if tag.attrs else ""
+
+
+def _meta(soup: BeautifulSoup, *keys: str) -> str:
+    for key in keys:
+        for attr in ("property", "name", "itemprop"):
+            found = soup.find("meta", attrs={attr: key})
+            if found is not None and found.get("content"):
+                return found["content"].strip()
+    return ""
+
+
+def _title(soup: BeautifulSoup) -> str:
+    title = _meta(soup, "og:title", "twitter:title", "headline")
+    if not title and (heading := soup.find("h1")) is not None:
+        title = heading.get_text(" ", strip=True)
+    if not title and soup.title is not None:
+        title = soup.title.get_text(" ", strip=True)
+    return title
+
+
+def _byline(soup: BeautifulSoup) -> str:
+    byline = _meta(soup, "author", "article:author", "byl", "parsely-author")
+    if byline.startswith(("http://", "https://")):
+        byline = ""
+    if not byline and (link := soup.find(attrs={"rel": "author"})) is not None:
+        byline = link.get_text(" ", strip=True)
+    if not byline:
+        for tag in soup.find_all(True, class_=BYLINE, limit=5):
+            text = tag.get_text(" ", strip=True)
+            if 0 < len(text) < 100:
+                byline = text
+                break
+    return re.sub(r"^by\s+", "", byline, flags=re.IGNORECASE)
+
+
+def _published(soup: BeautifulSoup) -> str:
+    published = _meta(
+        soup, "article:published_time", "datePublished", "pubdate", "date", "dc.date"
+    )
+    if not published and (time_tag := soup.find("time")) is not None:
+        published = time_tag.get("datetime") or time_tag.get_text(" ", strip=True)
+    return published
+
+
+def _boilerplate(root: Tag) -> list[Tag]:
+    """Return layout elements and elements hinted as boilerplate, in document order."""
+    found = []
+    for tag in root.find_all(True):
+        if tag.name in ("html", "body", "article", "main"):
+            continue
+        hints = _hints(tag)
+        if tag.name in LAYOUT_TAGS or (
+            hints and NEGATIVE.search(hints) and not POSITIVE.search(hints)
+        ):
+            found.append(tag)
+    return found
+
+
+def _strip_boilerplate(root: Tag, boilerplate: list[Tag], keep: list[Tag]) -> None:
+    """Remove ``boilerplate`` elements that do not contain ``keep``.
+
+    Nothing is removed when that would leave ``root`` without text.
+    """
+    protected = {id(tag) for node in keep for tag in (node, *node.parents)}
+    removable = [tag for tag in boilerplate if id(tag) not in protected]
+    removed = {id(tag) for tag in removable}
+    outermost = [
+        tag for tag in removable if not any(id(parent) in removed for parent in tag.parents)
+    ]
+    if _text_length(outermost) >= _text_length([root]):
+        return
+    for tag in outermost:
+        tag.decompose()
+
+
+def _text_length(tags: list[Tag]) -> int:
+    return sum(len(tag.get_text(strip=True)) for tag in tags)
+
+
+def _link_density(tag: Tag, text_length: int) -> float:
+    if not text_length:
+        return 1.0
+    linked = sum(len(a.get_text(strip=True)) for a in tag.find_all("a"))
+    return min(1.0, linked / text_length)
+
+
+def _class_weight(tag: Tag) -> int:
+    hints = _hints(tag)
+    weight = 0
+    if hints and NEGATIVE.search(hints):
+        weight -= 25
+    if hints and POSITIVE.search(hints):
+        weight += 25
+    if tag.name in ("article", "main"):
+        weight += 25
+    return weight
+
+
+def _best_content(root: Tag, skip: Collection[int] = ()) -> list[Tag]:
+    """Return the highest-scoring container and siblings that score nearly as well.
+
+    Paragraphs inside the elements whose ``id()`` is in ``skip`` are not scored.
+    """
+    scores: dict[int, float] = {}
+    tags: dict[int, Tag] = {}
+    for paragraph in root.find_all(("p", "pre", "blockquote", "li")):
+        if skip and any(id(tag) in skip for tag in (paragraph, *paragraph.parents)):
+            continue
+        text = paragraph.get_text(" ", strip=True)
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            continue
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+        parent = paragraph.parent
+        for depth, ancestor in enumerate((parent, parent.parent if parent else None)):
+            if not isinstance(ancestor, Tag) or ancestor.name in ("html", "[document]"):
+                break
+            if id(ancestor) not in scores:
+                tags[id(ancestor)] = ancestor
+                scores[id(ancestor)] = _class_weight(ancestor)
+            scores[id(ancestor)] += score if depth == 0 else score / 2
+
+    if not scores:
+        return []
+    for key, tag in tags.items():
+        scores[key] *= 1 - _link_density(tag, len(tag.get_text(strip=True)))
+    best_key = max(scores, key=scores.get)
+    best = tags[best_key]
+    threshold = max(10.0, scores[best_key] * SIBLING_SCORE_RATIO)
+    if best.parent is None:
+        return [best]
+    chosen = []
+    for sibling in best.parent.find_all(True, recursive=False):
+        if sibling is best or scores.get(id(sibling), 0.0) >= threshold:
+            chosen.append(sibling)
+    return chosen
+
+
+def _truncate(markdown: str, max_tokens: int) -> tuple[str, int]:
+    """Cut markdown at a paragraph boundary to fit ``max_tokens``."""
+    if max_tokens <= 0 or estimate_tokens(markdown) <= max_tokens:
+        return markdown, 0
+    limit = max_tokens * CHARS_PER_TOKEN
+    cut = markdown.rfind("\n\n", 0, limit)
+    if cut < limit // 2:
+        cut = markdown.rfind(" ", 0, limit)
+    kept = markdown[: cut if cut > 0 else limit].rstrip()
+    return kept, estimate_tokens(markdown) - estimate_tokens(kept)
+
+
+def extract_article(html: str, max_tokens: int = 0) -> Article:
+    """Extract the main content of an article page as markdown.
+
+    Args:
+        html: Raw page HTML.
+        max_tokens: Estimated token budget for the markdown; 0 means unlimited.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    title, byline, published = _title(soup), _byline(soup), _published(soup)
+
+    root = soup.body or soup
+    for tag in root.find_all(JUNK_TAGS):
+        tag.decompose()
+    boilerplate = _boilerplate(root)
+    chosen = _best_content(root, skip={id(tag) for tag in boilerplate})
+    if _text_length(chosen) < MIN_ARTICLE_CHARS:
+        chosen = _best_content(root)
+    _strip_boilerplate(root, boilerplate, keep=chosen)
+    if _text_length(chosen) < MIN_ARTICLE_CHARS:
+        chosen = [root]
+
+    parts = [_converter.convert_soup(tag).strip() for tag in chosen]
+    markdown = re.sub(r"\n{3,}", "\n\n", "\n\n".join(part for part in parts if part))
+    markdown, truncated = _truncate(markdown, max_tokens)
+    return Article(
+        title=title,
+        byline=byline,
+        published=published,
+        markdown=markdown,
+        html_bytes=len(html.encode("utf-8")),
+        truncated_tokens=truncated,
+    )
@@ -0,0 +1,198 @@
+"""Anchor extraction for news homepages without building a document tree.
+
+``_extract_article_links`` only needs each ``<a href>`` and its text, yet
+``BeautifulSoup(html, "html.parser")`` builds a full tree of the page first,
+which dominates the CPU cost of a scrape on large homepages. ``iter_anchors``
+drives the same stdlib ``html.parser`` tokenizer directly and mirrors the tree
+builder's rules, so it returns exactly what
+``soup.find_all("a", href=True)`` with ``get_text(" ", strip=True)`` would:
+
+- an end tag closes the most recent open element of that name and everything
+  opened after it, and is ignored when no such element is open;
+- void elements (``br``, ``img``...) never contain text, and a stray end tag
+  for one is ignored once;
+- text inside ``script``, ``style``, ``template``, ``rt`` and ``rp`` is not part
+  of an anchor's text, nor are comments and declarations; CDATA sections are;
+- entity and character references decode as BeautifulSoup decodes them.
+
+The page is fed to the tokenizer in one call, as BeautifulSoup does: fed in
+chunks, ``html.parser`` splits malformed references differently depending on
+where a chunk ends.
+
+C parsers such as lxml repair malformed markup differently from
+``html.parser`` (nested anchors, stray end tags), so they are not used: links
+would change with the parser installed. Other implementations can be
+registered with ``register_link_parser`` and selected by ``SCRAPE_LINK_PARSER``.
+"""
+
+import html.entities
+import os
+import re
+from html.parser import HTMLParser
+from typing import Callable, Iterator
+
+from bs4 import BeautifulSoup
+
+SCRAPE_LINK_PARSER = os.getenv("SCRAPE_LINK_PARSER", "stream").strip().lower()
+
+# As in BeautifulSoup's HTML tree builder.
+VOID_ELEMENTS = frozenset(
+    {
+        "area", "base", "basefont", "bgsound", "br", "col", "command", "embed",
+        "frame", "hr", "image", "img", "input", "isindex", "keygen", "link",
+        "menuitem", "meta", "nextid", "param", "source", "spacer", "track", "wbr",
+    }
+)  # fmt: skip
+STRING_CONTAINERS = frozenset({"rp", "rt", "script", "style", "template"})
+_NUMERIC_WITH_TRAILING = {10: re.compile("^([0-9]+)(.*)"), 16: re.compile("^([0-9a-f]+)(.*)")}
+
+Anchor = tuple[str, str]
+
+
+def _numeric_reference(code: int) -> str:
+    """Decode a numeric character reference following the HTML spec."""
+    if code == 0 or code > 0x10FFFF or 0xD800 <= code <= 0xDFFF:
+        return "\ufffd"
+    if 0x80 <= code <= 0x9F:
+        try:
+            return bytes([code]).decode("cp1252")
+        except UnicodeDecodeError:
+            return chr(code)
+    return chr(code)
+
+
+class _AnchorParser(HTMLParser):
+    """Tokenizer callbacks that track open elements and collect anchor text."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=False)
+        self.anchors: list[tuple[str, list[str]]] = []  # (href, text parts)
+        self._open: list[tuple[str, int | None]] = []  # (tag, anchor index or None)
+        self._containers = 0
+        self._closed_void: dict[str, int] = {}  # void tags whose end tag to ignore
+        self._text: list[str] = []
+
+    def _flush(self, include: bool | None = None) -> None:
+        if not self._text:
+            return
+        text = "".join(self._text).strip()
+        self._text = []
+        if include is None:
+            include = not self._containers
+        if text and include:
+            for _, index in self._open:
+                if index is not None:
+                    self.anchors[index][1].append(text)
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self._start(tag, attrs, void=tag in VOID_ELEMENTS)
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self._start(tag, attrs, void=False)
+        self._end(tag)
+
+    def _start(self, tag: str, attrs: list[tuple[str, str | None]], void: bool) -> None:
+        self._flush()
+        if void:
+            self._closed_void[tag] = self._closed_void.get(tag, 0) + 1
+            return
+        index = None
+        if tag == "a":
+            href = None
+            for key, value in attrs:
+                if key == "href":
+                    href = "" if value is None else value
+            if href is not None:
+                index = len(self.anchors)
+                self.anchors.append((href, []))
+        self._open.append((tag, index))
+        if tag in STRING_CONTAINERS:
+            self._containers += 1
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._closed_void.get(tag):
+            self._closed_void[tag] -= 1
+            return
+        self._end(tag)
+
+    def _end(self, tag: str) -> None:
+        self._flush()
+        for position in range(len(self._open) - 1, -1, -1):
+            if self._open[position][0] == tag:
+                break
+        else:
+            return
+        for name, _ in self._open[position:]:
+            if name in STRING_CONTAINERS:
+                self._containers -= 1
+        del self._open[position:]
+
+    def handle_data(self, data: str) -> None:
+        self._text.append(data)
+
+    def handle_entityref(self, name: str) -> None:
+        self._text.append(html.entities.html5.get(f"{name};", f"&{name}"))
+
+    def handle_charref(self, name: str) -> None:
+        base, digits = (16, name[1:]) if name[:1] in ("x", "X") else (10, name)
+        try:
+            self._text.append(_numeric_reference(int(digits, base)))
+        except ValueError:
+            match = _NUMERIC_WITH_TRAILING[base].search(digits)
+            if match is None:
+                self._text.append(digits)
+                return
+            self._text.append(_numeric_reference(int(match.group(1), base)))
+            self._text.append(match.group(2))
+
+    def handle_comment(self, data: str) -> None:
+        self._flush()
+
+    def handle_decl(self, decl: str) -> None:
+        self._flush()
+
+    def handle_pi(self, data: str) -> None:
+        self._flush()
+
+    def unknown_decl(self, data: str) -> None:
+        self._flush()
+        if data.upper().startswith("CDATA["):
+            self._text.append(data[len("CDATA[") :])
+            self._flush(include=True)
+
+    def close(self) -> None:
+        """Process buffered input and flush trailing text."""
+        super().close()
+        self._flush()
+
+
+def iter_anchors(html: str) -> Iterator[Anchor]:
+    """Yield ``(href, text)`` for every ``<a href>`` in document order, tree-free."""
+    parser = _AnchorParser()
+    parser.feed(html)
+    parser.close()
+    for href, parts in parser.anchors:
+        yield href, " ".join(parts)
+
+
+def soup_anchors(html: str) -> Iterator[Anchor]:
+    """Yield ``(href, text)`` pairs from a full BeautifulSoup tree (reference path)."""
+    soup = BeautifulSoup(html, "html.parser")
+    for anchor in soup.find_all("a", href=True):
+        yield anchor["href"], anchor.get_text(" ", strip=True)
+
+
+LINK_PARSERS: dict[str, Callable[[str], Iterator[Anchor]]] = {
+    "stream": iter_anchors,
+    "bs4": soup_anchors,
+}
+
+
+def register_link_parser(name: str, parser: Callable[[str], Iterator[Anchor]]) -> None:
+    """Make ``parser`` selectable with ``SCRAPE_LINK_PARSER=<name>``."""
+    LINK_PARSERS[name] = parser
+
+
+def anchors(html: str, parser: str | None = None) -> Iterator[Anchor]:
+    """Yield anchors with the configured parser, or the streaming one if unknown."""
+    return LINK_PARSERS.get(parser or SCRAPE_LINK_PARSER, iter_anchors)(html)
@@ -1,27 +1,83 @@
-"""Research tools focused on scraping news websites."""
+"""Research tools focused on scraping news websites.
 
-from urllib.parse import urljoin
+``scrape_news_site`` is synchronous for ``invoke`` and carries a native
+coroutine for ``ainvoke`` (used by LangGraph's async runs) that fetches pages
+with ``httpx.AsyncClient`` and parses them in worker threads.
+
+Articles are fetched concurrently in both paths, at most
+``SCRAPE_MAX_CONCURRENCY`` at a time per scrape and ``SCRAPE_PER_HOST_CONCURRENCY``
+per host, and are reported in the order their links appear on the page.
+Requests go through the shared keep-alive clients of
+``research_agent.http_client``, so articles on one host reuse connections, and
+pages are cached on disk by ``research_agent.http_cache``. Only the main
+content of each article (``research_agent.extract``) is converted to markdown,
+within ``SCRAPE_ARTICLE_MAX_TOKENS`` estimated tokens per article. Article
+links are read from the index page by ``research_agent.links`` without
+building a document tree.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
 
 import httpx
-from bs4 import BeautifulSoup
 from langchain_core.tools import InjectedToolArg, tool
-from markdownify import markdownify
 from typing_extensions import Annotated
 
-HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-        "(KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
-    )
-}
+from research_agent.extract import estimate_tokens, extract_article
+from research_agent.http_cache import CacheEntry, HTTPCache, get_cache
+from research_agent.http_client import get_async_client, get_client
+from research_agent.links import anchors
+
+SCRAPE_MAX_CONCURRENCY = int(os.getenv("SCRAPE_MAX_CONCURRENCY", "8"))
+SCRAPE_PER_HOST_CONCURRENCY = int(os.getenv("SCRAPE_PER_HOST_CONCURRENCY", "2"))
+SCRAPE_ARTICLE_MAX_TOKENS = int(os.getenv("SCRAPE_ARTICLE_MAX_TOKENS", "3000"))
+
+
+def _cached_response(
+    cache: HTTPCache | None, url: str, entry: CacheEntry | None, response: httpx.Response
+) -> str:
+    """Return the body for a network response, updating the page cache."""
+    if cache is not None and entry is not None and response.status_code == 304:
+        return cache.refresh(entry, response)
+    response.raise_for_status()
+    if cache is not None:
+        cache.store(url, response)
+    return response.text
 
 
 def _fetch_html(url: str, timeout: float) -> tuple[str | None, str | None]:
-    """Fetch raw HTML from a URL."""
+    """Fetch raw HTML from a URL, through the page cache when enabled."""
+    cache = get_cache()
+    entry = cache.lookup(url) if cache is not None else None
+    if cache is not None and (body := cache.serve(entry)) is not None:
+        return body, None
+    try:
+        headers = entry.validators() if entry is not None else None
+        response = get_client().get(url, timeout=timeout, headers=headers)
+        return _cached_response(cache, url, entry, response), None
+    except Exception as exc:  # noqa: BLE001
+        return None, f"Error fetching {url}: {exc}"
+
+
+async def _afetch_html(
+    client: httpx.AsyncClient, url: str, timeout: float
+) -> tuple[str | None, str | None]:
+    """Fetch raw HTML from a URL without blocking the event loop.
+
+    Cache files are read and written in worker threads.
+    """
+    cache = get_cache()
+    entry = await asyncio.to_thread(cache.lookup, url) if cache is not None else None
+    if cache is not None and (body := cache.serve(entry)) is not None:
+        return body, None
     try:
-        response = httpx.get(url, headers=HEADERS, timeout=timeout, follow_redirects=True)
-        response.raise_for_status()
-        return response.text, None
+        headers = entry.validators() if entry is not None else None
+        response = await client.get(url, timeout=timeout, headers=headers)
+        body = await asyncio.to_thread(_cached_response, cache, url, entry, response)
+        return body, None
     except Exception as exc:  # noqa: BLE001
         return None, f"Error fetching {url}: {exc}"
 
@@ -30,15 +86,12 @@ def _extract_article_links(
     html: str, base_url: str, topic: str, max_articles: int
 ) -> list[tuple[str, str]]:
     """Pull likely article links from a news page."""
-    soup = BeautifulSoup(html, "html.parser")
     topic_lower = topic.lower().strip()
     seen: set[str] = set()
     matched: list[tuple[str, str]] = []
     fallback: list[tuple[str, str]] = []
 
-    for anchor in soup.find_all("a", href=True):
-        href = anchor["href"]
-        title = anchor.get_text(" ", strip=True)
+    for href, title in anchors(html):
         full_url = urljoin(base_url, href)
 
         if not full_url.startswith(("http://", "https://")):
@@ -65,6 +118,84 @@ def _extract_article_links(
     return fallback[:max_articles]
 
 
+def _article_block(url: str, title: str, html: str | None, error: str | None) -> str:
+    """Render one fetched article (or its fetch error) as a markdown section.
+
+    The header reports the page size before and after extraction, in bytes and
+    estimated tokens.
+    """
+    if error or not html:
+        return f"## {title}\n**URL:** {url}\n\n{error or 'No content'}\n---"
+    article = extract_article(html, SCRAPE_ARTICLE_MAX_TOKENS)
+    lines = [f"## {article.title or title}", f"**URL:** {url}"]
+    if article.byline:
+        lines.append(f"**By:** {article.byline}")
+    if article.published:
+        lines.append(f"**Published:** {article.published}")
+    lines.append(
+        f"**Size:** {article.html_bytes:,} bytes HTML -> {article.markdown_bytes:,} bytes "
+        f"markdown (~{estimate_tokens(html):,} -> ~{estimate_tokens(article.markdown):,} tokens)"
+    )
+    body = article.markdown or "No article text found."
+    if article.truncated_tokens:
+        body += (
+            f"\n\n[Truncated ~{article.truncated_tokens:,} tokens to fit the "
+            f"{SCRAPE_ARTICLE_MAX_TOKENS:,}-token article budget.]"
+        )
+    return "\n".join(lines) + f"\n\n{body}\n---"
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def _fetch_articles(articles: list[tuple[str, str]], timeout: float) -> list[str]:
+    """Fetch and render articles on a thread pool, returning blocks in link order."""
+    host_limits = {
+        host: threading.BoundedSemaphore(max(1, SCRAPE_PER_HOST_CONCURRENCY))
+        for host in {_host(url) for url, _ in articles}
+    }
+
+    def fetch(article: tuple[str, str]) -> str:
+        url, title = article
+        with host_limits[_host(url)]:
+            article_html, article_error = _fetch_html(url, timeout)
+        return _article_block(url, title, article_html, article_error)
+
+    workers = max(1, min(SCRAPE_MAX_CONCURRENCY, len(articles)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fetch, articles))
+
+
+async def _afetch_articles(
+    client: httpx.AsyncClient, articles: list[tuple[str, str]], timeout: float
+) -> list[str]:
+    """Fetch articles concurrently on ``client``, returning blocks in link order.
+
+    Each article is converted to markdown in a worker thread as soon as it
+    arrives, so a slow download only delays its own block.
+    """
+    gate = asyncio.Semaphore(max(1, SCRAPE_MAX_CONCURRENCY))
+    host_limits = {
+        host: asyncio.Semaphore(max(1, SCRAPE_PER_HOST_CONCURRENCY))
+        for host in {_host(url) for url, _ in articles}
+    }
+
+    async def fetch(url: str, title: str) -> str:
+        async with gate, host_limits[_host(url)]:
+            article_html, article_error = await _afetch_html(client, url, timeout)
+        return await asyncio.to_thread(_article_block, url, title, article_html, article_error)
+
+    return list(await asyncio.gather(*(fetch(url, title) for url, title in articles)))
+
+
+def _scrape_report(site_url: str, topic: str, blocks: list[str]) -> str:
+    return (
+        f"Scraped {len(blocks)} article(s) from {site_url} "
+        f"for topic '{topic or 'top stories'}':\n\n" + "\n\n".join(blocks)
+    )
+
+
 @tool(parse_docstring=True)
 def scrape_news_site(
     site_url: str,
@@ -91,24 +222,37 @@ def scrape_news_site(
     if not articles:
         return f"No articles matched topic '{topic}' at {site_url}"
 
-    result_blocks = []
-    for url, title in articles:
-        article_html, article_error = _fetch_html(url, timeout)
-        if article_error or not article_html:
-            result_blocks.append(
-                f"## {title}\n**URL:** {url}\n\n{article_error or 'No content'}\n---"
-            )
-            continue
+    return _scrape_report(site_url, topic, _fetch_articles(articles, timeout))
 
-        markdown_content = markdownify(article_html)
-        result_blocks.append(
-            f"## {title}\n**URL:** {url}\n\n{markdown_content}\n---"
-        )
 
-    return (
-        f"Scraped {len(result_blocks)} article(s) from {site_url} "
-        f"for topic '{topic or 'top stories'}':\n\n" + "\n\n".join(result_blocks)
+async def _ascrape_news_site(
+    site_url: str,
+    topic: str = "",
+    max_articles: int = 3,
+    timeout: float = 10.0,
+) -> str:
+    """Async ``scrape_news_site``, used when the tool is awaited.
+
+    Pages download over the event loop's shared ``httpx.AsyncClient`` while
+    the loop stays free for other runs, articles concurrently; link extraction
+    and markdown conversion (CPU-bound parsing) run in worker threads.
+    """
+    client = get_async_client()
+    index_html, error = await _afetch_html(client, site_url, timeout)
+    if error:
+        return error
+
+    articles = await asyncio.to_thread(
+        _extract_article_links, index_html, site_url, topic, max_articles
     )
+    if not articles:
+        return f"No articles matched topic '{topic}' at {site_url}"
+
+    result_blocks = await _afetch_articles(client, articles, timeout)
+    return _scrape_report(site_url, topic, result_blocks)
+
+
+scrape_news_site.coroutine = _ascrape_news_site
 
 
 @tool(parse_docstring=True)
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+
+import httpx
+
+from research_agent import tools
+
+ARTICLES = [(f"https://{h}.example.com/story-{n}", f"Story {n}") for n in range(4) for h in "ab"]
+URLS = [url for url, _ in ARTICLES]
+
+
+class _Gauge:
+    """Tracks how many fetches run at once, overall and per host."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.active: Counter[str] = Counter()
+        self.peak: Counter[str] = Counter()
+
+    def enter(self, url: str) -> None:
+        with self.lock:
+            for key in ("*", tools._host(url)):
+                self.active[key] += 1
+                self.peak[key] = max(self.peak[key], self.active[key])
+
+    def leave(self, url: str) -> None:
+        with self.lock:
+            for key in ("*", tools._host(url)):
+                self.active[key] -= 1
+
+
+def _limit(monkeypatch, total: int, per_host: int) -> None:
+    monkeypatch.setattr(tools, "SCRAPE_MAX_CONCURRENCY", total)
+    monkeypatch.setattr(tools, "SCRAPE_PER_HOST_CONCURRENCY", per_host)
+    monkeypatch.setattr(tools, "get_cache", lambda: None)
+
+
+def _urls_in_order(blocks: list[str]) -> list[str]:
+    return [next(url for url in URLS if url in block) for block in blocks]
+
+
+def test_async_fetches_respect_global_and_per_host_limits(monkeypatch):
+    _limit(monkeypatch, total=3, per_host=2)
+    gauge = _Gauge()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        gauge.enter(url)
+        # Later links answer first, so the report order cannot come from arrival order.
+        await asyncio.sleep(0.05 - 0.005 * URLS.index(url))
+        gauge.leave(url)
+        return httpx.Response(200, html=f"<html><body><p>Text of {url}</p></body></html>")
+
+    async def run() -> list[str]:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await tools._afetch_articles(client, ARTICLES, 5.0)
+
+    blocks = asyncio.run(run())
+    assert _urls_in_order(blocks) == URLS
+    assert gauge.peak["*"] == 3
+    assert gauge.peak["a.example.com"] <= 2 and gauge.peak["b.example.com"] <= 2
+
+
+def test_threaded_fetches_respect_per_host_limit(monkeypatch):
+    _limit(monkeypatch, total=8, per_host=1)
+    gauge = _Gauge()
+
+    def fetch_html(url: str, timeout: float) -> tuple[str, None]:
+        gauge.enter(url)
+        time.sleep(0.02)
+        gauge.leave(url)
+        return f"<html><body><p>Text of {url}</p></body></html>", None
+
+    monkeypatch.setattr(tools, "_fetch_html", fetch_html)
+    blocks = tools._fetch_articles(ARTICLES, 5.0)
+    assert _urls_in_order(blocks) == URLS
+    assert gauge.peak["a.example.com"] == 1 and gauge.peak["b.example.com"] == 1
+    assert gauge.peak["*"] == 2